@@ -1,37 +1,333 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import Delete, Insert, TextClause, Update, event, make_url, text
+from sqlalchemy.exc import InvalidRequestError, ProgrammingError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from typing import AsyncGenerator, Optional
 import aiomysql
+import asyncio
 import logging
+import os
 from urllib.parse import quote_plus
 
 from .config import Config
+from .migrate import get_head_revision
+from .utils.pool_metrics import InstrumentedQueuePool, instrument_engine
+from .utils.structured_logging import setup_logging
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Construct database URL with explicit host
 DATABASE_URL = f"mysql+aiomysql://{Config.MYSQL_USER}:{quote_plus(Config.MYSQL_PASSWORD)}@{Config.MYSQL_HOST}/{Config.MYSQL_DATABASE}"
 
-logger.info(f"Using database URL: {DATABASE_URL}")
+logger.info(f"Using database URL: {make_url(DATABASE_URL).render_as_string(hide_password=True)}")
 
-# Create async engine with connect_args to ensure correct host
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,  # Set to False in production
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    connect_args={
-        "host": "48.217.185.81",  # Explicitly set host
+# Engine settings per deployment profile, selected with DB_PROFILE.
+# prod skips the per-checkout ping and instead recycles connections well
+# before MySQL's wait_timeout closes them. statement_timeout_ms maps to
+# MySQL's max_execution_time, which applies to SELECT statements.
+ENGINE_PROFILES = {
+    "dev": {
+        "echo": True,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": None,
+    },
+    "prod": {
+        "echo": False,
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_recycle": 1800,
+        "pool_pre_ping": False,
+        "statement_timeout_ms": 15000,
+    },
+    "bench": {
+        "echo": False,
+        "pool_size": 20,
+        "max_overflow": 0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": False,
+        "statement_timeout_ms": 5000,
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise ValueError(f"Unknown DB_PROFILE '{DB_PROFILE}', expected one of {', '.join(ENGINE_PROFILES)}")
+
+def _profile_setting(name: str):
+    """Profile value, overridable per setting with DB_<NAME> env vars"""
+    default = ENGINE_PROFILES[DB_PROFILE][name]
+    value = os.getenv(f"DB_{name.upper()}")
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes")
+    return int(value)
+
+def _connect_args(host: str, read_only: bool = False) -> dict:
+    """
+    aiomysql connection arguments for the active profile. Read-only
+    connections are marked transaction_read_only once at connect time, so
+    MySQL rejects writes and InnoDB skips transaction ID allocation
+    without a per-request SET TRANSACTION round-trip.
+    """
+    connect_args = {
+        "host": host,  # Explicitly set host
         "port": 3306,
         "user": Config.MYSQL_USER,
         "password": Config.MYSQL_PASSWORD,
         "db": Config.MYSQL_DATABASE,
     }
-)
+    session_settings = []
+    statement_timeout_ms = _profile_setting("statement_timeout_ms")
+    if statement_timeout_ms:
+        session_settings.append(f"SESSION max_execution_time = {int(statement_timeout_ms)}")
+    if read_only:
+        session_settings.append("SESSION transaction_read_only = ON")
+    if session_settings:
+        connect_args["init_command"] = "SET " + ", ".join(session_settings)
+    return connect_args
+
+# SQL echo goes through the logging pipeline rather than create_engine's
+# echo flag, which attaches its own synchronous stdout handler
+if _profile_setting("echo"):
+    logging.getLogger("sqlalchemy.engine.Engine").setLevel(logging.INFO)
+
+def _in_transaction(dbapi_connection) -> bool:
+    """
+    Whether the server reports an open transaction on a connection.
+    aiomysql tracks this from the status flags of every reply, so asking
+    costs no round-trip. Unknown drivers are assumed to be in one.
+    """
+    driver_connection = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+    get_transaction_status = getattr(driver_connection, "get_transaction_status", None)
+    return get_transaction_status is None or get_transaction_status()
+
+def _skip_idle_rollback(async_engine: AsyncEngine):
+    """
+    Only send ROLLBACK when a transaction is actually open. Read-only
+    sessions run in autocommit mode, so closing them, and returning their
+    connection to the pool, then costs no round-trip.
+    """
+    dialect = async_engine.sync_engine.dialect
+    do_rollback = dialect.do_rollback
+
+    def rollback_if_in_transaction(dbapi_connection):
+        if _in_transaction(dbapi_connection):
+            do_rollback(dbapi_connection)
+
+    dialect.do_rollback = rollback_if_in_transaction
+
+def _create_engine(host: str, read_only: bool = False) -> AsyncEngine:
+    """Create an instrumented async engine for the active profile"""
+    async_engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_pre_ping=_profile_setting("pool_pre_ping"),
+        pool_size=_profile_setting("pool_size"),
+        max_overflow=_profile_setting("max_overflow"),
+        pool_recycle=_profile_setting("pool_recycle"),
+        connect_args=_connect_args(host, read_only)
+    )
+    _skip_idle_rollback(async_engine)
+    return async_engine
+
+logger.info(f"Using database engine profile: {DB_PROFILE}")
+
+# Create async engine with connect_args to ensure correct host
+PRIMARY_HOST = "48.217.185.81"
+engine = _create_engine(PRIMARY_HOST)
+instrument_engine("primary", engine)
+
+# Optional read replica. Reads from get_read_db go here while replication
+# lag stays under REPLICA_MAX_LAG_SECONDS, and to the primary otherwise.
+REPLICA_HOST = os.getenv("MYSQL_REPLICA_HOST")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+
+# Statements reporting replication lag, newest first. SHOW REPLICA STATUS
+# needs MySQL 8.0.22 or later; older servers only know the SLAVE spelling.
+REPLICA_STATUS_QUERIES = [
+    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+]
+# MySQL error for a statement the server does not understand
+ER_PARSE_ERROR = 1064
+
+read_engine: Optional[AsyncEngine] = None
+if REPLICA_HOST:
+    logger.info(f"Using read replica at {REPLICA_HOST}")
+    read_engine = _create_engine(REPLICA_HOST, read_only=True)
+    instrument_engine("replica", read_engine)
+
+class ReplicaMonitor:
+    """
+    Periodically measures replication lag so read routing can fall back to
+    the primary when the replica is behind or unreachable
+    """
+    def __init__(self, replica: Optional[AsyncEngine]):
+        self.replica = replica
+        self.healthy = False  # Route to the primary until the first check passes
+        self.lag_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._status_query = 0  # Index into REPLICA_STATUS_QUERIES
+
+    async def _replica_status(self, conn):
+        """Replica status row and its lag column, in the server's dialect"""
+        while True:
+            query, lag_column = REPLICA_STATUS_QUERIES[self._status_query]
+            try:
+                return (await conn.execute(text(query))).mappings().first(), lag_column
+            except ProgrammingError as e:
+                code = getattr(e.orig, "args", (None,))[0]
+                if code != ER_PARSE_ERROR or self._status_query + 1 >= len(REPLICA_STATUS_QUERIES):
+                    raise
+            self._status_query += 1
+            logger.info(
+                "Replica does not understand %s (MySQL before 8.0.22), using %s",
+                query, REPLICA_STATUS_QUERIES[self._status_query][0]
+            )
+
+    async def check(self):
+        """Read the replica's lag behind the primary"""
+        try:
+            async with self.replica.connect() as conn:
+                row, lag_column = await self._replica_status(conn)
+        except Exception as e:
+            logger.warning("Replica lag check failed: %s", e)
+            self.healthy, self.lag_seconds = False, None
+            return
+
+        if row is None:
+            # Not a replica (e.g. a standalone test instance), so never behind
+            lag = 0.0
+        else:
+            lag = row.get(lag_column)
+        self.lag_seconds = None if lag is None else float(lag)
+        self.healthy = self.lag_seconds is not None and self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+
+    def start(self):
+        if self.replica is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+replica_monitor = ReplicaMonitor(read_engine)
+
+# Set once the current request has written through any session, so later
+# reads in the same request see those writes
+_pinned_to_primary: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+
+@event.listens_for(Session, "after_flush")
+def _pin_to_primary(session, flush_context):
+    session.info["has_writes"] = True
+    _pinned_to_primary.set(True)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    """
+    Remember whether a session executed anything but a SELECT, so get_db
+    only commits units of work that wrote. Textual SQL counts as a write,
+    and is rejected by read-only sessions, which run in autocommit mode.
+    """
+    if orm_execute_state.is_select:
+        return
+    session = orm_execute_state.session
+    if session.info.get("read_only"):
+        if _is_textual_read(orm_execute_state.statement):
+            return
+        raise InvalidRequestError("Cannot write through a read-only session")
+    session.info["has_writes"] = True
+
+def _is_textual_read(statement) -> bool:
+    """Whether a statement is textual SQL that can only read"""
+    if not isinstance(statement, TextClause):
+        return False
+    words = statement.text.split(None, 1)
+    return bool(words) and words[0].upper() in ("SELECT", "SHOW")
+
+@event.listens_for(Session, "after_begin")
+def _set_autocommit(session, transaction, connection):
+    """
+    Put the connection in autocommit mode for read-only sessions and out
+    of it for all others. aiomysql only sends SET autocommit when the mode
+    actually changes, so connections reused by sessions of the same kind
+    pay nothing.
+    """
+    autocommit = getattr(connection.connection.dbapi_connection, "autocommit", None)
+    if callable(autocommit):
+        autocommit(bool(session.info.get("read_only")))
+
+@event.listens_for(Session, "before_flush")
+def _reject_read_only_flush(session, flush_context, instances):
+    if session.info.get("read_only"):
+        raise InvalidRequestError("Cannot flush changes in a read-only session")
+
+def _has_writes(session: AsyncSession) -> bool:
+    """Whether the unit of work wrote, or has changes still to flush"""
+    return bool(
+        session.info.get("has_writes")
+        or session.new
+        or session.dirty
+        or session.deleted
+    )
+
+class RoutingSession(Session):
+    """
+    Session that reads from the replica when it is healthy and sends writes,
+    and every statement after a write in the same request, to the primary.
+    Textual SQL counts as a write unless it is a SELECT or SHOW.
+    """
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if isinstance(clause, (Insert, Update, Delete)) or (
+            isinstance(clause, TextClause) and not _is_textual_read(clause)
+        ):
+            _pinned_to_primary.set(True)
+        if (
+            read_engine is None
+            or self._flushing
+            or _pinned_to_primary.get()
+            or not replica_monitor.healthy
+        ):
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+class ReadOnlySession(Session):
+    """
+    Session for requests that never write. Reads the replica when it is
+    healthy, otherwise the primary, from the same pools as other sessions.
+    Statements run in autocommit mode, so there is no transaction to end.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.info["read_only"] = True
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            read_engine is None
+            or _pinned_to_primary.get()
+            or not replica_monitor.healthy
+        ):
+            return engine.sync_engine
+        return read_engine.sync_engine
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -42,29 +338,94 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+# Session factory for read-mostly requests, see get_read_db
+AsyncReadSessionLocal = sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
+
+# Session factory for get_readonly_db
+AsyncReadOnlySessionLocal = sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=ReadOnlySession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
+
 # Create declarative base for models
 Base = declarative_base()
 
 async def init_db():
-    """Initialize database by creating all tables"""
+    """
+    Verify the database schema is at the revision this code expects.
+    This is a single query; the schema itself is created and upgraded by
+    `python -m app.migrate upgrade head`, never by a worker.
+    """
+    head = get_head_revision()
     try:
         logger.info(f"Attempting to connect to database at {Config.MYSQL_HOST}")
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database initialization successful")
+        async with engine.connect() as conn:
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
     except Exception as e:
-        logger.error(f"Database initialization failed: {str(e)}")
+        logger.error("Database initialization failed: %s", e)
         raise
 
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'} but the code expects {head}. "
+            "Run `python -m app.migrate upgrade head` first."
+        )
+    logger.info(f"Database schema is at revision {head}")
+
 @asynccontextmanager
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency for getting async database session"""
+    """
+    Dependency for getting async database session.
+    The session is only committed if the handler wrote something.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            if _has_writes(session):
+                await session.commit()
+        except Exception as e:
+            logger.error("Database session error: %s", e)
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+@asynccontextmanager
+async def get_readonly_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for getting an async database session for handlers that
+    never write. Writes are rejected; reads run in autocommit mode, so
+    the request sends no COMMIT or ROLLBACK at all.
+    """
+    async with AsyncReadOnlySessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+@asynccontextmanager
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for getting an async database session for read-mostly
+    requests. Reads use the replica while it is healthy; anything written
+    in the request is read back from the primary.
+    """
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+            if _has_writes(session):
+                await session.commit()
         except Exception as e:
-            logger.error(f"Database session error: {str(e)}")
+            logger.error("Database session error: %s", e)
             await session.rollback()
             raise
         finally:
@@ -73,4 +434,7 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 # Connection management
 async def close_db_connections():
     """Close all database connections"""
+    await replica_monitor.stop()
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
@@ -4,9 +4,14 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
-from .database import engine, Base
-from .routes import auth, projects, wiki, events, notifications, google_drive_upload
+from .database import init_db, replica_monitor, close_db_connections
+from .routes import auth, projects, wiki, events, notifications, google_drive_upload, metrics, i18n, wiki_search, wiki_history, wiki_tree, calendar
 from .utils.error_handler import handle_validation_error, handle_sqlalchemy_error
+from .utils.google_drive import drive_service
+from .utils.mailer import close_mailer
+from .utils.outbox import outbox_dispatcher
+from .utils.reminders import reminder_scheduler
+from .utils.i18n import LanguageMiddleware, watch_translations, stop_watching_translations
 
 app = FastAPI()
 
@@ -19,6 +24,9 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Resolves request.state.language for every request
+app.add_middleware(LanguageMiddleware)
+
 # Exception handlers
 app.add_exception_handler(RequestValidationError, handle_validation_error)
 app.add_exception_handler(SQLAlchemyError, handle_sqlalchemy_error)
@@ -26,20 +34,37 @@ app.add_exception_handler(SQLAlchemyError, handle_sqlalchemy_error)
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
+# Before the wiki router, whose /{page_id} routes would capture these paths
+app.include_router(wiki_search.router, prefix="/api/wiki", tags=["wiki"])
+app.include_router(wiki_history.router, prefix="/api/wiki", tags=["wiki"])
+app.include_router(wiki_tree.router, prefix="/api/wiki", tags=["wiki"])
 app.include_router(wiki.router, prefix="/api/wiki", tags=["wiki"])
+# Before the events router, whose /{event_id} route would capture /range
+app.include_router(calendar.router, prefix="/api/events", tags=["events"])
 app.include_router(events.router, prefix="/api/events", tags=["events"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
 app.include_router(google_drive_upload.router, prefix="/api/upload", tags=["upload"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(i18n.router, prefix="/api/i18n", tags=["i18n"])
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the API"}
 
-# Create database tables
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
 @app.on_event("startup")
 async def startup_event():
-    await create_tables()
+    await init_db()
+    replica_monitor.start()
+    outbox_dispatcher.start()
+    reminder_scheduler.start()
+    watch_translations()
+    await drive_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_watching_translations()
+    await drive_service.stop()
+    await reminder_scheduler.stop()
+    await outbox_dispatcher.stop()
+    await close_mailer()
+    await close_db_connections()
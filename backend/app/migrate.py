@@ -0,0 +1,35 @@
+"""
+Database migration entry point.
+
+    python -m app.migrate upgrade head     # apply all migrations
+    python -m app.migrate current          # show the database revision
+    python -m app.migrate revision -m "…"  # create a new migration
+
+Any Alembic command works; this only pins the configuration to
+backend/alembic.ini so it can be run from any directory. Workers never
+issue DDL themselves, they only check the revision at startup.
+"""
+from pathlib import Path
+from typing import List, Optional
+import sys
+
+from alembic.config import CommandLine, Config as AlembicConfig
+from alembic.script import ScriptDirectory
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ALEMBIC_INI = BACKEND_DIR / "alembic.ini"
+
+def get_alembic_config() -> AlembicConfig:
+    """Alembic configuration for the backend database"""
+    return AlembicConfig(str(ALEMBIC_INI))
+
+def get_head_revision() -> str:
+    """The revision the code expects, read from the migration scripts"""
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    CommandLine(prog="python -m app.migrate").main(argv=["-c", str(ALEMBIC_INI), *argv])
+
+if __name__ == "__main__":
+    main()
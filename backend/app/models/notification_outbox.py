@@ -0,0 +1,33 @@
+from sqlalchemy import Column, DateTime, Index, Integer, JSON, String, Text
+from datetime import datetime
+
+from ..database import Base
+
+class NotificationOutbox(Base):
+    """
+    A notification written in the same transaction as the change it
+    announces, delivered later by the outbox dispatcher
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "dispatched_at", "available_at"),
+        {"info": {"revision": "0003"}},
+    )
+
+    id = Column(Integer, primary_key=True)
+    idempotency_key = Column(String(64), nullable=False, unique=True)
+    user_ids = Column(JSON, nullable=False)
+    notification_type = Column(String(50), nullable=False)
+    title = Column(String(255), nullable=False)
+    message = Column(Text, nullable=False)
+    data = Column(JSON, nullable=True)
+    priority = Column(String(20), nullable=False)
+    channel = Column(String(20), nullable=False)
+    # {"in_app": [...], "email": [...]}: users still to be reached per
+    # channel after a partly failed attempt; NULL until then
+    pending = Column(JSON, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    dispatched_at = Column(DateTime, nullable=True)
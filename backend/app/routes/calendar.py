@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List
+
+from ..database import get_db, get_read_db, get_readonly_db
+from ..schemas.event import EventOccurrenceResponse
+from ..utils.calendar import calendar_cache
+from ..utils.ics_feed import FeedEntry, current_feed_token, ics_feed_cache, issue_feed_token, read_feed_token
+from .auth import get_current_user
+
+router = APIRouter()
+
+# Longest window one request may expand recurring events over
+MAX_RANGE = timedelta(days=366)
+
+# Calendar apps poll; an unchanged feed costs them a 304
+FEED_CACHE_CONTROL = "private, no-cache"
+
+def _as_utc(value: datetime) -> datetime:
+    """Naive UTC, as event times are stored"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@router.get("/range", response_model=List[EventOccurrenceResponse])
+async def get_events_in_range(
+    start: datetime = Query(..., description="Window start (UTC)"),
+    end: datetime = Query(..., description="Window end (UTC), exclusive"),
+    current_user=Depends(get_current_user)
+) -> List[EventOccurrenceResponse]:
+    """
+    Occurrences of every event the current user created, attends, or that
+    belongs to one of their projects, overlapping [start, end)
+    """
+    start, end = _as_utc(start), _as_utc(end)
+    if end <= start or end - start > MAX_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"end must be after start and at most {MAX_RANGE.days} days later"
+        )
+
+    async with get_read_db() as db:
+        return await calendar_cache.get(db, current_user.id, start, end)
+
+def _feed_url(request: Request, token: str) -> Dict[str, str]:
+    return {"url": str(request.url_for("get_ics_feed", token=token))}
+
+async def _issue_feed_url(request: Request, user_id: int, reset: bool) -> Dict[str, str]:
+    async with get_db() as db:
+        token = await issue_feed_token(db, user_id, reset=reset)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calendar feeds are not enabled"
+        )
+    return _feed_url(request, token)
+
+@router.get("/feed-url")
+async def get_feed_url(request: Request, current_user=Depends(get_current_user)) -> Dict[str, str]:
+    """
+    Subscription URL of the current user's ICS feed, for calendar apps.
+    Only reads; the URL is created with POST /feed-url.
+    """
+    # The primary, so a URL created just before is found
+    async with get_readonly_db() as db:
+        token = await current_feed_token(db, current_user.id)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No calendar feed URL has been created"
+        )
+    return _feed_url(request, token)
+
+@router.post("/feed-url")
+async def create_feed_url(request: Request, current_user=Depends(get_current_user)) -> Dict[str, str]:
+    """
+    Create the current user's ICS feed URL, or return the existing one
+    """
+    return await _issue_feed_url(request, current_user.id, reset=False)
+
+@router.post("/feed-url/reset")
+async def reset_feed_url(request: Request, current_user=Depends(get_current_user)) -> Dict[str, str]:
+    """
+    Revoke the current user's feed URLs and return a new one
+    """
+    return await _issue_feed_url(request, current_user.id, reset=True)
+
+async def _stream(entry: FeedEntry) -> AsyncIterator[bytes]:
+    for chunk in entry:
+        yield chunk
+
+@router.get("/feed/{token}.ics")
+async def get_ics_feed(token: str, request: Request) -> Response:
+    """
+    A user's events as an iCalendar feed
+    """
+    async with get_read_db() as db:
+        user_id = await read_feed_token(db, token)
+        entry = await ics_feed_cache.get(db, user_id) if user_id is not None else None
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calendar feed not found"
+        )
+
+    headers = {"ETag": entry.etag, "Cache-Control": FEED_CACHE_CONTROL}
+    if request.headers.get("If-None-Match") == entry.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Length"] = str(entry.size)
+    return StreamingResponse(_stream(entry), media_type="text/calendar; charset=utf-8", headers=headers)
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from ..utils.i18n import get_translation_bundle
+
+router = APIRouter()
+
+# Clients may keep a bundle but must revalidate it, so edited translations
+# reach them on the next load; an unchanged bundle costs a 304
+BUNDLE_CACHE_CONTROL = "public, no-cache"
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header lists the given entity tag"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+@router.get("/{language}")
+async def get_translations(language: str, request: Request) -> Response:
+    """
+    All translations of a language, gzip-compressed when the client accepts it
+    """
+    bundle = get_translation_bundle(language)
+    if bundle is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No translations for language '{language}'"
+        )
+
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "").lower()
+    etag = bundle.gzip_etag if use_gzip else bundle.etag
+    headers = {
+        "ETag": etag,
+        "Cache-Control": BUNDLE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding"
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(bundle.gzipped, media_type="application/json", headers=headers)
+    return Response(bundle.body, media_type="application/json", headers=headers)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict
+
+from ..utils.pool_metrics import get_pool_metrics
+from .auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/db-pool")
+async def db_pool_metrics(current_user=Depends(get_current_user)) -> Dict[str, Any]:
+    """
+    Connection pool statistics for every database engine, for admins
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view database pool metrics"
+        )
+    return get_pool_metrics()
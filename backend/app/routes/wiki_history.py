@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+
+from ..database import get_read_db
+from ..schemas.wiki import WikiRevisionResponse, WikiRevisionSummary
+from ..utils.wiki_revisions import get_revision, list_revisions
+from .auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/{page_id}/revisions", response_model=List[WikiRevisionSummary])
+async def get_page_history(
+    page_id: int,
+    current_user=Depends(get_current_user)
+) -> List[WikiRevisionSummary]:
+    """
+    Revision history of a wiki page, newest first, without content
+    """
+    async with get_read_db() as db:
+        return await list_revisions(db, page_id)
+
+@router.get("/{page_id}/revisions/{revision_number}", response_model=WikiRevisionResponse)
+async def get_page_revision(
+    page_id: int,
+    revision_number: int,
+    current_user=Depends(get_current_user)
+) -> WikiRevisionResponse:
+    """
+    One revision of a wiki page with its full content
+    """
+    async with get_read_db() as db:
+        revision = await get_revision(db, page_id, revision_number)
+
+    if revision is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Revision {revision_number} of wiki page {page_id} not found"
+        )
+    return revision
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+
+from ..database import get_read_db
+from ..schemas.wiki import WikiSearchResponse
+from ..utils.wiki_search import search_wiki
+from .auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/search", response_model=WikiSearchResponse)
+async def search_wiki_pages(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    revisions: bool = False,
+    current_user=Depends(get_current_user)
+) -> WikiSearchResponse:
+    """
+    Search wiki pages by title and content, best matches first.
+    Pass the returned next_cursor to get the following results.
+    The wiki is shared by everyone who can sign in, so any signed-in
+    user may search all of it.
+    """
+    try:
+        async with get_read_db() as db:
+            return await search_wiki(db, q, limit, cursor, include_revisions=revisions)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from typing import List
+
+from ..database import get_read_db
+from ..schemas.wiki import WikiBreadcrumb, WikiTreeNode
+from ..utils.wiki_tree import get_ancestors, get_subtree, wiki_tree_cache
+from .auth import get_current_user
+
+router = APIRouter()
+
+# Clients keep the tree but revalidate it; an unchanged tree costs a 304
+TREE_CACHE_CONTROL = "private, no-cache"
+
+@router.get("/tree", response_model=List[WikiTreeNode])
+async def get_wiki_tree(request: Request, current_user=Depends(get_current_user)) -> Response:
+    """
+    The whole wiki page tree, for the sidebar
+    """
+    async with get_read_db() as db:
+        version = await wiki_tree_cache.current_version(db)
+        etag = wiki_tree_cache.etag(version)
+        headers = {"ETag": etag, "Cache-Control": TREE_CACHE_CONTROL}
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        body = await wiki_tree_cache.get(db, version)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get("/{page_id}/subtree", response_model=WikiTreeNode)
+async def get_wiki_subtree(page_id: int, current_user=Depends(get_current_user)) -> WikiTreeNode:
+    """
+    A wiki page with all of its descendants
+    """
+    async with get_read_db() as db:
+        subtree = await get_subtree(db, page_id)
+
+    if subtree is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Wiki page {page_id} not found"
+        )
+    return subtree
+
+@router.get("/{page_id}/breadcrumb", response_model=List[WikiBreadcrumb])
+async def get_wiki_breadcrumb(
+    page_id: int,
+    current_user=Depends(get_current_user)
+) -> List[WikiBreadcrumb]:
+    """
+    Ancestors of a wiki page from the root down, ending with the page
+    """
+    async with get_read_db() as db:
+        breadcrumb = await get_ancestors(db, page_id)
+
+    if not breadcrumb:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Wiki page {page_id} not found"
+        )
+    return breadcrumb
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class DriveBatchItemResult(BaseModel):
+    name: str  # Uploaded filename, or the Drive file ID for deletes
+    success: bool
+    file_id: Optional[str] = None
+    error: Optional[str] = None
+
+class DriveBatchResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[DriveBatchItemResult]
+
+    @classmethod
+    def from_results(cls, results: List[DriveBatchItemResult]) -> "DriveBatchResponse":
+        succeeded = sum(1 for result in results if result.success)
+        return cls(
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            results=results
+        )
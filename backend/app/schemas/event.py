@@ -1,7 +1,9 @@
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, constr, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from ..utils.rrule import parse_rrule
+
 class EventReminderBase(BaseModel):
     remind_at: datetime
     notification_type: str = "both"  # email, in-app, or both
@@ -28,6 +30,17 @@ class EventBase(BaseModel):
     location: Optional[str] = None
     is_all_day: bool = False
     project_id: Optional[int] = None
+    rrule: Optional[constr(max_length=500)] = None  # RFC 5545 RRULE, e.g. "FREQ=WEEKLY;BYDAY=MO"
+
+    @field_validator("rrule")
+    @classmethod
+    def validate_rrule(cls, value: Optional[str]) -> Optional[str]:
+        if value:
+            try:
+                parse_rrule(value, datetime(2000, 1, 1))
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Invalid recurrence rule: {str(e)}")
+        return value or None
 
 class EventCreate(EventBase):
     attendee_ids: List[int] = []
@@ -54,3 +67,14 @@ class EventDetailResponse(EventResponse):
 
     class Config:
         from_attributes = True
+
+class EventOccurrenceResponse(EventBase):
+    """One occurrence of an event in a calendar window"""
+    id: int
+    creator_id: int
+    occurrence_start: datetime
+    occurrence_end: datetime
+    is_recurring: bool = False
+
+    class Config:
+        from_attributes = True
@@ -36,6 +36,19 @@ class WikiRevisionResponse(WikiRevisionBase):
     class Config:
         from_attributes = True
 
+class WikiRevisionSummary(BaseModel):
+    """A revision in a page's history, without its content"""
+    id: int
+    wiki_page_id: int
+    author_id: int
+    comment: Optional[str] = None
+    content_size: Optional[int] = None
+    created_at: datetime
+    revision_number: int
+
+    class Config:
+        from_attributes = True
+
 class WikiPageBase(BaseModel):
     title: constr(min_length=1, max_length=255)
     content: str
@@ -60,7 +73,7 @@ class WikiPageResponse(WikiPageBase):
 
 class WikiPageDetailResponse(WikiPageResponse):
     children: List['WikiPageResponse'] = []
-    revisions: List[WikiRevisionResponse] = []
+    revisions: List[WikiRevisionSummary] = []
     author: Dict[str, Any]  # Dictionary containing user details
 
     class Config:
@@ -68,3 +81,27 @@ class WikiPageDetailResponse(WikiPageResponse):
 
 # Update forward references
 WikiPageDetailResponse.update_forward_refs()
+
+class WikiTreeNode(BaseModel):
+    id: int
+    title: str
+    parent_id: Optional[int] = None
+    children: List['WikiTreeNode'] = []
+
+WikiTreeNode.update_forward_refs()
+
+class WikiBreadcrumb(BaseModel):
+    id: int
+    title: str
+
+class WikiSearchResult(BaseModel):
+    id: int
+    title: str
+    parent_id: Optional[int] = None
+    snippet: str
+    highlights: List[List[int]] = []  # [start, end) offsets of matched terms in the snippet
+    score: float
+
+class WikiSearchResponse(BaseModel):
+    results: List[WikiSearchResult] = []
+    next_cursor: Optional[str] = None
@@ -0,0 +1,282 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import asyncio
+
+from sqlalchemy import DateTime, column, event, inspect, select, table, union
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .rrule import compute_occurs_until, parse_rrule
+
+events_table = table(
+    "events",
+    column("id"),
+    column("title"),
+    column("description"),
+    column("start_time", DateTime),
+    column("end_time", DateTime),
+    column("location"),
+    column("is_all_day"),
+    column("project_id"),
+    column("creator_id"),
+    column("rrule"),
+    column("occurs_until", DateTime),
+    column("created_at", DateTime),
+    column("updated_at", DateTime)
+)
+event_attendees_table = table("event_attendees", column("event_id"), column("user_id"))
+projects_table = table("projects", column("id"), column("customer_id"))
+project_team_members_table = table("project_team_members", column("project_id"), column("user_id"))
+calendar_user_versions_table = table("calendar_user_versions", column("user_id"), column("version"))
+
+# Occurrences of one series returned for a single window
+MAX_OCCURRENCES_PER_EVENT = 1000
+
+# Cached calendar windows kept per worker
+CALENDAR_CACHE_SIZE = 2048
+
+# Tables whose changes can alter what a user's calendar shows, with the
+# columns naming the events, projects and users a row of each concerns
+_CALENDAR_REFERENCES = {
+    "events": {"events": ["id"], "projects": ["project_id"], "users": ["creator_id"]},
+    "event_attendees": {"events": ["event_id"], "users": ["user_id"]},
+    "event_reminders": {"users": ["user_id"]},
+    "projects": {"projects": ["id"], "users": ["customer_id"]},
+    "project_team_members": {"users": ["user_id"]}
+}
+
+def _table_name(instance) -> Optional[str]:
+    return getattr(type(instance), "__tablename__", None)
+
+def _attribute_values(instance, name: str) -> Set[Any]:
+    """Current and, for modified rows, previous values of an attribute"""
+    attrs = inspect(instance).attrs
+    if name not in attrs:
+        return set()
+    history = attrs[name].history
+    return {value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None}
+
+def _collect_references(instances: Iterable, into: Dict[str, Set[Any]]):
+    for instance in instances:
+        for kind, names in _CALENDAR_REFERENCES.get(_table_name(instance), {}).items():
+            for name in names:
+                into[kind].update(_attribute_values(instance, name))
+
+def _audience(connection, references: Dict[str, Set[Any]]) -> Set[int]:
+    """
+    Users whose calendar shows any of the referenced events or the events
+    of any referenced project, as the database has them right now
+    """
+    users = set(references["users"])
+    event_ids, project_ids = references["events"], references["projects"]
+    if not event_ids and not project_ids:
+        return users
+
+    events = events_table
+    projects = select(projects_table.c.id).where(projects_table.c.id.in_(project_ids)).union(
+        select(events.c.project_id).where(events.c.id.in_(event_ids))
+    ).subquery()
+    statement = union(
+        select(events.c.creator_id).where(events.c.id.in_(event_ids)),
+        select(event_attendees_table.c.user_id).where(event_attendees_table.c.event_id.in_(event_ids)),
+        select(projects_table.c.customer_id).where(projects_table.c.id.in_(select(projects.c.id))),
+        select(project_team_members_table.c.user_id)
+        .where(project_team_members_table.c.project_id.in_(select(projects.c.id)))
+    )
+    users.update(user_id for user_id, in connection.execute(statement) if user_id is not None)
+    return users
+
+def _bump_user_versions(connection, user_ids: Set[int]):
+    """Add one to the calendar version of each user, in a fixed order"""
+    rows = [{"user_id": user_id, "version": 1} for user_id in sorted(user_ids)]
+    versions = calendar_user_versions_table
+    if connection.dialect.name == "sqlite":
+        statement = sqlite_insert(versions).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id"], set_={"version": versions.c.version + 1}
+        )
+    else:
+        statement = mysql_insert(versions).values(rows)
+        statement = statement.on_duplicate_key_update(version=versions.c.version + 1)
+    connection.execute(statement)
+
+@event.listens_for(Session, "before_flush")
+def _set_occurs_until(session, flush_context, instances):
+    """Keep occurs_until in step with the times and rule of each event"""
+    for instance in list(session.new) + list(session.dirty):
+        if _table_name(instance) != "events":
+            continue
+        # Range queries only find events through occurs_until
+        if "occurs_until" not in inspect(type(instance)).attrs:
+            raise RuntimeError("The events model must map the occurs_until column")
+        if instance.start_time is not None and instance.end_time is not None:
+            instance.occurs_until = compute_occurs_until(
+                instance.start_time, instance.end_time, getattr(instance, "rrule", None)
+            )
+
+@event.listens_for(Session, "before_flush")
+def _note_calendar_audience(session, flush_context, instances):
+    """
+    Note who sees the calendar rows about to change or go, while the
+    database still has them as they were
+    """
+    references = {"events": set(), "projects": set(), "users": set()}
+    _collect_references(
+        [instance for instance in session.dirty if session.is_modified(instance)], references
+    )
+    _collect_references(session.deleted, references)
+    if any(references.values()):
+        session.info.setdefault("calendar_users", set()).update(
+            _audience(session.connection(), references)
+        )
+
+@event.listens_for(Session, "after_flush")
+def _bump_calendar_versions(session, flush_context):
+    """
+    Invalidate the cached calendars of everyone who saw a changed row
+    before the flush or sees it now
+    """
+    references = {"events": set(), "projects": set(), "users": set()}
+    _collect_references(session.new, references)
+    _collect_references(
+        [instance for instance in session.dirty if session.is_modified(instance)], references
+    )
+    user_ids = session.info.pop("calendar_users", set())
+    if any(references.values()):
+        user_ids |= _audience(session.connection(), references)
+    if user_ids:
+        _bump_user_versions(session.connection(), user_ids)
+
+async def get_calendar_version(db: AsyncSession, user_id: int) -> int:
+    """Version of a user's calendar, shared by all workers"""
+    return (await db.execute(
+        select(calendar_user_versions_table.c.version)
+        .where(calendar_user_versions_table.c.user_id == user_id)
+    )).scalar() or 0
+
+def visible_event_ids(user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    IDs of events a user created, attends, or that belong to one of their
+    projects, optionally limited to events overlapping [start, end).
+    Each branch uses its own index, so they are combined with UNION
+    rather than OR.
+    """
+    events = events_table
+
+    def in_window(statement):
+        if start is not None:
+            statement = statement.where(events.c.occurs_until > start)
+        if end is not None:
+            statement = statement.where(events.c.start_time < end)
+        return statement
+
+    user_projects = union(
+        select(project_team_members_table.c.project_id)
+        .where(project_team_members_table.c.user_id == user_id),
+        select(projects_table.c.id).where(projects_table.c.customer_id == user_id)
+    ).subquery()
+
+    return union(
+        in_window(select(events.c.id).where(events.c.creator_id == user_id)),
+        in_window(
+            select(events.c.id)
+            .join(event_attendees_table, event_attendees_table.c.event_id == events.c.id)
+            .where(event_attendees_table.c.user_id == user_id)
+        ),
+        in_window(
+            select(events.c.id)
+            .where(events.c.project_id.in_(select(user_projects.c.project_id)))
+        )
+    ).subquery()
+
+def expand_occurrences(
+    event_row: Dict[str, Any],
+    start: datetime,
+    end: datetime
+) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    (start, end) of each occurrence of an event that overlaps [start, end).
+    Recurring series are expanded lazily from the window start.
+    """
+    duration = event_row["end_time"] - event_row["start_time"]
+    if not event_row.get("rrule"):
+        if event_row["start_time"] < end and event_row["end_time"] > start:
+            yield event_row["start_time"], event_row["end_time"]
+        return
+
+    series = parse_rrule(event_row["rrule"], event_row["start_time"])
+    for count, occurrence in enumerate(series.xafter(start - duration, inc=True)):
+        if occurrence >= end or count >= MAX_OCCURRENCES_PER_EVENT:
+            break
+        if occurrence + duration > start:
+            yield occurrence, occurrence + duration
+
+async def get_visible_events(
+    db: AsyncSession,
+    user_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Events visible to a user, optionally only those overlapping [start, end)"""
+    ids = visible_event_ids(user_id, start, end)
+    result = await db.execute(
+        select(events_table).where(events_table.c.id.in_(select(ids.c.id))).order_by(events_table.c.start_time)
+    )
+    return [dict(row) for row in result.mappings()]
+
+async def query_calendar(db: AsyncSession, user_id: int, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """
+    Occurrences of every event visible to a user in [start, end), in
+    start order
+    """
+    occurrences = []
+    for event_row in await get_visible_events(db, user_id, start, end):
+        for occurrence_start, occurrence_end in expand_occurrences(event_row, start, end):
+            occurrences.append({
+                **event_row,
+                "occurrence_start": occurrence_start,
+                "occurrence_end": occurrence_end,
+                "is_recurring": bool(event_row.get("rrule"))
+            })
+    occurrences.sort(key=lambda occurrence: (occurrence["occurrence_start"], occurrence["id"]))
+    return occurrences
+
+class CalendarCache:
+    """
+    Calendar windows per user, tagged with the user's calendar version
+    they were read at. A write to events, attendees, reminders or project
+    membership through any worker bumps the version of every user who sees
+    the changed rows, which retires only their entries.
+    """
+    def __init__(self, size: int = CALENDAR_CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[Tuple[int, datetime, datetime], Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._locks: Dict[Tuple[int, datetime, datetime], asyncio.Lock] = {}
+
+    async def get(self, db: AsyncSession, user_id: int, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        version = await get_calendar_version(db, user_id)
+        key = (user_id, start, end)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        # One query per window at a time; concurrent requests wait for it
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                entry = (version, await query_calendar(db, user_id, start, end))
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        if not lock.locked():
+            self._locks.pop(key, None)
+        return entry[1]
+
+calendar_cache = CalendarCache()
@@ -0,0 +1,192 @@
+from fastapi import WebSocket, WebSocketDisconnect
+from typing import Any, Dict, Optional, Set
+import asyncio
+import json
+import logging
+
+from .notification_backplane import Backplane, create_backplane
+
+logger = logging.getLogger(__name__)
+
+# Messages waiting to be written to one socket. A client that falls this
+# far behind is disconnected rather than slowing down everyone else; it
+# reconnects and reloads its notifications over HTTP.
+SEND_QUEUE_SIZE = 64
+SEND_TIMEOUT = 10.0
+
+# Close code for evicted slow consumers ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# The frontend sends exactly this every 30 seconds; matching the raw text
+# avoids parsing JSON for the most frequent message
+HEARTBEAT_MESSAGE = '{"type":"heartbeat"}'
+HEARTBEAT_ACK = json.dumps({"type": "heartbeat_ack"})
+
+class _Connection:
+    """One socket with its own bounded send queue and writer task"""
+    def __init__(self, connection_id: str, user_id: int, websocket: WebSocket):
+        self.connection_id = connection_id
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.writer: Optional[asyncio.Task] = None
+        self.evicted = False
+
+class ConnectionManager:
+    """
+    Tracks notification WebSockets held by this worker and delivers
+    notifications through a backplane, so a notification produced on any
+    worker reaches the worker that holds the recipient's sockets.
+
+    Each notification is serialized once and queued for all of the user's
+    sockets; every socket is written by its own task, so one slow client
+    never holds up delivery to the others.
+
+    Intended to back `notification_manager` in app/routes/notifications:
+
+        notification_manager = ConnectionManager()
+
+        @router.websocket("/ws/notifications/{connection_id}")
+        async def notifications_socket(websocket: WebSocket, connection_id: str):
+            user = ...  # authenticate the token query parameter
+            await notification_manager.connect(websocket, connection_id, user.id)
+            await notification_manager.listen(connection_id)
+
+    with start()/stop() called on application startup and shutdown.
+    """
+    def __init__(self, backplane: Optional[Backplane] = None):
+        self.backplane = backplane or create_backplane()
+        # Delivery works as soon as the manager exists; start() is only
+        # needed by backplanes that listen to other workers
+        self.backplane.bind(self._deliver_local)
+        self.connections: Dict[str, _Connection] = {}
+        self.user_connections: Dict[int, Set[str]] = {}
+        self.evicted = 0
+        # Evictions in progress, referenced until done so none is
+        # garbage-collected mid-close
+        self._evictions: Set[asyncio.Task] = set()
+
+    async def start(self):
+        await self.backplane.start(self._deliver_local)
+
+    async def stop(self):
+        await self.backplane.stop()
+        for connection_id in list(self.connections):
+            await self.disconnect(connection_id)
+
+    async def connect(self, websocket: WebSocket, connection_id: str, user_id: int):
+        """Accept a socket and register it for its user"""
+        await websocket.accept()
+        connection = _Connection(connection_id, user_id, websocket)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections[connection_id] = connection
+
+        user_connections = self.user_connections.setdefault(user_id, set())
+        user_connections.add(connection_id)
+        if len(user_connections) == 1:
+            await self.backplane.subscribe(user_id)
+
+    async def disconnect(self, connection_id: str, close_code: Optional[int] = None):
+        """
+        Forget a socket, closing it first if a close code is given.
+        The user is unsubscribed once their last socket is gone.
+        """
+        connection = self.connections.pop(connection_id, None)
+        if connection is None:
+            return
+
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        if close_code is not None:
+            try:
+                await connection.websocket.close(code=close_code)
+            except Exception:
+                pass
+
+        user_connections = self.user_connections.get(connection.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection_id)
+            if not user_connections:
+                del self.user_connections[connection.user_id]
+                await self.backplane.unsubscribe(connection.user_id)
+
+    async def listen(self, connection_id: str):
+        """Serve a socket's incoming messages until it closes"""
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return
+        try:
+            while True:
+                self.handle_message(connection, await connection.websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self.disconnect(connection_id)
+
+    def handle_message(self, connection: _Connection, text: str):
+        """Answer heartbeats; clients send nothing else that needs handling"""
+        if text != HEARTBEAT_MESSAGE:
+            try:
+                message = json.loads(text)
+            except ValueError:
+                return
+            if not isinstance(message, dict) or message.get("type") != "heartbeat":
+                return
+        self._enqueue(connection, HEARTBEAT_ACK)
+
+    async def send_personal_notification(self, user_id: int, notification: Dict[str, Any]):
+        """
+        Send a notification to every socket of a user, on whichever worker
+        holds them
+        """
+        await self.backplane.publish(user_id, json.dumps(self._envelope(notification)))
+
+    @staticmethod
+    def _envelope(notification: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap a notification in the message format the frontend expects"""
+        return {
+            **notification,
+            "type": "notification",
+            "notification_type": notification.get("type")
+        }
+
+    async def _deliver_local(self, user_id: int, message: str):
+        """Queue a serialized message for this worker's sockets of a user"""
+        for connection_id in list(self.user_connections.get(user_id, ())):
+            connection = self.connections.get(connection_id)
+            if connection is not None:
+                self._enqueue(connection, message)
+
+    def _enqueue(self, connection: _Connection, message: str):
+        """Queue a message, evicting the socket if its queue is full"""
+        if connection.evicted:
+            return
+        try:
+            connection.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            connection.evicted = True
+            self.evicted += 1
+            logger.warning("Disconnecting slow notification socket %s", connection.connection_id)
+            task = asyncio.create_task(
+                self.disconnect(connection.connection_id, SLOW_CONSUMER_CLOSE_CODE)
+            )
+            self._evictions.add(task)
+            task.add_done_callback(self._eviction_done)
+
+    def _eviction_done(self, task: asyncio.Task):
+        self._evictions.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not disconnect slow notification socket: %s", task.exception())
+
+    async def _write(self, connection: _Connection):
+        """Drain one socket's queue"""
+        while True:
+            message = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(message), SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Dropping notification socket %s: %s", connection.connection_id, e)
+                await self.disconnect(connection.connection_id, SLOW_CONSUMER_CLOSE_CODE)
+                return
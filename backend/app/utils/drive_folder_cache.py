@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Folder IDs rarely change, but entries still expire so a folder that was
+# moved or renamed in the Drive UI is eventually looked up again. Trashed
+# and deleted folders are detected by the next upload into them.
+FOLDER_CACHE_TTL = 24 * 60 * 60
+FOLDER_CACHE_MAX_ENTRIES = 2048
+FOLDER_CACHE_FILE = os.getenv('DRIVE_FOLDER_CACHE_FILE', 'drive_folder_cache.json')
+
+# Bursts of new folders are written to disk together
+FLUSH_DELAY = 0.5
+
+class FolderIdCache:
+    """
+    Persistent path -> Drive folder ID cache with TTL and LRU eviction.
+    Also de-duplicates concurrent lookups so that a missing folder is
+    created only once per worker.
+    """
+    def __init__(
+        self,
+        path: str = FOLDER_CACHE_FILE,
+        ttl: float = FOLDER_CACHE_TTL,
+        max_entries: int = FOLDER_CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loaded = False
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached folder ID for a path, if present and fresh"""
+        self._load()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        folder_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self._mark_dirty()
+            return None
+
+        self._entries.move_to_end(key)
+        return folder_id
+
+    def set(self, key: str, folder_id: str):
+        """Cache the folder ID for a path"""
+        self._load()
+        self._entries[key] = (folder_id, time.time() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._mark_dirty()
+
+    def invalidate(self, key: str):
+        """Drop a path and everything below it"""
+        self._load()
+        prefix = key.rstrip('/') + '/'
+        stale = [k for k in self._entries if k == key or k.startswith(prefix)]
+        for k in stale:
+            del self._entries[k]
+        if stale:
+            self._mark_dirty()
+
+    async def single_flight(
+        self,
+        key: str,
+        resolve: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Resolve a path, sharing one in-flight lookup between all concurrent
+        callers for the same key. If the caller doing the lookup is
+        cancelled, the callers waiting on it start a new one.
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            folder_id = await asyncio.shield(future)
+            if folder_id is not None:
+                return folder_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            folder_id = await resolve()
+        except asyncio.CancelledError:
+            # Only this caller was cancelled; waiters retry on None
+            future.set_result(None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when nobody was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(folder_id)
+            return folder_id
+        finally:
+            del self._inflight[key]
+
+    def _load(self):
+        """Read persisted entries once, on first use"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable Drive folder cache %s: %s", self.path, e)
+            return
+
+        now = time.time()
+        for key, (folder_id, expires_at) in sorted(
+            stored.items(), key=lambda item: item[1][1]
+        ):
+            if expires_at > now:
+                self._entries[key] = (folder_id, expires_at)
+
+    def _mark_dirty(self):
+        """Schedule a write of the current entries"""
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._write(dict(self._entries))
+                self._dirty = False
+                return
+            self._flush_task = loop.create_task(self._flush())
+
+    async def _flush(self):
+        """Persist entries off the event loop, coalescing bursts of changes"""
+        await asyncio.sleep(FLUSH_DELAY)
+        while self._dirty:
+            self._dirty = False
+            snapshot = dict(self._entries)
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+            except OSError as e:
+                logger.warning("Could not persist Drive folder cache %s: %s", self.path, e)
+
+    def _write(self, snapshot: Dict[str, Tuple[str, float]]):
+        """
+        Atomically replace the cache file. Each write goes through its own
+        temporary file, so workers sharing the cache never write into or
+        publish each other's half-written copies.
+        """
+        directory, name = os.path.split(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+# Shared by every GoogleDriveService call in this worker
+folder_cache = FolderIdCache()
@@ -2,11 +2,11 @@ from fastapi import HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any
 import logging
-import traceback
-from datetime import datetime
+
+from .structured_logging import setup_logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 class APIError(HTTPException):
@@ -27,14 +27,19 @@ class APIError(HTTPException):
         self._log_error()
 
     def _log_error(self):
-        """Log error details"""
-        logger.error(
-            f"API Error: {self.error_code or 'NO_CODE'} - {self.detail}",
+        """
+        Log error details. Client errors are logged as warnings; repeats
+        of the same error code are rate limited by the logging pipeline.
+        """
+        logger.log(
+            logging.ERROR if self.status_code >= 500 else logging.WARNING,
+            "API Error: %s - %s",
+            self.error_code or 'NO_CODE',
+            self.detail,
             extra={
                 "status_code": self.status_code,
                 "error_code": self.error_code,
-                "additional_info": self.additional_info,
-                "timestamp": datetime.utcnow().isoformat()
+                "additional_info": self.additional_info
             }
         )
 
@@ -97,14 +102,13 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
     """
     Handle unhandled exceptions and return standardized error response
     """
-    # Log the full exception traceback
+    # Log the full exception; its traceback is formatted by the log writer
     logger.error(
         "Unhandled exception occurred",
+        exc_info=exc,
         extra={
             "path": request.url.path,
-            "method": request.method,
-            "traceback": traceback.format_exc(),
-            "timestamp": datetime.utcnow().isoformat()
+            "method": request.method
         }
     )
 
@@ -1,22 +1,79 @@
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseUpload
 from fastapi import HTTPException, UploadFile
+from starlette.requests import Request as HTTPRequest
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import httplib2
+import socket
+import threading
+import logging
 import os
-import io
 import pickle
-from typing import Optional
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
 from ..config import Config
+from ..schemas.drive import DriveBatchItemResult, DriveBatchResponse
+from .drive_folder_cache import folder_cache
+
+logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
+TOKEN_FILE = 'token.pickle'
+
+# The access token is refreshed this long before it expires
+TOKEN_REFRESH_MARGIN = 5 * 60
+# How often to look for credentials when none are loaded yet
+CREDENTIALS_CHECK_INTERVAL = 60
+CREDENTIALS_RETRY_INTERVAL = 30
+
+# googleapiclient only has a blocking transport, so every Drive call runs on
+# this many threads per worker instead of on the event loop.
+MAX_CONCURRENT_TRANSFERS = 4
+
+# How often a running upload checks whether the HTTP client is still there
+DISCONNECT_POLL_INTERVAL = 1.0
+
+# Uploads are streamed from the spooled temp file in chunks of this size, so
+# peak memory per transfer stays bounded regardless of file size. Drive
+# requires resumable chunks to be a multiple of 256 KB.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# A failed chunk is retried this many times, resuming from the last byte
+# Drive confirmed, before the upload is given up
+MAX_CHUNK_RETRIES = 5
+RETRY_BACKOFF_BASE = 1.0
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Drive accepts at most 100 calls in one batch request
+MAX_BATCH_SIZE = 100
+
+# Called with (bytes_sent, total_bytes) as an upload progresses
+ProgressCallback = Callable[[int, int], Any]
+
+class DriveOperationCancelled(Exception):
+    """Raised in a transfer thread once the awaiting coroutine is cancelled"""
 
 class GoogleDriveService:
     _instance = None
     _credentials = None
     _service = None
+    _executor = ThreadPoolExecutor(
+        max_workers=MAX_CONCURRENT_TRANSFERS,
+        thread_name_prefix='drive-transfer'
+    )
+    _transfer_slots = asyncio.Semaphore(MAX_CONCURRENT_TRANSFERS)
+    _thread_local = threading.local()
+    _init_lock = asyncio.Lock()
+    _token_file_lock = threading.Lock()
+    _refresh_task: Optional[asyncio.Task] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -27,156 +84,599 @@ class GoogleDriveService:
         # Don't initialize credentials and service in __init__
         pass
 
+    async def start(self):
+        """
+        Warm up credentials and the Drive client at application startup and
+        keep the access token fresh in the background
+        """
+        try:
+            await self._ensure_ready()
+        except Exception as e:
+            logger.warning("Google Drive is not available yet: %s", e)
+
+        if self._refresh_task is None or self._refresh_task.done():
+            GoogleDriveService._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the background credential refresh"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            GoogleDriveService._refresh_task = None
+
+    async def _ensure_ready(self):
+        """
+        Make sure credentials and the service exist. Loading runs off the
+        event loop and at most once at a time; it never starts an
+        interactive OAuth flow.
+        """
+        if self._service is not None:
+            return
+        async with self._init_lock:
+            if self._service is None:
+                await asyncio.to_thread(self._initialize)
+
     def _initialize(self):
-        """Initialize credentials and service only when needed"""
+        """Initialize credentials and service (blocking, runs in a thread)"""
         if not self._credentials:
-            self._credentials = self._get_credentials()
+            creds = self._load_credentials()
+            if creds is None:
+                raise RuntimeError(
+                    "Google Drive is not authorized. "
+                    "Run `python -m app.utils.google_drive` to sign in."
+                )
+            GoogleDriveService._credentials = creds
         if not self._service:
-            self._service = build('drive', 'v3', credentials=self._credentials)
+            GoogleDriveService._service = build('drive', 'v3', credentials=self._credentials)
 
-    def _get_credentials(self) -> Credentials:
-        """Gets valid user credentials from storage or initiates OAuth2 flow."""
+    def _load_credentials(self) -> Optional[Credentials]:
+        """
+        Load stored credentials, refreshing them if they have expired.
+        Returns None when there is nothing usable to load.
+        """
         creds = None
-        
+
         # The file token.pickle stores the user's access and refresh tokens
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
+        if os.path.exists(TOKEN_FILE):
+            with open(TOKEN_FILE, 'rb') as token:
                 creds = pickle.load(token)
 
-        # If there are no (valid) credentials available, initiate OAuth2 flow
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
+        if creds and not creds.valid:
+            if creds.expired and creds.refresh_token:
                 creds.refresh(Request())
+                self._save_credentials(creds)
             else:
-                flow = InstalledAppFlow.from_client_config(
-                    {
-                        "installed": {
-                            "client_id": Config.GOOGLE_CLIENT_ID,
-                            "client_secret": Config.GOOGLE_CLIENT_SECRET,
-                            "project_id": "buildline-portal-uploads-api",
-                            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                            "token_uri": "https://oauth2.googleapis.com/token",
-                            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                            "redirect_uris": ["http://localhost"]
-                        }
-                    },
-                    SCOPES
-                )
-                creds = flow.run_local_server(port=0)
+                return None
 
-            # Save the credentials for the next run
-            with open('token.pickle', 'wb') as token:
+        return creds
+
+    def _save_credentials(self, creds: Credentials):
+        """Save the credentials for the next run"""
+        with self._token_file_lock:
+            with open(TOKEN_FILE, 'wb') as token:
                 pickle.dump(creds, token)
 
-        return creds
+    def _refresh_credentials(self):
+        """Refresh the shared access token (blocking, runs in a thread)"""
+        self._credentials.refresh(Request())
+        self._save_credentials(self._credentials)
+
+    def _seconds_until_refresh(self) -> float:
+        """How long the current access token can be used before refreshing"""
+        creds = self._credentials
+        if creds is None or creds.expiry is None:
+            return CREDENTIALS_CHECK_INTERVAL
+        remaining = (creds.expiry - datetime.utcnow()).total_seconds()
+        return max(0.0, remaining - TOKEN_REFRESH_MARGIN)
+
+    async def _refresh_loop(self):
+        """
+        Refresh the access token shortly before it expires, so requests
+        never wait on a token refresh. Also picks up a token.pickle created
+        after startup by the sign-in command.
+        """
+        while True:
+            await asyncio.sleep(self._seconds_until_refresh())
+            try:
+                if self._credentials is None:
+                    await self._ensure_ready()
+                else:
+                    await asyncio.to_thread(self._refresh_credentials)
+            except Exception as e:
+                logger.error("Google Drive credential refresh failed: %s", e)
+                await asyncio.sleep(CREDENTIALS_RETRY_INTERVAL)
+
+    def _http(self) -> AuthorizedHttp:
+        """
+        Return an authorized transport owned by the calling thread.
+        httplib2 connections are not thread-safe, so each transfer thread
+        keeps its own instead of sharing the one bound to the service.
+        """
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self._credentials, http=httplib2.Http())
+            self._thread_local.http = http
+        return http
+
+    def _execute(self, cancelled: threading.Event, request) -> Any:
+        """Execute a single Drive request (runs in a transfer thread)"""
+        if cancelled.is_set():
+            raise DriveOperationCancelled()
+        return request.execute(http=self._http())
+
+    def _execute_resumable(
+        self,
+        cancelled: threading.Event,
+        request,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Any:
+        """
+        Drive a resumable upload chunk by chunk (runs in a transfer thread),
+        stopping between chunks once the caller has been cancelled.
+        A chunk that fails with a transient error is retried; the client
+        then asks Drive for the committed offset and resumes from there
+        instead of restarting the upload.
+        """
+        http = self._http()
+        response = None
+        failures = 0
+        while response is None:
+            if cancelled.is_set():
+                raise DriveOperationCancelled()
+            try:
+                status, response = request.next_chunk(http=http)
+            except Exception as e:
+                if not self._is_retryable(e) or failures >= MAX_CHUNK_RETRIES:
+                    raise
+                failures += 1
+                if cancelled.wait(RETRY_BACKOFF_BASE * 2 ** (failures - 1)):
+                    raise DriveOperationCancelled()
+                continue
+
+            failures = 0
+            if on_progress is not None and status is not None:
+                on_progress(status.resumable_progress, status.total_size)
+
+        if on_progress is not None:
+            total = request.resumable.size()
+            on_progress(total, total)
+        return response
+
+    def _execute_batch(
+        self,
+        cancelled: threading.Event,
+        requests: List[Any]
+    ) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Send several Drive requests as one batch HTTP call (runs in a
+        transfer thread). Returns a (response, error) pair per request.
+        """
+        if cancelled.is_set():
+            raise DriveOperationCancelled()
+
+        results: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(requests)
+
+        def collect(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        batch = self._service.new_batch_http_request(callback=collect)
+        for index, request in enumerate(requests):
+            batch.add(request, request_id=str(index))
+        batch.execute(http=self._http())
+        return results
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Whether a failed chunk is worth resuming"""
+        if isinstance(error, HttpError):
+            return error.resp.status in RETRYABLE_STATUS_CODES
+        return isinstance(error, (socket.error, httplib2.HttpLib2Error, TimeoutError))
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Run a blocking Drive call on the transfer pool without blocking the
+        event loop. At most MAX_CONCURRENT_TRANSFERS calls run per worker;
+        cancelling the awaiting coroutine signals the thread to stop.
+        """
+        cancelled = threading.Event()
+        async with self._transfer_slots:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor,
+                functools.partial(func, cancelled, *args)
+            )
+            try:
+                return await future
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    async def _cancel_on_disconnect(
+        self,
+        operation,
+        request: Optional[HTTPRequest]
+    ) -> Any:
+        """
+        Await a Drive operation, cancelling it if the HTTP client
+        disconnects before it finishes
+        """
+        if request is None:
+            return await operation
+
+        task = asyncio.ensure_future(operation)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    return task.result()
+                if await request.is_disconnected():
+                    task.cancel()
+                    raise HTTPException(
+                        status_code=499,
+                        detail="Client disconnected before the upload finished"
+                    )
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
 
     async def upload_file(
         self,
         file: UploadFile,
         folder_path: str,
-        mime_type: Optional[str] = None
+        mime_type: Optional[str] = None,
+        request: Optional[HTTPRequest] = None,
+        progress: Optional[ProgressCallback] = None
     ) -> str:
         """
-        Upload a file to Google Drive and return the file ID
+        Upload a file to Google Drive and return the file ID.
+        The file is streamed from its spooled temp file in UPLOAD_CHUNK_SIZE
+        chunks. Pass the incoming request to abort the transfer if its client
+        disconnects, and a progress callback to receive (bytes_sent, total)
+        updates on the event loop.
         """
         try:
-            self._initialize()  # Initialize only when needed
+            await self._ensure_ready()  # Initialize only when needed
             
-            # Create folder structure if it doesn't exist
-            folder_id = await self._get_or_create_folder_path(folder_path)
+            loop = asyncio.get_running_loop()
 
-            # Prepare file metadata
-            file_metadata = {
-                'name': file.filename,
-                'parents': [folder_id]
-            }
+            def report_progress(sent: int, total: int):
+                loop.call_soon_threadsafe(progress, sent, total)
 
-            # Read file content
-            content = await file.read()
-            media = MediaIoBaseUpload(
-                io.BytesIO(content),
-                mimetype=mime_type or file.content_type,
-                resumable=True
-            )
+            on_progress = report_progress if progress is not None else None
+
+            for attempt in range(2):
+                # Create folder structure if it doesn't exist
+                folder_id = await self._get_or_create_folder_path(folder_path)
+                try:
+                    uploaded_file = await self._cancel_on_disconnect(
+                        self._upload_to_folder(file, folder_id, mime_type, on_progress),
+                        request
+                    )
+                    break
+                except HttpError as e:
+                    if e.resp.status != 404 or attempt:
+                        raise
+                    # The cached folder no longer exists; resolve the path again
+                    folder_cache.invalidate(self._folder_key(self._split_path(folder_path)))
 
-            # Upload file
-            uploaded_file = self._service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
+            if uploaded_file.get('trashed'):
+                # The cached folder, or one of its ancestors, is in the trash
+                # (which still resolves, unlike a purged folder). Resolve the
+                # path again and move the file out of the trash.
+                uploaded_file = await self._move_out_of_trash(uploaded_file['id'], folder_id, folder_path)
 
             return uploaded_file.get('id')
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to upload file to Google Drive: {str(e)}"
             )
 
+    async def _upload_to_folder(
+        self,
+        file: UploadFile,
+        folder_id: str,
+        mime_type: Optional[str],
+        on_progress: Optional[ProgressCallback]
+    ) -> Any:
+        """Stream a file into a Drive folder as a resumable upload"""
+        # Prepare file metadata
+        file_metadata = {
+            'name': file.filename,
+            'parents': [folder_id]
+        }
+
+        # Stream straight from the spooled temp file; MediaIoBaseUpload
+        # only reads one chunk at a time
+        await file.seek(0)
+        media = MediaIoBaseUpload(
+            file.file,
+            mimetype=mime_type or file.content_type,
+            chunksize=UPLOAD_CHUNK_SIZE,
+            resumable=True
+        )
+
+        # A file created in a trashed folder is itself reported as trashed
+        upload_request = self._service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, trashed'
+        )
+        return await self._run(self._execute_resumable, upload_request, on_progress)
+
+    async def _move_out_of_trash(self, file_id: str, trashed_folder_id: str, folder_path: str) -> Any:
+        """Move a file uploaded into a trashed folder to a live copy of its path"""
+        segments = self._split_path(folder_path)
+        # Which segment was trashed is unknown, so the whole path is looked
+        # up again; trashed folders no longer match and are recreated
+        folder_cache.invalidate(self._folder_key(segments[:1]))
+        folder_id = await self._get_or_create_folder_path(folder_path)
+        return await self._run(
+            self._execute,
+            self._service.files().update(
+                fileId=file_id,
+                body={'trashed': False},
+                addParents=folder_id,
+                removeParents=trashed_folder_id,
+                fields='id, trashed'
+            )
+        )
+
     async def delete_file(self, file_id: str):
         """
         Delete a file from Google Drive
         """
         try:
-            self._initialize()  # Initialize only when needed
-            self._service.files().delete(fileId=file_id).execute()
+            await self._ensure_ready()  # Initialize only when needed
+            await self._run(
+                self._execute,
+                self._service.files().delete(fileId=file_id)
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to delete file from Google Drive: {str(e)}"
             )
 
+    async def upload_files(
+        self,
+        files: List[UploadFile],
+        folder_path: str,
+        request: Optional[HTTPRequest] = None
+    ) -> DriveBatchResponse:
+        """
+        Upload several files into one folder.
+        Uploads run in parallel, bounded by MAX_CONCURRENT_TRANSFERS, and the
+        folder path is resolved once for all of them. A failed file does not
+        stop the others; each gets its own result.
+        Unlike deletes, uploads are not batched: Drive's batch endpoint does
+        not accept media, and creating the metadata in a batch first would
+        still leave one resumable session per file to send the content.
+        """
+        async def upload_one(file: UploadFile) -> DriveBatchItemResult:
+            try:
+                file_id = await self.upload_file(file, folder_path)
+                return DriveBatchItemResult(name=file.filename, success=True, file_id=file_id)
+            except HTTPException as e:
+                return DriveBatchItemResult(name=file.filename, success=False, error=str(e.detail))
+
+        try:
+            await self._ensure_ready()  # Initialize only when needed
+            await self._get_or_create_folder_path(folder_path)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload files to Google Drive: {str(e)}"
+            )
+
+        results = await self._cancel_on_disconnect(
+            asyncio.gather(*(upload_one(file) for file in files)),
+            request
+        )
+        return DriveBatchResponse.from_results(results)
+
+    async def delete_files(self, file_ids: List[str]) -> DriveBatchResponse:
+        """
+        Delete several files from Google Drive using batch requests of up
+        to MAX_BATCH_SIZE deletes each, reporting the outcome per file
+        """
+        try:
+            await self._ensure_ready()  # Initialize only when needed
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to delete files from Google Drive: {str(e)}"
+            )
+
+        async def delete_chunk(chunk: List[str]) -> List[DriveBatchItemResult]:
+            try:
+                responses = await self._run(
+                    self._execute_batch,
+                    [self._service.files().delete(fileId=file_id) for file_id in chunk]
+                )
+            except Exception as e:
+                responses = [(None, e)] * len(chunk)
+
+            return [
+                DriveBatchItemResult(
+                    name=file_id,
+                    success=error is None,
+                    file_id=file_id,
+                    error=str(error) if error is not None else None
+                )
+                for file_id, (_, error) in zip(chunk, responses)
+            ]
+
+        chunks = await asyncio.gather(*(
+            delete_chunk(file_ids[start:start + MAX_BATCH_SIZE])
+            for start in range(0, len(file_ids), MAX_BATCH_SIZE)
+        ))
+        return DriveBatchResponse.from_results(
+            [result for chunk in chunks for result in chunk]
+        )
+
     async def _get_or_create_folder_path(self, folder_path: str) -> str:
         """
         Get or create a folder path in Google Drive
         Returns the ID of the deepest folder
         """
-        current_parent = Config.GOOGLE_DRIVE_FOLDER_ID
-        
-        # Split path and process each folder
-        for folder_name in folder_path.strip('/').split('/'):
-            if not folder_name:
-                continue
+        segments = self._split_path(folder_path)
+        try:
+            return await self._resolve_folder(segments)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            # A cached ancestor was deleted; the failing prefix has been
+            # invalidated, so walk the path again
+            return await self._resolve_folder(segments)
+
+    @staticmethod
+    def _split_path(folder_path: str) -> List[str]:
+        """Split a folder path into its non-empty segments"""
+        return [name for name in folder_path.strip('/').split('/') if name]
+
+    @staticmethod
+    def _folder_key(segments: List[str]) -> str:
+        """Cache key for a folder path under the configured root folder"""
+        return '/'.join([Config.GOOGLE_DRIVE_FOLDER_ID, *segments])
 
+    async def _resolve_folder(self, segments: List[str]) -> str:
+        """
+        Return the folder ID for a path, from cache when possible.
+        Only the segments missing from the cache cost Drive round-trips,
+        and concurrent callers share a single lookup per path.
+        """
+        if not segments:
+            return Config.GOOGLE_DRIVE_FOLDER_ID
+
+        key = self._folder_key(segments)
+        folder_id = folder_cache.get(key)
+        if folder_id is not None:
+            return folder_id
+
+        return await folder_cache.single_flight(
+            key,
+            lambda: self._lookup_or_create_folder(segments)
+        )
+
+    async def _lookup_or_create_folder(self, segments: List[str]) -> str:
+        """Find the last folder of a path under its parent, creating it if missing"""
+        parent_segments, folder_name = segments[:-1], segments[-1]
+        parent_id = await self._resolve_folder(parent_segments)
+
+        try:
             # Search for existing folder
-            query = f"name='{folder_name}' and '{current_parent}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = self._service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name)'
-            ).execute()
+            query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+            results = await self._run(
+                self._execute,
+                self._service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields='files(id, name)'
+                )
+            )
 
             # Create folder if it doesn't exist
             if not results['files']:
                 folder_metadata = {
                     'name': folder_name,
                     'mimeType': 'application/vnd.google-apps.folder',
-                    'parents': [current_parent]
+                    'parents': [parent_id]
                 }
-                folder = self._service.files().create(
-                    body=folder_metadata,
-                    fields='id'
-                ).execute()
-                current_parent = folder.get('id')
+                folder = await self._run(
+                    self._execute,
+                    self._service.files().create(
+                        body=folder_metadata,
+                        fields='id'
+                    )
+                )
+                folder_id = folder.get('id')
             else:
-                current_parent = results['files'][0]['id']
+                folder_id = results['files'][0]['id']
+        except HttpError as e:
+            if e.resp.status == 404 and parent_segments:
+                # The cached parent was deleted or trashed
+                folder_cache.invalidate(self._folder_key(parent_segments))
+            raise
 
-        return current_parent
+        folder_cache.set(self._folder_key(segments), folder_id)
+        return folder_id
 
 # Create singleton instance
 drive_service = GoogleDriveService()
 
 # Utility functions for other modules to use
-async def upload_to_drive(file: UploadFile, folder_path: str) -> str:
+async def upload_to_drive(
+    file: UploadFile,
+    folder_path: str,
+    request: Optional[HTTPRequest] = None,
+    progress: Optional[ProgressCallback] = None
+) -> str:
     """
     Upload a file to Google Drive
     Returns the file ID
     """
-    return await drive_service.upload_file(file, folder_path)
+    return await drive_service.upload_file(
+        file,
+        folder_path,
+        request=request,
+        progress=progress
+    )
 
 async def delete_from_drive(file_id: str):
     """
     Delete a file from Google Drive
     """
     await drive_service.delete_file(file_id)
+
+async def upload_many_to_drive(
+    files: List[UploadFile],
+    folder_path: str,
+    request: Optional[HTTPRequest] = None
+) -> DriveBatchResponse:
+    """
+    Upload several files to one Google Drive folder
+    Returns a result per file
+    """
+    return await drive_service.upload_files(files, folder_path, request=request)
+
+async def delete_many_from_drive(file_ids: List[str]) -> DriveBatchResponse:
+    """
+    Delete several files from Google Drive
+    Returns a result per file
+    """
+    return await drive_service.delete_files(file_ids)
+
+def authorize():
+    """
+    Run the interactive OAuth2 flow and store the resulting token.
+    This opens a browser, so it is only ever run from the command line:
+
+        python -m app.utils.google_drive
+    """
+    flow = InstalledAppFlow.from_client_config(
+        {
+            "installed": {
+                "client_id": Config.GOOGLE_CLIENT_ID,
+                "client_secret": Config.GOOGLE_CLIENT_SECRET,
+                "project_id": "buildline-portal-uploads-api",
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                "token_uri": "https://oauth2.googleapis.com/token",
+                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+                "redirect_uris": ["http://localhost"]
+            }
+        },
+        SCOPES
+    )
+    creds = flow.run_local_server(port=0)
+    drive_service._save_credentials(creds)
+    print(f"Google Drive credentials saved to {TOKEN_FILE}")
+
+if __name__ == "__main__":
+    authorize()
@@ -1,33 +1,200 @@
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from string import Formatter
+import asyncio
+import gzip
+import hashlib
 import json
+import logging
 import os
 from pathlib import Path
 from fastapi import Request
+from starlette.datastructures import MutableHeaders
 from ..config import Config
 
+logger = logging.getLogger(__name__)
+
+# Resolves dotted and indexed field names ("user.name", "items[0]")
+# the way str.format does
+_FORMATTER = Formatter()
+
+class _Template:
+    """
+    A translation compiled at load time. `text` is what get_text returns
+    without arguments; `segments` holds the parsed (literal, field,
+    conversion, format spec) parts that formatting joins, and is empty
+    when there is nothing to format.
+    """
+    __slots__ = ("source", "text", "segments")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.segments: List[Tuple[str, Optional[str], Optional[str], str]] = []
+        try:
+            parsed = list(_FORMATTER.parse(source))
+        except ValueError:
+            # Unbalanced braces: shown as written, never formatted
+            self.text = source
+            return
+
+        if all(field is None for _, field, _, _ in parsed):
+            self.text = "".join(literal for literal, _, _, _ in parsed)
+        else:
+            self.text = source
+            self.segments = [
+                (literal, field, conversion, spec or "")
+                for literal, field, spec, conversion in parsed
+            ]
+
+    def render(self, kwargs: Dict) -> str:
+        if not kwargs or not self.segments:
+            return self.text
+        parts = []
+        try:
+            for literal, field, conversion, spec in self.segments:
+                parts.append(literal)
+                if field is None:
+                    continue
+                if field in kwargs:
+                    value = kwargs[field]
+                else:
+                    value = _FORMATTER.get_field(field, (), kwargs)[0]
+                if conversion:
+                    value = _FORMATTER.convert_field(value, conversion)
+                if "{" in spec:
+                    # Nested fields, as in "{amount:{width}}"
+                    spec = spec.format(**kwargs)
+                parts.append(format(value, spec))
+        except (KeyError, IndexError, AttributeError):
+            # Return unformatted string if formatting fails
+            return self.source
+        return "".join(parts)
+
+class TranslationBundle:
+    """
+    All translations of one language, serialized and compressed once so
+    they can be served as-is
+    """
+    __slots__ = ("language", "body", "gzipped", "etag", "gzip_etag")
+
+    def __init__(self, language: str, translations: Dict):
+        self.language = language
+        self.body = json.dumps(translations, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong validators differ per encoding, since the bytes differ
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+# Seconds between checks of the translation files for changes
+TRANSLATION_RELOAD_INTERVAL = float(os.getenv("TRANSLATION_RELOAD_INTERVAL", "2"))
+
 class I18nManager:
     """
     Internationalization manager for handling translations
     """
     def __init__(self):
+        self.i18n_dir = Path(__file__).parent.parent.parent.parent / 'frontend/src/i18n'
         self.translations: Dict[str, Dict] = {}
         self.default_language = Config.DEFAULT_LANGUAGE
+        # (language, dotted key) -> template, with keys missing from a
+        # language already filled in from the default language
+        self._compiled: Dict[Tuple[str, str], _Template] = {}
+        self.bundles: Dict[str, TranslationBundle] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._watcher: Optional[asyncio.Task] = None
         self._load_translations()
+        self._compile()
 
     def _load_translations(self):
         """
-        Load all translation files from the i18n directory
+        Load all translation files from the i18n directory. A language
+        whose file cannot be read keeps the translations it already had.
         """
-        i18n_dir = Path(__file__).parent.parent.parent.parent / 'frontend/src/i18n'
-        
+        translations = dict(self.translations)
         for lang in Config.SUPPORTED_LANGUAGES:
+            path = self.i18n_dir / f'{lang}.json'
             try:
-                with open(i18n_dir / f'{lang}.json', 'r', encoding='utf-8') as f:
-                    self.translations[lang] = json.load(f)
+                self._mtimes[lang] = path.stat().st_mtime
+                with open(path, 'r', encoding='utf-8') as f:
+                    translations[lang] = json.load(f)
             except FileNotFoundError:
-                print(f"Warning: Translation file for {lang} not found")
+                logger.warning("Translation file for %s not found", lang)
             except json.JSONDecodeError:
-                print(f"Warning: Invalid JSON in translation file for {lang}")
+                logger.warning("Invalid JSON in translation file for %s", lang)
+        self.translations = translations
+
+    @staticmethod
+    def _flatten(translations: Dict, prefix: str = "") -> Dict[str, str]:
+        """Map dotted keys to the non-empty strings of a nested translation dict"""
+        flat = {}
+        for name, value in translations.items():
+            key = f"{prefix}{name}"
+            if isinstance(value, dict):
+                flat.update(I18nManager._flatten(value, f"{key}."))
+            elif isinstance(value, str) and value:
+                flat[key] = value
+        return flat
+
+    def _compile(self):
+        """
+        Build the flat lookup table, so get_text is a single dict lookup
+        """
+        fallback = self._flatten(self.translations.get(self.default_language, {}))
+        compiled = {}
+        for lang, translations in self.translations.items():
+            for key, text in {**fallback, **self._flatten(translations)}.items():
+                compiled[(lang, key)] = _Template(text)
+        self._compiled = compiled
+        self.bundles = {
+            lang: TranslationBundle(lang, translations)
+            for lang, translations in self.translations.items()
+        }
+
+    def _changed(self) -> bool:
+        """Whether any translation file was modified since it was loaded"""
+        for lang in Config.SUPPORTED_LANGUAGES:
+            try:
+                mtime = (self.i18n_dir / f'{lang}.json').stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if mtime != self._mtimes.get(lang):
+                return True
+        return False
+
+    def reload(self):
+        """
+        Re-read the translation files and swap in the new tables. Everything
+        is rebuilt before it is published, without awaiting in between, so a
+        request never sees a mix of old and new translations.
+        """
+        current = self.translations, self._compiled, self.bundles
+        try:
+            self._load_translations()
+            self._compile()
+        except Exception as e:
+            self.translations, self._compiled, self.bundles = current
+            logger.warning("Reloading translations failed: %s", e)
+
+    def start_watching(self):
+        """Reload translations whenever their files change"""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(TRANSLATION_RELOAD_INTERVAL)
+            if self._changed():
+                self.reload()
 
     def get_text(
         self,
@@ -37,7 +204,8 @@ class I18nManager:
         **kwargs
     ) -> str:
         """
-        Get translated text for a given key
+        Get translated text for a given key, falling back to the default
+        language when the requested one lacks it
         """
         # Use default language if none specified
         language = language or self.default_language
@@ -46,21 +214,12 @@ class I18nManager:
         if language not in self.translations:
             language = self.default_language
 
-        # Get translation
-        translation = self.translations.get(language, {})
-        for part in key.split('.'):
-            translation = translation.get(part, {})
-
-        if not translation or isinstance(translation, dict):
+        template = self._compiled.get((language, key))
+        if template is None:
             # Key not found or points to a nested object
             return default or key
 
-        # Format string with provided kwargs
-        try:
-            return translation.format(**kwargs)
-        except KeyError:
-            # Return unformatted string if formatting fails
-            return translation
+        return template.render(kwargs)
 
     def get_language(self, request: Request) -> str:
         """
@@ -73,11 +232,9 @@ class I18nManager:
             return lang
 
         # Check Accept-Language header
-        accept_language = request.headers.get('Accept-Language', '')
-        for lang_code in accept_language.split(','):
-            lang = lang_code.strip().split('-')[0]  # Get primary language tag
-            if lang in Config.SUPPORTED_LANGUAGES:
-                return lang
+        lang = negotiate_language(request.headers.get('Accept-Language', ''))
+        if lang is not None:
+            return lang
 
         # Check cookie
         lang = request.cookies.get('language')
@@ -87,6 +244,62 @@ class I18nManager:
         # Fall back to default
         return self.default_language
 
+# Distinct Accept-Language values remembered by negotiate_language;
+# browsers send only a handful, so hits are the common case
+LANGUAGE_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def negotiate_language(accept_language: str) -> Optional[str]:
+    """
+    Pick the supported language an Accept-Language header prefers most,
+    honouring q-values. Returns None if it accepts none of them.
+    """
+    best, best_q = None, 0.0
+    for position, item in enumerate(accept_language.split(',')):
+        tag, _, params = item.partition(';')
+        lang = tag.strip().split('-')[0].lower()  # Get primary language tag
+        if lang not in Config.SUPPORTED_LANGUAGES:
+            continue
+
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # Earlier entries win ties
+        if q > best_q:
+            best, best_q = lang, q
+    return best
+
+class LanguageMiddleware:
+    """
+    ASGI middleware that resolves the request language once and stores it
+    as request.state.language. Responses get a Vary header for the request
+    headers the language depends on, so shared caches keep one copy per
+    language.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["language"] = i18n.get_language(Request(scope))
+
+        async def send_with_vary(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.add_vary_header("Accept-Language")
+                headers.add_vary_header("Cookie")
+            await send(message)
+
+        await self.app(scope, receive, send_with_vary)
+
 # Create singleton instance
 i18n = I18nManager()
 
@@ -108,6 +321,24 @@ def get_all_translations(language: str) -> Dict:
     """
     return i18n.translations.get(language, {})
 
+def watch_translations():
+    """
+    Start reloading translations when their files change
+    """
+    i18n.start_watching()
+
+async def stop_watching_translations():
+    """
+    Stop watching the translation files
+    """
+    await i18n.stop_watching()
+
+def get_translation_bundle(language: str) -> Optional[TranslationBundle]:
+    """
+    Get the serialized translations of a language
+    """
+    return i18n.bundles.get(language)
+
 # Translation key constants
 # These help catch typos and make refactoring easier
 class TranslationKeys:
@@ -0,0 +1,300 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import secrets
+
+from sqlalchemy import Boolean, column, select, table, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .calendar import get_calendar_version, get_visible_events
+
+# Signs feed URLs; calendar apps cannot send a bearer token, so the URL
+# itself is the credential. Feeds are disabled while this is unset, and
+# rotating it revokes every issued URL. A single user's URLs are revoked by
+# replacing their calendar_feed_key.
+CALENDAR_FEED_SECRET = os.getenv("CALENDAR_FEED_SECRET")
+CALENDAR_FEED_UID_DOMAIN = os.getenv("CALENDAR_FEED_UID_DOMAIN", "calendar.local")
+
+# Events that ended longer ago than this are left out of feeds
+FEED_HISTORY = timedelta(days=90)
+# Users whose rendered feed is kept per worker
+FEED_CACHE_SIZE = 1024
+
+PRODID = "-//Project Portal//Calendar Feed//EN"
+
+event_attendees_table = table("event_attendees", column("event_id"), column("user_id"))
+event_reminders_table = table(
+    "event_reminders",
+    column("event_id"),
+    column("user_id"),
+    column("remind_at")
+)
+users_table = table("users", column("id"), column("email"), column("first_name"), column("last_name"))
+feed_keys_table = table(
+    "users",
+    column("id"),
+    column("is_active", Boolean),
+    column("calendar_feed_key")
+)
+
+def _sign(user_id: int, key: str) -> str:
+    message = f"ics:{user_id}:{key}".encode()
+    return hmac.new(CALENDAR_FEED_SECRET.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+def make_feed_token(user_id: int, key: str) -> str:
+    """Token identifying a user's feed under their current feed key"""
+    return f"{user_id}.{_sign(user_id, key)}"
+
+async def issue_feed_token(db: AsyncSession, user_id: int, reset: bool = False) -> Optional[str]:
+    """
+    Token for a user's feed, or None if feeds are not configured. The
+    user's feed key is created on first use; reset replaces it, which
+    revokes every token issued before.
+    """
+    if not CALENDAR_FEED_SECRET:
+        return None
+    keys = feed_keys_table
+    statement = update(keys).where(keys.c.id == user_id).values(calendar_feed_key=secrets.token_hex(16))
+    if not reset:
+        # Concurrent first requests agree on whichever key was stored first
+        statement = statement.where(keys.c.calendar_feed_key.is_(None))
+    await db.execute(statement)
+    key = (await db.execute(select(keys.c.calendar_feed_key).where(keys.c.id == user_id))).scalar()
+    return make_feed_token(user_id, key)
+
+async def current_feed_token(db: AsyncSession, user_id: int) -> Optional[str]:
+    """
+    Token for a user's feed under their existing feed key, or None if
+    feeds are not configured or the user has not created one. Never
+    writes.
+    """
+    if not CALENDAR_FEED_SECRET:
+        return None
+    keys = feed_keys_table
+    key = (await db.execute(select(keys.c.calendar_feed_key).where(keys.c.id == user_id))).scalar()
+    return make_feed_token(user_id, key) if key else None
+
+async def read_feed_token(db: AsyncSession, token: str) -> Optional[int]:
+    """
+    User ID of a token signed with the user's current feed key, if the
+    user still exists and is active, otherwise None
+    """
+    if not CALENDAR_FEED_SECRET:
+        return None
+    user_id, _, signature = token.partition(".")
+    if not user_id.isdigit():
+        return None
+    keys = feed_keys_table
+    user = (await db.execute(
+        select(keys.c.is_active, keys.c.calendar_feed_key).where(keys.c.id == int(user_id))
+    )).first()
+    if user is None or not user.is_active or not user.calendar_feed_key:
+        return None
+    if not hmac.compare_digest(signature, _sign(int(user_id), user.calendar_feed_key)):
+        return None
+    return int(user_id)
+
+def _escape(value: str) -> str:
+    """Escape a TEXT value (RFC 5545 3.3.11)"""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+def _fold(line: str) -> bytes:
+    """Encode a content line, folded at 75 octets (RFC 5545 3.1)"""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return data + b"\r\n"
+
+    parts, part, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > limit:
+            parts.append("".join(part))
+            part, size, limit = [], 0, 74  # continuation lines start with a space
+        part.append(char)
+        size += width
+    parts.append("".join(part))
+    return "\r\n ".join(parts).encode("utf-8") + b"\r\n"
+
+def _utc(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+_FLOATING_UNTIL = re.compile(r"(UNTIL=\d{8}T\d{6})(?=;|$)", re.IGNORECASE)
+_UNTIL_TIME = re.compile(r"(UNTIL=\d{8})T\d{6}Z?(?=;|$)", re.IGNORECASE)
+
+def _rrule(rule: str, all_day: bool = False) -> str:
+    """
+    Rule as stored, with UNTIL of the same value type as DTSTART: a UTC
+    date-time for timed events, a date for all-day events
+    """
+    if all_day:
+        return _UNTIL_TIME.sub(r"\1", rule.strip())
+    return _FLOATING_UNTIL.sub(r"\1Z", rule.strip())
+
+def _person(user: Dict[str, Any]) -> str:
+    name = " ".join(part for part in (user.get("first_name"), user.get("last_name")) if part)
+    name = name.replace('"', "'")
+    return f'CN="{name}":mailto:{user["email"]}' if name else f'mailto:{user["email"]}'
+
+def render_event(
+    event: Dict[str, Any],
+    users: Dict[int, Dict[str, Any]],
+    attendee_ids: List[int],
+    reminders: List[datetime]
+) -> bytes:
+    """One VEVENT, with its attendees and the feed owner's reminders as alarms"""
+    stamp = event.get("updated_at") or event.get("created_at") or event["start_time"]
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event['id']}@{CALENDAR_FEED_UID_DOMAIN}",
+        f"DTSTAMP:{_utc(stamp)}",
+        f"LAST-MODIFIED:{_utc(stamp)}",
+        f"SUMMARY:{_escape(event['title'])}"
+    ]
+    if event.get("is_all_day"):
+        # DTEND of an all-day event is the day after it ends
+        end_date = event["end_time"].date()
+        if end_date <= event["start_time"].date():
+            end_date = event["start_time"].date() + timedelta(days=1)
+        lines.append(f"DTSTART;VALUE=DATE:{event['start_time']:%Y%m%d}")
+        lines.append(f"DTEND;VALUE=DATE:{end_date:%Y%m%d}")
+    else:
+        lines.append(f"DTSTART:{_utc(event['start_time'])}")
+        lines.append(f"DTEND:{_utc(event['end_time'])}")
+    if event.get("rrule"):
+        lines.append(f"RRULE:{_rrule(event['rrule'], bool(event.get('is_all_day')))}")
+    if event.get("description"):
+        lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+    if event.get("location"):
+        lines.append(f"LOCATION:{_escape(event['location'])}")
+
+    creator = users.get(event.get("creator_id"))
+    if creator is not None:
+        lines.append(f"ORGANIZER;{_person(creator)}")
+    for user_id in attendee_ids:
+        attendee = users.get(user_id)
+        if attendee is not None:
+            lines.append(f"ATTENDEE;ROLE=REQ-PARTICIPANT;{_person(attendee)}")
+
+    for remind_at in reminders:
+        lines.extend([
+            "BEGIN:VALARM",
+            "ACTION:DISPLAY",
+            f"DESCRIPTION:{_escape(event['title'])}",
+            f"TRIGGER;VALUE=DATE-TIME:{_utc(remind_at)}",
+            "END:VALARM"
+        ])
+    lines.append("END:VEVENT")
+    return b"".join(_fold(line) for line in lines)
+
+FEED_HEADER = b"".join(_fold(line) for line in [
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    f"PRODID:{PRODID}",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:Project Portal",
+    "X-PUBLISHED-TTL:PT15M",
+    "REFRESH-INTERVAL;VALUE=DURATION:PT15M"
+])
+FEED_FOOTER = _fold("END:VCALENDAR")
+
+async def render_feed(db: AsyncSession, user_id: int) -> List[bytes]:
+    """
+    A user's feed as one chunk per event between the header and footer.
+    Attendees, people and reminders are read in one query each for all
+    events together.
+    """
+    events = await get_visible_events(db, user_id, start=datetime.utcnow() - FEED_HISTORY)
+    event_ids = [event["id"] for event in events]
+
+    attendees: Dict[int, List[int]] = {}
+    reminders: Dict[int, List[datetime]] = {}
+    users: Dict[int, Dict[str, Any]] = {}
+    if event_ids:
+        for event_id, attendee_id in (await db.execute(
+            select(event_attendees_table.c.event_id, event_attendees_table.c.user_id)
+            .where(event_attendees_table.c.event_id.in_(event_ids))
+        )).all():
+            attendees.setdefault(event_id, []).append(attendee_id)
+
+        for event_id, remind_at in (await db.execute(
+            select(event_reminders_table.c.event_id, event_reminders_table.c.remind_at)
+            .where(event_reminders_table.c.user_id == user_id)
+            .where(event_reminders_table.c.event_id.in_(event_ids))
+            .order_by(event_reminders_table.c.remind_at)
+        )).all():
+            reminders.setdefault(event_id, []).append(remind_at)
+
+        user_ids = {event["creator_id"] for event in events}
+        user_ids.update(user_id for ids in attendees.values() for user_id in ids)
+        result = await db.execute(
+            select(users_table).where(users_table.c.id.in_(user_ids))
+        )
+        users = {row["id"]: dict(row) for row in result.mappings()}
+
+    return [FEED_HEADER] + [
+        render_event(event, users, attendees.get(event["id"], []), reminders.get(event["id"], []))
+        for event in events
+    ] + [FEED_FOOTER]
+
+class FeedEntry:
+    """A rendered feed and the calendar version it was rendered at"""
+    def __init__(self, version: int, chunks: List[bytes]):
+        self.version = version
+        self.chunks = chunks
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk)
+        self.etag = f'"ics-{digest.hexdigest()[:32]}"'
+        self.size = sum(len(chunk) for chunk in chunks)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.chunks)
+
+class IcsFeedCache:
+    """
+    Rendered feeds per user, tagged with the calendar version they were
+    rendered at. Polls between changes are answered from memory; the first
+    poll after a change re-renders the feed once. The ETag is a digest of
+    the content, so clients of feeds the change did not touch still get
+    a 304.
+    """
+    def __init__(self, size: int = FEED_CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[int, FeedEntry]" = OrderedDict()
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def get(self, db: AsyncSession, user_id: int) -> FeedEntry:
+        version = await get_calendar_version(db, user_id)
+
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.version == version:
+            self._entries.move_to_end(user_id)
+            return entry
+
+        # One render per user at a time; concurrent polls wait for it
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.version != version:
+                entry = FeedEntry(version, await render_feed(db, user_id))
+                self._entries[user_id] = entry
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        if not lock.locked():
+            self._locks.pop(user_id, None)
+        return entry
+
+ics_feed_cache = IcsFeedCache()
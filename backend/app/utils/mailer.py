@@ -0,0 +1,344 @@
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import asyncio
+import logging
+import os
+import re
+import time
+
+import aiosmtplib
+from aiosmtplib.email import quote_address
+from aiosmtplib.protocol import SMTPProtocol
+from aiosmtplib.response import SMTPResponse
+from aiosmtplib.typing import Default, SMTPStatus, _default
+from sqlalchemy import column, select, table
+
+from ..database import get_readonly_db
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "false").lower() == "true"  # Implicit TLS, port 465
+SMTP_START_TLS = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME or "noreply@localhost")
+SMTP_TIMEOUT = 30
+
+# Connections are kept open between sends and shared by every email sent
+# from this worker
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_IDLE_TIMEOUT = 60
+# Many servers refuse further mail on a session after this many messages
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+
+SMTP_MAX_RETRIES = 3
+SMTP_RETRY_BACKOFF = 1.0
+
+# Only the columns needed to address an email
+users_table = table("users", column("id"), column("email"), column("is_active"))
+
+# DATA payload encoding (RFC 5321 4.5.2): CRLF line endings, leading dots doubled
+_LINE_ENDINGS = re.compile(rb"\r\n|\n|\r(?!\n)")
+_LEADING_PERIOD = re.compile(rb"^\.", re.MULTILINE)
+
+# PipeliningProtocol and PipeliningSMTP build on aiosmtplib internals
+# (the protocol's reply buffer and waiter, the connection's protocol
+# class, SMTP._sendmail_lock), which is why requirements.txt pins
+# aiosmtplib to an exact version.
+class PipeliningProtocol(SMTPProtocol):
+    """
+    SMTPProtocol that keeps every reply it receives. The stock protocol
+    drops replies that arrive while an earlier one is still unread, which
+    loses all but the first reply to a pipelined group of commands.
+    """
+    def data_received(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        self._resolve_waiter()
+
+    def _resolve_waiter(self) -> None:
+        """Hand the next complete reply in the buffer to the waiting reader"""
+        if self._response_waiter is None or self._response_waiter.done():
+            return
+        try:
+            response = self._read_response_from_buffer()
+        except Exception as e:
+            self._response_waiter.set_exception(e)
+        else:
+            if response is not None:
+                self._response_waiter.set_result(response)
+
+    async def read_response(self, timeout: Optional[float] = None) -> SMTPResponse:
+        response = await super().read_response(timeout=timeout)
+        # The next reply may already be buffered
+        self._resolve_waiter()
+        return response
+
+class PipeliningSMTP(aiosmtplib.SMTP):
+    """
+    SMTP client that pipelines each mail transaction when the server
+    advertises PIPELINING (RFC 2920): MAIL, every RCPT and DATA go out in
+    one write, so a message costs two round-trips instead of 3 + recipients.
+    """
+    async def _create_connection(self) -> SMTPResponse:
+        response = await super()._create_connection()
+        self.protocol.__class__ = PipeliningProtocol
+        return response
+
+    async def sendmail(
+        self,
+        sender: str,
+        recipients: Union[str, Sequence[str]],
+        message: Union[str, bytes],
+        mail_options: Optional[Iterable[str]] = None,
+        rcpt_options: Optional[Iterable[str]] = None,
+        timeout: Optional[Union[float, Default]] = _default
+    ) -> Tuple[Dict[str, SMTPResponse], str]:
+        await self._ehlo_or_helo_if_needed()
+        if not self.supports_extension("pipelining"):
+            return await super().sendmail(
+                sender, recipients, message, mail_options, rcpt_options, timeout
+            )
+
+        if isinstance(recipients, str):
+            recipients = [recipients]
+        if isinstance(message, str):
+            message = message.encode("ascii")
+        if timeout is _default:
+            timeout = self.timeout
+        mail_options = list(mail_options or [])
+        if self.supports_extension("size"):
+            mail_options.insert(0, f"size={len(message)}")
+        encoding = "utf-8" if "smtputf8" in (option.lower() for option in mail_options) else "ascii"
+
+        commands = [b" ".join([
+            b"MAIL FROM:" + quote_address(sender).encode(encoding),
+            *(option.encode("ascii") for option in mail_options)
+        ])]
+        commands += [
+            b" ".join([
+                b"RCPT TO:" + quote_address(recipient).encode(encoding),
+                *(option.encode("ascii") for option in rcpt_options or [])
+            ])
+            for recipient in recipients
+        ]
+        commands.append(b"DATA")
+
+        if self._sendmail_lock is None:
+            self._sendmail_lock = asyncio.Lock()
+        async with self._sendmail_lock:
+            try:
+                return await self._pipelined_transaction(
+                    sender, recipients, message, commands, timeout
+                )
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                try:
+                    await self.rset(timeout=timeout)
+                except (ConnectionError, aiosmtplib.SMTPResponseException):
+                    pass
+                raise
+
+    async def _pipelined_transaction(
+        self,
+        sender: str,
+        recipients: Sequence[str],
+        message: bytes,
+        commands: List[bytes],
+        timeout: Optional[float]
+    ) -> Tuple[Dict[str, SMTPResponse], str]:
+        """Write the envelope and DATA together, then read their replies"""
+        if self.protocol is None:
+            raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+        self.protocol.write(b"\r\n".join(commands) + b"\r\n")
+        replies = [await self.protocol.read_response(timeout=timeout) for _ in commands]
+        mail_reply, rcpt_replies, data_reply = replies[0], replies[1:-1], replies[-1]
+
+        if mail_reply.code != SMTPStatus.completed:
+            raise aiosmtplib.SMTPSenderRefused(mail_reply.code, mail_reply.message, sender)
+        refused = [
+            aiosmtplib.SMTPRecipientRefused(reply.code, reply.message, recipient)
+            for recipient, reply in zip(recipients, rcpt_replies)
+            if reply.code not in (SMTPStatus.completed, SMTPStatus.will_forward)
+        ]
+        if data_reply.code != SMTPStatus.start_input:
+            if len(refused) == len(recipients):
+                raise aiosmtplib.SMTPRecipientsRefused(refused)
+            raise aiosmtplib.SMTPDataError(data_reply.code, data_reply.message)
+        if len(refused) == len(recipients):
+            # The server accepted DATA without recipients; end it empty
+            self.protocol.write(b".\r\n")
+            await self.protocol.read_response(timeout=timeout)
+            raise aiosmtplib.SMTPRecipientsRefused(refused)
+
+        payload = _LEADING_PERIOD.sub(b"..", _LINE_ENDINGS.sub(b"\r\n", message))
+        if not payload.endswith(b"\r\n"):
+            payload += b"\r\n"
+        self.protocol.write(payload + b".\r\n")
+        response = await self.protocol.read_response(timeout=timeout)
+        if response.code != SMTPStatus.completed:
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+
+        return {
+            error.recipient: SMTPResponse(error.code, error.message) for error in refused
+        }, response.message
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated, kept-alive, pipelining SMTP connections
+    """
+    def __init__(self, size: int = SMTP_POOL_SIZE):
+        self.size = size
+        self._slots = asyncio.Semaphore(size)
+        # (client, last used, messages sent on it), most recent last
+        self._idle: List[Tuple[aiosmtplib.SMTP, float, int]] = []
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncGenerator[aiosmtplib.SMTP, None]:
+        """
+        Borrow a connection. It is returned to the pool afterwards unless
+        the send failed, in which case it is closed.
+        """
+        async with self._slots:
+            client, sent = await self._checkout()
+            try:
+                yield client
+            except Exception:
+                await self._close(client)
+                raise
+
+            sent += 1
+            if client.is_connected and sent < SMTP_MAX_MESSAGES_PER_CONNECTION:
+                self._idle.append((client, time.monotonic(), sent))
+            else:
+                await self._close(client)
+
+    async def _checkout(self) -> Tuple[aiosmtplib.SMTP, int]:
+        """Reuse the most recently used live connection, or open a new one"""
+        while self._idle:
+            client, last_used, sent = self._idle.pop()
+            if client.is_connected and time.monotonic() - last_used < SMTP_IDLE_TIMEOUT:
+                return client, sent
+            await self._close(client)
+
+        client = PipeliningSMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            username=SMTP_USERNAME,
+            password=SMTP_PASSWORD,
+            use_tls=SMTP_USE_TLS,
+            start_tls=SMTP_START_TLS and not SMTP_USE_TLS,
+            timeout=SMTP_TIMEOUT
+        )
+        await client.connect()
+        return client, 0
+
+    async def _close(self, client: aiosmtplib.SMTP):
+        """Close a connection, ignoring errors from an already broken one"""
+        try:
+            if client.is_connected:
+                await client.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            # OSError covers ConnectionResetError from a server that hung up
+            client.close()
+
+    async def close(self):
+        """Close every idle connection"""
+        idle, self._idle = self._idle, []
+        for client, _, _ in idle:
+            await self._close(client)
+
+smtp_pool = SMTPConnectionPool()
+
+def build_email(
+    to_address: str,
+    subject: str,
+    body: str,
+    message_id: Optional[str] = None
+) -> EmailMessage:
+    """
+    Build a plain-text email. A fixed message_id lets mail servers and
+    clients recognise a redelivered copy of the same email.
+    """
+    message = EmailMessage()
+    message["From"] = SMTP_FROM
+    message["To"] = to_address
+    message["Subject"] = subject
+    if message_id is not None:
+        domain = SMTP_FROM.rpartition("@")[2] or "localhost"
+        message["Message-ID"] = f"<{message_id}@{domain}>"
+    message.set_content(body)
+    return message
+
+def _is_retryable(error: Exception) -> bool:
+    """Transient failures: dropped connections, timeouts and 4xx replies"""
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return isinstance(error, (
+        aiosmtplib.SMTPServerDisconnected,
+        aiosmtplib.SMTPConnectError,
+        aiosmtplib.SMTPTimeoutError,
+        OSError
+    ))
+
+async def send_email(message: EmailMessage) -> bool:
+    """
+    Send one email over a pooled connection, retrying transient failures
+    with exponential backoff. Returns whether it was accepted.
+    """
+    for attempt in range(SMTP_MAX_RETRIES + 1):
+        try:
+            async with smtp_pool.connection() as client:
+                await client.send_message(message)
+            return True
+        except Exception as e:
+            if not _is_retryable(e) or attempt == SMTP_MAX_RETRIES:
+                logger.error("Failed to send email to %s: %s", message['To'], e)
+                return False
+            await asyncio.sleep(SMTP_RETRY_BACKOFF * 2 ** attempt)
+    return False
+
+async def send_emails(messages: Iterable[EmailMessage]) -> Dict[str, Any]:
+    """
+    Send many emails back to back over the pool's kept-alive connections,
+    one sender per pooled connection. Returns sent and failed counts, and
+    the addresses of the failed emails as failed_to.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+
+    stats = {"sent": 0, "failed": 0, "failed_to": []}
+
+    async def sender():
+        while not queue.empty():
+            message = queue.get_nowait()
+            if await send_email(message):
+                stats["sent"] += 1
+            else:
+                stats["failed"] += 1
+                stats["failed_to"].append(message["To"])
+
+    await asyncio.gather(*(sender() for _ in range(min(smtp_pool.size, queue.qsize()))))
+    return stats
+
+async def get_user_emails(user_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Look up the email addresses of active users in a single query
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    async with get_readonly_db() as db:
+        result = await db.execute(
+            select(users_table.c.id, users_table.c.email)
+            .where(users_table.c.id.in_(user_ids))
+            .where(users_table.c.is_active.is_(True))
+        )
+        return {user_id: email for user_id, email in result}
+
+async def close_mailer():
+    """Close pooled SMTP connections"""
+    await smtp_pool.close()
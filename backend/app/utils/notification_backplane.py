@@ -0,0 +1,144 @@
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Set
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# redis://host:port/db to share notifications between workers; unset keeps
+# delivery inside the current process
+NOTIFICATION_BACKPLANE_URL = os.getenv("NOTIFICATION_BACKPLANE_URL")
+CHANNEL_PREFIX = "buildline:notifications"
+
+# Called with (user_id, serialized message) on the worker holding the
+# user's sockets
+DeliverCallback = Callable[[int, str], Awaitable[None]]
+
+class Backplane(ABC):
+    """
+    Carries notifications to the worker that holds the recipient's
+    sockets. The connection manager binds its delivery callback when it
+    is created, subscribes a user when their first socket connects to
+    this worker and unsubscribes them when the last one closes.
+    """
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+
+    def bind(self, deliver: DeliverCallback):
+        """Set the callback that delivers messages to local sockets"""
+        self._deliver = deliver
+
+    async def start(self, deliver: DeliverCallback):
+        self.bind(deliver)
+
+    async def stop(self):
+        pass
+
+    async def subscribe(self, user_id: int):
+        pass
+
+    async def unsubscribe(self, user_id: int):
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: int, message: str):
+        """Send a serialized message to every socket of a user"""
+
+class InProcessBackplane(Backplane):
+    """
+    Single-process backplane: messages are handed straight to the local
+    connection manager. Needs no start(), only a bound callback.
+    """
+    async def publish(self, user_id: int, message: str):
+        if self._deliver is None:
+            raise RuntimeError(
+                "InProcessBackplane has no delivery callback; "
+                "bind() it to a connection manager first"
+            )
+        await self._deliver(user_id, message)
+
+class RedisBackplane(Backplane):
+    """
+    Redis pub/sub backplane with one channel per user. A worker only
+    subscribes to the channels of users connected to it, so Redis routes
+    each message to the workers that can actually deliver it.
+    Pass a client (e.g. a fakeredis instance) to use a stand-in server.
+    """
+    def __init__(self, url: Optional[str] = None, client=None):
+        super().__init__()
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed: Set[int] = set()
+
+    @staticmethod
+    def channel(user_id: int) -> str:
+        return f"{CHANNEL_PREFIX}:user:{user_id}"
+
+    async def start(self, deliver: DeliverCallback):
+        await super().start(deliver)
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        # Keeps the pub/sub connection open while no user is connected
+        await self._pubsub.subscribe(f"{CHANNEL_PREFIX}:workers")
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribed.clear()
+
+    async def subscribe(self, user_id: int):
+        if self._pubsub is None:
+            raise RuntimeError("RedisBackplane.start() must be called before subscribing users")
+        if user_id not in self._subscribed:
+            self._subscribed.add(user_id)
+            await self._pubsub.subscribe(self.channel(user_id))
+
+    async def unsubscribe(self, user_id: int):
+        if user_id in self._subscribed:
+            self._subscribed.discard(user_id)
+            await self._pubsub.unsubscribe(self.channel(user_id))
+
+    async def publish(self, user_id: int, message: str):
+        await self.client.publish(self.channel(user_id), message)
+
+    async def _listen(self):
+        """Hand messages for locally connected users to the manager"""
+        prefix = f"{CHANNEL_PREFIX}:user:"
+        while True:
+            try:
+                async for item in self._pubsub.listen():
+                    channel = item["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    if not channel.startswith(prefix):
+                        continue
+                    data = item["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    await self._deliver(int(channel[len(prefix):]), data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Notification backplane listener failed: %s", e)
+                await asyncio.sleep(1)
+
+def create_backplane() -> Backplane:
+    """
+    Backplane selected by NOTIFICATION_BACKPLANE_URL
+    """
+    if NOTIFICATION_BACKPLANE_URL:
+        return RedisBackplane(NOTIFICATION_BACKPLANE_URL)
+    return InProcessBackplane()
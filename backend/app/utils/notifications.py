@@ -1,12 +1,19 @@
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from uuid import uuid4
 import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..routes.notifications import notification_manager
 from ..config import Config
+from ..models.notification_outbox import NotificationOutbox
+from .mailer import build_email, get_user_emails, send_email, send_emails
+
+# Bulk fan-out limits: in-app messages go out this many at a time, and
+# email recipients are grouped so that each group shares one SMTP session
+IN_APP_BATCH_SIZE = 200
+EMAIL_BATCH_SIZE = 100
+MAX_CONCURRENT_EMAIL_BATCHES = 4
 
 class NotificationType(Enum):
     PROJECT_CREATED = "project_created"
@@ -47,14 +54,7 @@ async def send_notification(
     """
     Send a notification to a user through specified channels
     """
-    notification = {
-        "type": notification_type.value,
-        "title": title,
-        "message": message,
-        "priority": priority.value,
-        "timestamp": datetime.utcnow().isoformat(),
-        "data": data or {}
-    }
+    notification = build_notification(notification_type, title, message, data, priority)
 
     tasks = []
 
@@ -73,6 +73,30 @@ async def send_notification(
     # Execute all notification tasks concurrently
     await asyncio.gather(*tasks)
 
+def build_notification(
+    notification_type: NotificationType,
+    title: str,
+    message: str,
+    data: Optional[Dict[str, Any]] = None,
+    priority: NotificationPriority = NotificationPriority.MEDIUM,
+    notification_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build the in-app notification payload
+    """
+    notification = {
+        "type": notification_type.value,
+        "title": title,
+        "message": message,
+        "priority": priority.value,
+        "timestamp": datetime.utcnow().isoformat(),
+        "data": data or {}
+    }
+    if notification_id is not None:
+        # Lets clients drop a notification redelivered by the outbox
+        notification["id"] = notification_id
+    return notification
+
 async def send_email_notification(
     user_id: int,
     subject: str,
@@ -82,12 +106,100 @@ async def send_email_notification(
     """
     Send an email notification
     """
-    # TODO: Implement email sending logic
-    # This is a placeholder for email sending functionality
-    # In production, you would:
-    # 1. Get user's email from database
-    # 2. Use SMTP or email service (like SendGrid) to send the email
-    pass
+    emails = await get_user_emails([user_id])
+    if user_id not in emails:
+        return
+    if not await send_email(build_email(emails[user_id], subject, message)):
+        raise RuntimeError(f"Failed to send email notification to user {user_id}")
+
+async def send_bulk_email_notification(
+    user_ids: List[int],
+    subject: str,
+    message: str,
+    notification_type: NotificationType,
+    notification_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Send the same email notification to a group of users over pooled SMTP
+    sessions, looking up all their addresses in one query.
+    Returns sent and failed counts and the failed users; users without an
+    address are skipped. With a notification_id, each email gets a
+    Message-ID derived from it, the same on every redelivery.
+    """
+    emails = await get_user_emails(user_ids)
+    stats = await send_emails(
+        build_email(
+            emails[user_id],
+            subject,
+            message,
+            message_id=f"{notification_id}.{user_id}" if notification_id else None
+        )
+        for user_id in user_ids
+        if user_id in emails
+    )
+    failed_to = set(stats["failed_to"])
+    return {
+        "sent": stats["sent"],
+        "failed": stats["failed"],
+        "failed_user_ids": [
+            user_id for user_id in user_ids if emails.get(user_id) in failed_to
+        ]
+    }
+
+async def _deliver_in_app(user_ids: List[int], notification: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Push one prepared payload to many users, IN_APP_BATCH_SIZE at a time
+    """
+    stats = {"sent": 0, "failed": 0, "failed_user_ids": []}
+    for start in range(0, len(user_ids), IN_APP_BATCH_SIZE):
+        batch = user_ids[start:start + IN_APP_BATCH_SIZE]
+        results = await asyncio.gather(
+            *(notification_manager.send_personal_notification(user_id, notification)
+              for user_id in batch),
+            return_exceptions=True
+        )
+        failed = [
+            user_id for user_id, result in zip(batch, results)
+            if isinstance(result, Exception)
+        ]
+        stats["sent"] += len(batch) - len(failed)
+        stats["failed"] += len(failed)
+        stats["failed_user_ids"] += failed
+    return stats
+
+async def _deliver_email(
+    user_ids: List[int],
+    subject: str,
+    message: str,
+    notification_type: NotificationType,
+    notification_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Send one email to many users in EMAIL_BATCH_SIZE groups, with at most
+    MAX_CONCURRENT_EMAIL_BATCHES groups in flight
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_EMAIL_BATCHES)
+
+    async def send_batch(batch: List[int]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await send_bulk_email_notification(
+                    batch, subject, message, notification_type, notification_id
+                )
+            except Exception:
+                return {"sent": 0, "failed": len(batch), "failed_user_ids": batch}
+
+    results = await asyncio.gather(*(
+        send_batch(user_ids[start:start + EMAIL_BATCH_SIZE])
+        for start in range(0, len(user_ids), EMAIL_BATCH_SIZE)
+    ))
+    return {
+        "sent": sum(result["sent"] for result in results),
+        "failed": sum(result["failed"] for result in results),
+        "failed_user_ids": [
+            user_id for result in results for user_id in result["failed_user_ids"]
+        ]
+    }
 
 async def send_bulk_notification(
     user_ids: list[int],
@@ -96,26 +208,99 @@ async def send_bulk_notification(
     message: str,
     data: Optional[Dict[str, Any]] = None,
     priority: NotificationPriority = NotificationPriority.MEDIUM,
+    channel: NotificationChannel = NotificationChannel.BOTH,
+    notification_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Send notifications to multiple users.
+    The payload is built once and shared by every recipient; in-app and
+    email delivery run side by side, each with bounded concurrency.
+    Returns delivery counts per channel, and per channel the users it
+    failed to reach (in_app_failed_user_ids, email_failed_user_ids).
+    """
+    recipients = list(dict.fromkeys(user_ids))  # De-duplicate, keep order
+    notification = build_notification(
+        notification_type, title, message, data, priority, notification_id
+    )
+
+    stats = {
+        "recipients": len(recipients),
+        "in_app_sent": 0,
+        "in_app_failed": 0,
+        "email_sent": 0,
+        "email_failed": 0,
+        "in_app_failed_user_ids": [],
+        "email_failed_user_ids": []
+    }
+
+    deliveries = {}
+    if channel in [NotificationChannel.IN_APP, NotificationChannel.BOTH]:
+        deliveries["in_app"] = _deliver_in_app(recipients, notification)
+    if channel in [NotificationChannel.EMAIL, NotificationChannel.BOTH]:
+        deliveries["email"] = _deliver_email(
+            recipients, title, message, notification_type, notification_id
+        )
+
+    results = await asyncio.gather(*deliveries.values())
+    for name, result in zip(deliveries, results):
+        stats[f"{name}_sent"] = result["sent"]
+        stats[f"{name}_failed"] = result["failed"]
+        stats[f"{name}_failed_user_ids"] = result["failed_user_ids"]
+
+    return stats
+
+def enqueue_notification(
+    db: AsyncSession,
+    user_ids: List[int],
+    notification_type: NotificationType,
+    title: str,
+    message: str,
+    data: Optional[Dict[str, Any]] = None,
+    priority: NotificationPriority = NotificationPriority.MEDIUM,
+    channel: NotificationChannel = NotificationChannel.BOTH,
+    idempotency_key: Optional[str] = None
+) -> NotificationOutbox:
+    """
+    Record a notification in the outbox as part of the caller's transaction.
+    It is delivered by the outbox dispatcher once that transaction commits,
+    and not at all if it rolls back.
+    """
+    entry = NotificationOutbox(
+        idempotency_key=idempotency_key or uuid4().hex,
+        user_ids=list(user_ids),
+        notification_type=notification_type.value,
+        title=title,
+        message=message,
+        data=data or {},
+        priority=priority.value,
+        channel=channel.value
+    )
+    db.add(entry)
+    db.info["outbox_pending"] = True
+    return entry
+
+async def _notify(
+    db: Optional[AsyncSession],
+    user_ids: List[int],
+    notification_type: NotificationType,
+    title: str,
+    message: str,
+    data: Optional[Dict[str, Any]] = None,
+    priority: NotificationPriority = NotificationPriority.MEDIUM,
     channel: NotificationChannel = NotificationChannel.BOTH
 ) -> None:
     """
-    Send notifications to multiple users
+    Queue the notification in the outbox when a session is given,
+    otherwise deliver it right away
     """
-    tasks = [
-        send_notification(
-            user_id,
-            notification_type,
-            title,
-            message,
-            data,
-            priority,
-            channel
-        )
-        for user_id in user_ids
-    ]
-    await asyncio.gather(*tasks)
+    if db is not None:
+        enqueue_notification(db, user_ids, notification_type, title, message, data, priority, channel)
+    else:
+        await send_bulk_notification(user_ids, notification_type, title, message, data, priority, channel)
 
 # Specific notification functions for different events
+# Pass the request's session as db to queue the notification in the same
+# transaction as the change instead of delivering it inside the request.
 
 async def notify_project_update(
     project_id: int,
@@ -123,7 +308,8 @@ async def notify_project_update(
     update_type: str,
     title: str,
     message: str,
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[Dict[str, Any]] = None,
+    db: Optional[AsyncSession] = None
 ) -> None:
     """
     Notify users about project updates
@@ -134,7 +320,8 @@ async def notify_project_update(
         NotificationType.SYSTEM
     )
     
-    await send_bulk_notification(
+    await _notify(
+        db,
         user_ids,
         notification_type,
         title,
@@ -152,7 +339,8 @@ async def notify_event_update(
     update_type: str,
     title: str,
     message: str,
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[Dict[str, Any]] = None,
+    db: Optional[AsyncSession] = None
 ) -> None:
     """
     Notify users about event updates
@@ -163,7 +351,8 @@ async def notify_event_update(
         NotificationType.SYSTEM
     )
     
-    await send_bulk_notification(
+    await _notify(
+        db,
         user_ids,
         notification_type,
         title,
@@ -181,12 +370,14 @@ async def notify_file_upload(
     user_ids: list[int],
     title: str,
     message: str,
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[Dict[str, Any]] = None,
+    db: Optional[AsyncSession] = None
 ) -> None:
     """
     Notify users about file uploads
     """
-    await send_bulk_notification(
+    await _notify(
+        db,
         user_ids,
         NotificationType.FILE_UPLOADED,
         title,
@@ -202,11 +393,25 @@ async def send_reminder(
     user_id: int,
     title: str,
     message: str,
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[Dict[str, Any]] = None,
+    db: Optional[AsyncSession] = None
 ) -> None:
     """
     Send a reminder notification
     """
+    if db is not None:
+        enqueue_notification(
+            db,
+            [user_id],
+            NotificationType.REMINDER,
+            title,
+            message,
+            data,
+            priority=NotificationPriority.HIGH,
+            channel=NotificationChannel.BOTH
+        )
+        return
+
     await send_notification(
         user_id,
         NotificationType.REMINDER,
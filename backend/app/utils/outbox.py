@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from ..database import AsyncSessionLocal
+from ..models.notification_outbox import NotificationOutbox
+from .notifications import (
+    NotificationChannel,
+    NotificationPriority,
+    NotificationType,
+    send_bulk_notification
+)
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_POLL_INTERVAL = 2.0
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_BACKOFF = 5.0
+# A claimed row is hidden from other workers this long. If its worker dies
+# mid-delivery, the row is picked up again once the claim runs out.
+OUTBOX_CLAIM_TIMEOUT = 300
+
+class OutboxDispatcher:
+    """
+    Background task that drains the notification outbox in batches.
+    Rows are claimed in a short transaction: SELECT ... FOR UPDATE SKIP
+    LOCKED, then available_at is pushed OUTBOX_CLAIM_TIMEOUT ahead and the
+    claim is committed, so no lock is held while sending. The outcome is
+    written back afterwards: dispatched, or rescheduled with backoff for
+    just the recipients that were not reached.
+    Delivery is at-least-once: a worker that dies after sending but before
+    recording the outcome leaves the row to be sent again when its claim
+    expires. In-app messages carry the idempotency key as their ID and
+    emails a Message-ID derived from it, so redeliveries can be dropped.
+    """
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Dispatch right away instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                dispatched = await self.dispatch_batch()
+            except Exception as e:
+                logger.error("Notification outbox dispatch failed: %s", e)
+                dispatched = 0
+
+            if dispatched < OUTBOX_BATCH_SIZE:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def dispatch_batch(self) -> int:
+        """
+        Deliver one batch of pending notifications.
+        Returns the number of rows handled.
+        """
+        entries = await self._claim_batch()
+        for entry in entries:
+            await self._deliver(entry)
+        return len(entries)
+
+    async def _claim_batch(self) -> List[NotificationOutbox]:
+        """Claim a batch of due rows, committing the claim before delivery"""
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+            entries = (await db.execute(
+                select(NotificationOutbox)
+                .where(NotificationOutbox.dispatched_at.is_(None))
+                .where(NotificationOutbox.available_at <= now)
+                .where(NotificationOutbox.attempts < OUTBOX_MAX_ATTEMPTS)
+                .order_by(NotificationOutbox.id)
+                .limit(OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            for entry in entries:
+                entry.attempts += 1
+                entry.available_at = now + timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)
+            await db.commit()
+            return entries
+
+    def _pending(self, entry: NotificationOutbox) -> Dict[str, List[int]]:
+        """Users still to be reached, per channel"""
+        if entry.pending is not None:
+            return entry.pending
+        channel = NotificationChannel(entry.channel)
+        pending = {}
+        if channel in [NotificationChannel.IN_APP, NotificationChannel.BOTH]:
+            pending[NotificationChannel.IN_APP.value] = entry.user_ids
+        if channel in [NotificationChannel.EMAIL, NotificationChannel.BOTH]:
+            pending[NotificationChannel.EMAIL.value] = entry.user_ids
+        return pending
+
+    async def _deliver(self, entry: NotificationOutbox):
+        """
+        Send one claimed entry to the users it has not reached yet, one
+        channel at a time, and record the outcome
+        """
+        remaining = {}
+        errors = []
+        for channel, user_ids in self._pending(entry).items():
+            if not user_ids:
+                continue
+            try:
+                stats = await send_bulk_notification(
+                    user_ids,
+                    NotificationType(entry.notification_type),
+                    entry.title,
+                    entry.message,
+                    entry.data,
+                    NotificationPriority(entry.priority),
+                    NotificationChannel(channel),
+                    notification_id=entry.idempotency_key
+                )
+            except Exception as e:
+                remaining[channel] = user_ids
+                errors.append(str(e))
+            else:
+                failed = stats[f"{channel}_failed_user_ids"]
+                if failed:
+                    remaining[channel] = failed
+                    errors.append(f"{len(failed)} {channel} deliveries failed")
+
+        now = datetime.utcnow()
+        if remaining:
+            values = {
+                "pending": remaining,
+                "last_error": "; ".join(errors),
+                "available_at": now + timedelta(
+                    seconds=OUTBOX_RETRY_BACKOFF * 2 ** (entry.attempts - 1)
+                )
+            }
+            logger.warning(
+                "Notification %s failed (attempt %d): %s",
+                entry.idempotency_key, entry.attempts, values["last_error"]
+            )
+        else:
+            values = {"pending": None, "dispatched_at": now}
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id == entry.id)
+                .values(**values)
+            )
+            await db.commit()
+
+outbox_dispatcher = OutboxDispatcher()
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    """Dispatch notifications queued by a transaction as soon as it commits"""
+    if session.info.pop("outbox_pending", False):
+        outbox_dispatcher.wake()
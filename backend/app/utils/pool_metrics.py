@@ -0,0 +1,135 @@
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+
+# Number of recent checkout wait samples kept per engine
+WAIT_SAMPLE_SIZE = 1000
+
+class PoolMetrics:
+    """
+    Connection pool instrumentation for one engine: checkout counts, time
+    spent waiting for a connection, overflow usage and connection age
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.checkouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.connected_at: Dict[int, float] = {}
+
+    def attach(self, engine: AsyncEngine):
+        """
+        Listen to pool events of an engine. The listeners carry over when
+        the pool is recreated, e.g. by engine.dispose().
+        """
+        self.engine = engine
+        pool = engine.sync_engine.pool
+        self.attach_pool(pool)
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self.connected_at[id(connection_record)] = time.monotonic()
+
+        @event.listens_for(pool, "close")
+        def on_close(dbapi_connection, connection_record):
+            self.connected_at.pop(id(connection_record), None)
+
+        @event.listens_for(pool, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+    def attach_pool(self, pool: Pool):
+        """Have a pool report its checkout waits here"""
+        pool._metrics = self
+
+    def record_wait(self, seconds: float):
+        """Record how long a checkout waited for a connection"""
+        self.waits.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current pool state and recent statistics"""
+        pool = self.engine.sync_engine.pool
+        now = time.monotonic()
+        ages = [now - connected for connected in self.connected_at.values()]
+        waits = sorted(self.waits)
+
+        return {
+            "name": self.name,
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": max(0, self.peak_overflow),
+            "checkouts": self.checkouts,
+            "wait_seconds": {
+                "samples": len(waits),
+                "avg": sum(waits) / len(waits) if waits else 0.0,
+                "p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "max": waits[-1] if waits else 0.0
+            },
+            "connection_age_seconds": {
+                "connections": len(ages),
+                "avg": sum(ages) / len(ages) if ages else 0.0,
+                "max": max(ages) if ages else 0.0
+            }
+        }
+
+class _TimedQueue(AsyncAdaptedQueue):
+    """Pool queue remembering how long its last get waited"""
+    waited = 0.0
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        started = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.waited = time.perf_counter() - started
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that reports how long each checkout waited for a
+    free connection, and keeps reporting after it is recreated. Opening a
+    new connection happens after the queue is found empty, so it is not
+    counted as waiting.
+    """
+    _queue_class = _TimedQueue
+    _metrics = None
+
+    def _do_get(self):
+        self._pool.waited = 0.0
+        try:
+            return super()._do_get()
+        finally:
+            if self._metrics is not None:
+                self._metrics.record_wait(self._pool.waited)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        if self._metrics is not None:
+            self._metrics.attach_pool(pool)
+        return pool
+
+# Metrics of every instrumented engine, by name
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+def instrument_engine(name: str, engine: AsyncEngine) -> PoolMetrics:
+    """Start collecting pool metrics for an engine"""
+    metrics = PoolMetrics(name)
+    metrics.attach(engine)
+    pool_metrics[name] = metrics
+    return metrics
+
+def get_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every instrumented pool"""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
@@ -0,0 +1,239 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+
+from sqlalchemy import DateTime, column, select, table, update
+
+from ..database import AsyncSessionLocal
+from .notifications import (
+    NOTIFICATION_TEMPLATES,
+    NotificationChannel,
+    NotificationPriority,
+    NotificationType,
+    enqueue_notification
+)
+
+logger = logging.getLogger(__name__)
+
+# Reminders due within this window are held in memory; the window is
+# topped up every REMINDER_LOAD_INTERVAL, so the database is read once per
+# interval rather than once per reminder
+REMINDER_WINDOW = timedelta(minutes=10)
+REMINDER_LOAD_INTERVAL = 60.0
+REMINDER_BATCH_SIZE = 200
+# After a failed load or fire, wait this long before trying again,
+# doubling on each further failure up to REMINDER_LOAD_INTERVAL
+REMINDER_RETRY_BACKOFF = 1.0
+
+# Reminders missed while no worker was running are still sent, unless
+# they are older than this or the event's last occurrence is already over
+REMINDER_CATCH_UP = timedelta(hours=24)
+
+# Only the columns the scheduler reads and writes; datetimes are typed so
+# every driver returns them as datetime objects
+event_reminders_table = table(
+    "event_reminders",
+    column("id"),
+    column("event_id"),
+    column("user_id"),
+    column("remind_at", DateTime),
+    column("notification_type"),
+    column("notification_sent")
+)
+events_table = table(
+    "events",
+    column("id"),
+    column("title"),
+    column("start_time", DateTime),
+    column("occurs_until", DateTime)
+)
+
+REMINDER_CHANNELS = {
+    "email": NotificationChannel.EMAIL,
+    "in-app": NotificationChannel.IN_APP,
+    "both": NotificationChannel.BOTH
+}
+
+class ReminderScheduler:
+    """
+    Fires event reminders at their remind_at time.
+
+    Unsent reminders due within the next REMINDER_WINDOW are kept in a heap
+    ordered by remind_at, so the scheduler sleeps until the earliest one
+    instead of polling the table. Overdue reminders are picked up by the
+    same query, which is how reminders missed during downtime catch up.
+
+    Every worker runs a scheduler over the same window. Due reminders are
+    claimed with SELECT ... FOR UPDATE SKIP LOCKED and flagged
+    notification_sent in the transaction that queues their notifications in
+    the outbox, so each reminder is sent by exactly one worker.
+    """
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._heap: List[Tuple[datetime, int]] = []
+        # remind_at of each reminder in the heap, to skip stale entries
+        self._scheduled: Dict[int, datetime] = {}
+        self._horizon: Optional[datetime] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, reminder_id: int, remind_at: datetime):
+        """
+        Track a reminder created or moved after the window was loaded.
+        Optional: the next load finds it anyway, at most
+        REMINDER_LOAD_INTERVAL late.
+        """
+        if self._horizon is not None and remind_at < self._horizon:
+            self._push(reminder_id, remind_at)
+            self._wakeup.set()
+
+    def _push(self, reminder_id: int, remind_at: datetime):
+        if self._scheduled.get(reminder_id) != remind_at:
+            self._scheduled[reminder_id] = remind_at
+            heapq.heappush(self._heap, (remind_at, reminder_id))
+
+    async def _run(self):
+        next_load = 0.0
+        failures = 0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if loop.time() >= next_load:
+                    await self.load_window()
+                    next_load = loop.time() + REMINDER_LOAD_INTERVAL
+                await self.fire_due()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                # Reload once the backoff is over: reminders taken off the
+                # heap by a failed fire are only found in the table again
+                next_load = loop.time() + min(
+                    REMINDER_LOAD_INTERVAL,
+                    REMINDER_RETRY_BACKOFF * 2 ** (failures - 1)
+                )
+                logger.error("Reminder scheduler failed (attempt %d): %s", failures, e)
+
+            timeout = next_load - loop.time()
+            if self._heap and not failures:
+                until_due = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                timeout = min(timeout, until_due)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def load_window(self) -> int:
+        """
+        Load unsent reminders due before the end of the next window.
+        Returns the number of reminders loaded.
+        """
+        horizon = datetime.utcnow() + REMINDER_WINDOW
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(event_reminders_table.c.id, event_reminders_table.c.remind_at)
+                .where(event_reminders_table.c.notification_sent.is_(False))
+                .where(event_reminders_table.c.remind_at < horizon)
+            )
+            rows = result.all()
+
+        for reminder_id, remind_at in rows:
+            self._push(reminder_id, remind_at)
+        self._horizon = horizon
+        return len(rows)
+
+    async def fire_due(self) -> int:
+        """
+        Send every reminder in the heap that is due.
+        Returns the number of reminders sent by this worker.
+        """
+        now = datetime.utcnow()
+        due: List[int] = []
+        while self._heap and self._heap[0][0] <= now:
+            remind_at, reminder_id = heapq.heappop(self._heap)
+            if self._scheduled.get(reminder_id) == remind_at:
+                del self._scheduled[reminder_id]
+                due.append(reminder_id)
+
+        sent = 0
+        for start in range(0, len(due), REMINDER_BATCH_SIZE):
+            sent += await self._fire_batch(due[start:start + REMINDER_BATCH_SIZE], now)
+        return sent
+
+    async def _fire_batch(self, reminder_ids: List[int], now: datetime) -> int:
+        """
+        Claim a batch of due reminders, queue their notifications and mark
+        them sent in one transaction. Reminders that another worker holds,
+        has already sent, or that were moved later are skipped.
+        """
+        reminders = event_reminders_table
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(
+                    reminders.c.id,
+                    reminders.c.user_id,
+                    reminders.c.remind_at,
+                    reminders.c.notification_type,
+                    events_table.c.id.label("event_id"),
+                    events_table.c.title,
+                    events_table.c.start_time,
+                    events_table.c.occurs_until
+                )
+                .join(events_table, events_table.c.id == reminders.c.event_id)
+                .where(reminders.c.id.in_(reminder_ids))
+                .where(reminders.c.notification_sent.is_(False))
+                .where(reminders.c.remind_at <= now)
+                .with_for_update(skip_locked=True, of=reminders)
+            )).all()
+            if not rows:
+                await db.rollback()
+                return 0
+
+            # One outbox entry per event and channel, addressed to every
+            # user with a reminder for it in this batch
+            groups: Dict[Tuple[int, NotificationChannel], list] = {}
+            for row in rows:
+                if row.remind_at < now - REMINDER_CATCH_UP or (row.occurs_until and row.occurs_until < now):
+                    continue
+                channel = REMINDER_CHANNELS.get(row.notification_type, NotificationChannel.BOTH)
+                groups.setdefault((row.event_id, channel), []).append(row)
+
+            template = NOTIFICATION_TEMPLATES["event_reminder"]
+            for (event_id, channel), group in groups.items():
+                event = group[0]
+                minutes = max(0, int((event.start_time - now).total_seconds() // 60))
+                enqueue_notification(
+                    db,
+                    [row.user_id for row in group],
+                    NotificationType.REMINDER,
+                    template["title"],
+                    template["message"].format(event_title=event.title, time_until=minutes),
+                    data={"event_id": event_id, "start_time": event.start_time.isoformat()},
+                    priority=NotificationPriority.HIGH,
+                    channel=channel
+                )
+
+            await db.execute(
+                update(reminders)
+                .where(reminders.c.id.in_([row.id for row in rows]))
+                .values(notification_sent=True)
+            )
+            await db.commit()
+
+        return sum(len(group) for group in groups.values())
+
+reminder_scheduler = ReminderScheduler()
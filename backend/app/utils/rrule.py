@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+import re
+
+from dateutil.rrule import rrule, rrulestr
+
+# occurs_until of a series without COUNT or UNTIL
+OPEN_ENDED = datetime(9999, 12, 31)
+# Occurrences of a finite series walked to find its end; longer series are
+# treated as open-ended
+MAX_SERIES_SCAN = 10000
+
+_UTC_UNTIL = re.compile(r"(UNTIL=\d{8}T\d{6})Z", re.IGNORECASE)
+
+def parse_rrule(rule: str, start_time: datetime) -> rrule:
+    """
+    Parse an RFC 5545 recurrence rule for a series starting at start_time.
+    Times are stored as naive UTC, so a UTC UNTIL is read the same way.
+    Raises ValueError for an invalid rule, and for anything but a single
+    RRULE (EXDATE, RDATE or several rules parse to a set instead).
+    """
+    series = rrulestr(_UTC_UNTIL.sub(r"\1", rule.strip()), dtstart=start_time, forceset=False)
+    if not isinstance(series, rrule):
+        raise ValueError("Only a single RRULE is supported")
+    return series
+
+def compute_occurs_until(start_time: datetime, end_time: datetime, rule: Optional[str]) -> datetime:
+    """End of the last occurrence of an event"""
+    if not rule:
+        return end_time
+    series = parse_rrule(rule, start_time)
+    if series._count is None and series._until is None:
+        return OPEN_ENDED
+
+    last = None
+    for count, last in enumerate(series):
+        if count >= MAX_SERIES_SCAN:
+            return OPEN_ENDED
+    if last is None:
+        return end_time
+    return last + (end_time - start_time)
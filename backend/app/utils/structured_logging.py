@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json for one object per line, text for the classic format
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records waiting for the writer thread; beyond this new records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Warnings and errors repeating the same error code or call site are let
+# through LOG_BURST times per LOG_WINDOW seconds, then only one in
+# LOG_SAMPLE_RATE until the window ends
+LOG_BURST = int(os.getenv("LOG_BURST", "20"))
+LOG_WINDOW = float(os.getenv("LOG_WINDOW", "10"))
+LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", "100"))
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object, including its `extra` fields.
+    Tracebacks are formatted here, on the writer thread.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits repeated warnings and errors, keyed by their error_code extra
+    or else by the logging call site, so messages built with f-strings
+    are limited as well as %-style ones. The first record let through
+    after some were dropped carries their number as `suppressed`.
+    """
+    def __init__(self, burst: int = LOG_BURST, window: float = LOG_WINDOW, sample_rate: int = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        # key -> [window start, records seen in window, suppressed]
+        self._counters: Dict[Tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        key = getattr(record, "error_code", None) or (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or now - counter[0] >= self.window:
+                if len(self._counters) > 10000:
+                    self._counters.clear()
+                suppressed = counter[2] if counter is not None else 0
+                counter = self._counters[key] = [now, 0, suppressed]
+            counter[1] += 1
+            seen = counter[1]
+            if seen > self.burst and (seen - self.burst) % self.sample_rate:
+                counter[2] += 1
+                return False
+            suppressed, counter[2] = counter[2], 0
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without formatting them. The
+    message is resolved here, since its arguments may change later, but
+    the traceback is formatted only if the record is written.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging():
+    """
+    Route all logging through a bounded queue to a writer thread, so
+    request handlers never wait on log I/O. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = _NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,39 @@
+from difflib import SequenceMatcher
+from typing import List, Union
+import json
+
+# A delta is a JSON list of line operations applied to the old text in order:
+#   n        (int)  copy the next n lines
+#   -n       (int)  skip the next n lines
+#   [lines]  (list) insert these lines
+
+def encode_delta(old: str, new: str) -> str:
+    """Line-based delta turning old into new"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops: List[Union[int, List[str]]] = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(-(i2 - i1))
+        if j2 > j1:
+            ops.append(new_lines[j1:j2])
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+def apply_delta(old: str, delta: str) -> str:
+    """Rebuild the new text from the old text and encode_delta's output"""
+    old_lines = old.splitlines(keepends=True)
+    position = 0
+    parts: List[str] = []
+    for op in json.loads(delta):
+        if isinstance(op, list):
+            parts.extend(op)
+        elif op >= 0:
+            parts.extend(old_lines[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
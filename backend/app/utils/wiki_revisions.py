@@ -0,0 +1,262 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+
+from sqlalchemy import case, column, event, func, insert, inspect, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from .text_delta import apply_delta, encode_delta
+
+wiki_pages_table = table("wiki_pages", column("id"))
+wiki_revisions_table = table(
+    "wiki_revisions",
+    column("id"),
+    column("wiki_page_id"),
+    column("author_id"),
+    column("comment"),
+    column("content"),
+    column("storage"),
+    column("content_size"),
+    column("revision_number"),
+    column("created_at")
+)
+
+# Revision metadata listed in page history
+_SUMMARY_COLUMNS = [
+    wiki_revisions_table.c.id,
+    wiki_revisions_table.c.wiki_page_id,
+    wiki_revisions_table.c.author_id,
+    wiki_revisions_table.c.comment,
+    wiki_revisions_table.c.content_size,
+    wiki_revisions_table.c.revision_number,
+    wiki_revisions_table.c.created_at
+]
+
+# Every SNAPSHOT_INTERVAL-th revision stores the full content, so reading
+# any revision applies at most SNAPSHOT_INTERVAL - 1 deltas
+SNAPSHOT_INTERVAL = 20
+# A delta larger than this share of the content is stored as a snapshot
+MAX_DELTA_RATIO = 0.5
+
+# Reconstructed revisions kept in memory; revisions never change once
+# written, so entries never go stale
+REVISION_CACHE_SIZE = 256
+REVISION_CACHE_MAX_CHARS = 32 * 1024 * 1024
+
+class RevisionCache:
+    """LRU cache of revision content, bounded by entries and total size"""
+    def __init__(self, size: int = REVISION_CACHE_SIZE, max_chars: int = REVISION_CACHE_MAX_CHARS):
+        self.size = size
+        self.max_chars = max_chars
+        self.chars = 0
+        self._entries: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+
+    def get(self, page_id: int, revision_number: int) -> Optional[str]:
+        content = self._entries.get((page_id, revision_number))
+        if content is not None:
+            self._entries.move_to_end((page_id, revision_number))
+        return content
+
+    def put(self, page_id: int, revision_number: int, content: str):
+        if len(content) > self.max_chars:
+            return
+        previous = self._entries.pop((page_id, revision_number), None)
+        if previous is not None:
+            self.chars -= len(previous)
+        self._entries[(page_id, revision_number)] = content
+        self.chars += len(content)
+        while len(self._entries) > self.size or self.chars > self.max_chars:
+            _, evicted = self._entries.popitem(last=False)
+            self.chars -= len(evicted)
+
+revision_cache = RevisionCache()
+
+def _read_revision_content(connection, page_id: int, revision_number: int) -> Optional[str]:
+    """get_revision_content on a synchronous connection"""
+    content = revision_cache.get(page_id, revision_number)
+    if content is not None:
+        return content
+
+    revisions = wiki_revisions_table
+    snapshot = connection.execute(
+        select(func.max(revisions.c.revision_number))
+        .where(revisions.c.wiki_page_id == page_id)
+        .where(revisions.c.storage == "full")
+        .where(revisions.c.revision_number <= revision_number)
+    ).scalar()
+    if snapshot is None:
+        return None
+
+    # Continue from a cached revision after the snapshot if there is one
+    start = snapshot
+    for number in range(revision_number - 1, snapshot, -1):
+        content = revision_cache.get(page_id, number)
+        if content is not None:
+            start = number + 1
+            break
+
+    rows = connection.execute(
+        select(revisions.c.revision_number, revisions.c.storage, revisions.c.content)
+        .where(revisions.c.wiki_page_id == page_id)
+        .where(revisions.c.revision_number.between(start, revision_number))
+        .order_by(revisions.c.revision_number)
+    ).all()
+    if not rows or rows[-1].revision_number != revision_number:
+        return None
+
+    for row in rows:
+        content = row.content if row.storage == "full" else apply_delta(content, row.content)
+
+    revision_cache.put(page_id, revision_number, content)
+    return content
+
+async def get_revision_content(db: AsyncSession, page_id: int, revision_number: int) -> Optional[str]:
+    """
+    Content of a page revision, rebuilt from the nearest snapshot or
+    cached earlier revision. Returns None if the revision does not exist.
+    Every reader of revision content goes through here, as the content
+    column of a delta revision holds the delta.
+    """
+    content = revision_cache.get(page_id, revision_number)
+    if content is not None:
+        return content
+    return await db.run_sync(
+        lambda session: _read_revision_content(session.connection(), page_id, revision_number)
+    )
+
+def _encode_delta_off_loop(previous: str, content: str) -> str:
+    """
+    encode_delta in a worker thread when called from an async session,
+    since diffing a large page takes a while
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return encode_delta(previous, content)
+    return await_only(asyncio.to_thread(encode_delta, previous, content))
+
+def _storage_for(connection, page_id: int, content: str) -> Tuple[int, str, str]:
+    """
+    (revision number, storage, stored content) of the next revision of a
+    page: a delta from the previous revision where that is worthwhile
+    """
+    revisions = wiki_revisions_table
+    latest, snapshot = connection.execute(
+        select(
+            func.max(revisions.c.revision_number),
+            func.max(case((revisions.c.storage == "full", revisions.c.revision_number)))
+        )
+        .where(revisions.c.wiki_page_id == page_id)
+    ).one()
+
+    revision_number = (latest or 0) + 1
+    if latest is not None and snapshot is not None and revision_number - snapshot < SNAPSHOT_INTERVAL:
+        previous = _read_revision_content(connection, page_id, latest)
+        if previous is not None:
+            delta = _encode_delta_off_loop(previous, content)
+            if len(delta) <= len(content) * MAX_DELTA_RATIO:
+                return revision_number, "delta", delta
+    return revision_number, "full", content
+
+def _lock_page(connection, page_id: int):
+    """Serialize edits of the same page so revision numbers stay unique"""
+    connection.execute(
+        select(wiki_pages_table.c.id)
+        .where(wiki_pages_table.c.id == page_id)
+        .with_for_update()
+    )
+
+async def add_revision(
+    db: AsyncSession,
+    page_id: int,
+    content: str,
+    author_id: int,
+    comment: Optional[str] = None
+) -> int:
+    """
+    Record a new revision of a page in the caller's transaction, as a delta
+    from the previous revision where that is worthwhile.
+    Returns the new revision number.
+    """
+    revisions = wiki_revisions_table
+
+    def prepare(session: Session) -> Tuple[int, str, str]:
+        connection = session.connection()
+        _lock_page(connection, page_id)
+        return _storage_for(connection, page_id, content)
+
+    revision_number, storage, stored = await db.run_sync(prepare)
+    await db.execute(insert(revisions).values(
+        wiki_page_id=page_id,
+        author_id=author_id,
+        comment=comment,
+        content=stored,
+        storage=storage,
+        content_size=len(content),
+        revision_number=revision_number,
+        created_at=datetime.utcnow()
+    ))
+    return revision_number
+
+async def get_revision(db: AsyncSession, page_id: int, revision_number: int) -> Optional[Dict[str, Any]]:
+    """
+    One revision of a page with its content, or None if it does not exist
+    """
+    revisions = wiki_revisions_table
+    revision = (await db.execute(
+        select(*_SUMMARY_COLUMNS)
+        .where(revisions.c.wiki_page_id == page_id)
+        .where(revisions.c.revision_number == revision_number)
+    )).mappings().first()
+    if revision is None:
+        return None
+
+    content = await get_revision_content(db, page_id, revision_number)
+    if content is None:
+        return None
+    return {**revision, "content": content}
+
+async def list_revisions(db: AsyncSession, page_id: int) -> List[Dict[str, Any]]:
+    """
+    Revision history of a page, newest first, without content
+    """
+    revisions = wiki_revisions_table
+    result = await db.execute(
+        select(*_SUMMARY_COLUMNS)
+        .where(revisions.c.wiki_page_id == page_id)
+        .order_by(revisions.c.revision_number.desc())
+    )
+    return [dict(row) for row in result.mappings()]
+
+@event.listens_for(Session, "before_flush")
+def _store_revisions_as_deltas(session, flush_context, instances):
+    """
+    Store revisions that page writers add through the ORM the same way
+    add_revision does: numbered after the page's latest revision and, where
+    worthwhile, as a delta from it. The writer sets the full content.
+    """
+    numbered: Dict[int, int] = {}  # Page ID -> revision number given in this flush
+    for instance in list(session.new):
+        if getattr(type(instance), "__tablename__", None) != "wiki_revisions":
+            continue
+        attrs = inspect(type(instance)).attrs
+        if "storage" not in attrs or "content_size" not in attrs:
+            raise RuntimeError("The wiki revisions model must map the storage and content_size columns")
+        if instance.storage == "delta" or instance.content is None:
+            continue
+
+        page_id = instance.wiki_page_id
+        if page_id in numbered:
+            # A later revision of a page already revised in this flush
+            revision_number, storage, stored = numbered[page_id] + 1, "full", instance.content
+        else:
+            connection = session.connection()
+            _lock_page(connection, page_id)
+            revision_number, storage, stored = _storage_for(connection, page_id, instance.content)
+        numbered[page_id] = revision_number
+        instance.revision_number = revision_number
+        instance.content_size = len(instance.content)
+        instance.storage, instance.content = storage, stored
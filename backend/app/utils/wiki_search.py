@@ -0,0 +1,269 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+import re
+import secrets
+import time
+
+from sqlalchemy import Integer, Select, and_, cast, column, func, literal, or_, select, table
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import Config
+
+# Only the columns search reads
+wiki_pages_table = table(
+    "wiki_pages",
+    column("id"),
+    column("title"),
+    column("content"),
+    column("parent_id")
+)
+wiki_revisions_table = table("wiki_revisions", column("wiki_page_id"), column("content"), column("storage"))
+
+# Title matches count this much more than content matches, and matches
+# only found in older revisions this much less. Only snapshot revisions
+# are searched; the content of a delta revision is the delta.
+TITLE_WEIGHT = 2.0
+REVISION_WEIGHT = 0.5
+
+# Scores are ranked and compared as integers in millionths, so a cursor
+# holds exactly the value the database compares it with
+SCORE_SCALE = 1_000_000
+
+# Matches ranked per search, and recent rankings kept per worker for the
+# following pages of a search
+MAX_RANKED_RESULTS = 1000
+RANKING_CACHE_SIZE = 256
+RANKING_TTL = 5 * 60
+
+# InnoDB's default innodb_ft_min_token_size; shorter words are not indexed
+MIN_TOKEN_LENGTH = 3
+SNIPPET_LENGTH = 160
+MAX_QUERY_TERMS = 16
+
+# Words too common to be worth searching for, per supported language
+STOPWORDS = {
+    "en": {
+        "the", "and", "for", "are", "but", "not", "you", "all", "any", "can",
+        "her", "was", "one", "our", "out", "has", "have", "had", "his", "how",
+        "its", "who", "did", "this", "that", "with", "from", "they", "will",
+        "what", "when", "where", "which", "there", "their", "then", "than",
+        "into", "about", "been", "were"
+    },
+    "ka": {
+        "და", "არის", "რომ", "თუ", "მაგრამ", "ასევე", "როგორც", "ისე", "ეს",
+        "ის", "იმ", "ამ", "რა", "ვინ", "სად", "როდის", "რომელიც", "არა", "კი",
+        "ან", "მისი", "მათი", "ჩვენ", "თქვენ", "უნდა", "იყო", "ყველა", "შემდეგ"
+    }
+}
+
+_TOKEN = re.compile(r"\w+")
+_stopwords = set().union(*(STOPWORDS.get(lang, set()) for lang in Config.SUPPORTED_LANGUAGES))
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into searchable terms. English and Georgian are both
+    written with spaces between words; casefold lowercases English and
+    folds Georgian Mtavruli capitals to Mkhedruli.
+    """
+    terms = []
+    for token in _TOKEN.findall(text.casefold()):
+        if len(token) >= MIN_TOKEN_LENGTH and token not in _stopwords and token not in terms:
+            terms.append(token)
+    return terms[:MAX_QUERY_TERMS]
+
+def encode_cursor(ranking: str, position: int, score: int, page_id: int) -> str:
+    """
+    Opaque cursor for the result at a position of a cached ranking, which
+    is also the result after (score, page_id) should that ranking be gone
+    """
+    return base64.urlsafe_b64encode(json.dumps([ranking, position, score, page_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int, int]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        ranking, position, score, page_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(ranking, str) or not all(isinstance(n, int) for n in (position, score, page_id)):
+            raise TypeError("Unexpected cursor fields")
+        return ranking, position, score, page_id
+    except Exception as e:
+        raise ValueError("Invalid search cursor") from e
+
+class SearchRankings:
+    """
+    Ranked (page ID, score) lists of recent searches, by a random key
+    handed out in their cursors. Following pages of a search slice its
+    ranking and read only those pages, instead of scoring every match
+    again. Rankings are per worker; a cursor whose ranking is gone or
+    expired falls back to ranking again from its (score, page ID).
+    """
+    def __init__(self, size: int = RANKING_CACHE_SIZE, ttl: float = RANKING_TTL):
+        self.size = size
+        self.ttl = ttl
+        # key -> (created, ranking, whether the ranking holds every match)
+        self._entries: "OrderedDict[str, Tuple[float, List[Tuple[int, int]], bool]]" = OrderedDict()
+
+    def add(self, ranking: List[Tuple[int, int]], complete: bool) -> str:
+        key = secrets.token_urlsafe(8)
+        self._entries[key] = (time.monotonic(), ranking, complete)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[Tuple[List[Tuple[int, int]], bool]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, ranking, complete = entry
+        if time.monotonic() - created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return ranking, complete
+
+search_rankings = SearchRankings()
+
+def build_snippet(content: str, terms: List[str]) -> Tuple[str, List[List[int]]]:
+    """
+    The part of the content around the first matched term, with the
+    offsets of every term occurrence inside it
+    """
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(content)
+    start = 0
+    if first is not None:
+        start = max(0, first.start() - SNIPPET_LENGTH // 4)
+        # Start at a word boundary
+        space = content.rfind(" ", 0, start)
+        start = 0 if space == -1 or start - space > 20 else space + 1
+    snippet = content[start:start + SNIPPET_LENGTH]
+    if start + SNIPPET_LENGTH < len(content):
+        space = snippet.rfind(" ")
+        if space > SNIPPET_LENGTH // 2:
+            snippet = snippet[:space]
+        snippet += "…"
+    if start > 0:
+        snippet = "…" + snippet
+    highlights = [[m.start(), m.end()] for m in pattern.finditer(snippet)]
+    return snippet, highlights
+
+def ranking_query(
+    terms: List[str],
+    include_revisions: bool = False,
+    after: Optional[Tuple[int, int]] = None
+) -> Select:
+    """
+    (page ID, score) of every matching page, best first, optionally only
+    those ranked after a (score, page ID). Scores are integers, in
+    1/SCORE_SCALE units, so they compare exactly against a cursor's.
+    """
+    pages = wiki_pages_table
+    against = " ".join(terms)
+    page_match = match(pages.c.title, pages.c.content, against=against).in_natural_language_mode()
+    title_match = match(pages.c.title, against=against).in_natural_language_mode()
+    score = title_match * TITLE_WEIGHT + page_match
+    matched = page_match > 0
+
+    source = pages
+    if include_revisions:
+        revisions = wiki_revisions_table
+        revision_match = match(revisions.c.content, against=against).in_natural_language_mode()
+        revision_scores = (
+            select(
+                revisions.c.wiki_page_id,
+                func.max(revision_match).label("score")
+            )
+            .where(revisions.c.storage == "full")
+            .where(revision_match > 0)
+            .group_by(revisions.c.wiki_page_id)
+            .subquery()
+        )
+        source = pages.outerjoin(revision_scores, revision_scores.c.wiki_page_id == pages.c.id)
+        score = score + func.coalesce(revision_scores.c.score, literal(0.0)) * REVISION_WEIGHT
+        matched = or_(matched, revision_scores.c.score.is_not(None))
+
+    ranked = (
+        select(pages.c.id, cast(func.round(score * SCORE_SCALE), Integer).label("score"))
+        .select_from(source)
+        .where(matched)
+        .subquery()
+    )
+    statement = select(ranked.c.id, ranked.c.score)
+    if after is not None:
+        after_score, after_id = after
+        statement = statement.where(or_(
+            ranked.c.score < after_score,
+            and_(ranked.c.score == after_score, ranked.c.id > after_id)
+        ))
+    return statement.order_by(ranked.c.score.desc(), ranked.c.id)
+
+async def search_wiki(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    include_revisions: bool = False
+) -> Dict[str, Any]:
+    """
+    Ranked full-text search over wiki pages, optionally also matching text
+    of earlier revisions. Results are ordered by score, then page ID, and
+    continue after the given cursor. The first page ranks up to
+    MAX_RANKED_RESULTS matches by ID and score only; following pages read
+    their slice of that ranking.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return {"results": [], "next_cursor": None}
+
+    key, position, after = None, 0, None
+    cached = None
+    if cursor is not None:
+        key, position, after_score, after_id = decode_cursor(cursor)
+        after = (after_score, after_id)
+        cached = search_rankings.get(key)
+        # A page running past the end of a truncated ranking is ranked again
+        if cached is not None and position + limit > len(cached[0]) and not cached[1]:
+            cached = None
+    if cached is not None:
+        ranking, complete = cached
+    else:
+        rows = (await db.execute(
+            ranking_query(terms, include_revisions, after).limit(MAX_RANKED_RESULTS + 1)
+        )).all()
+        ranking = [(row.id, row.score) for row in rows[:MAX_RANKED_RESULTS]]
+        complete = len(rows) <= MAX_RANKED_RESULTS
+        key, position = search_rankings.add(ranking, complete), 0
+
+    window = ranking[position:position + limit]
+    pages = wiki_pages_table
+    rows = {}
+    if window:
+        rows = {row.id: row for row in (await db.execute(
+            select(pages.c.id, pages.c.title, pages.c.content, pages.c.parent_id)
+            .where(pages.c.id.in_([page_id for page_id, _ in window]))
+        )).all()}
+
+    results = []
+    for page_id, score in window:
+        # Pages deleted since the search was ranked are left out
+        row = rows.get(page_id)
+        if row is None:
+            continue
+        snippet, highlights = build_snippet(row.content or "", terms)
+        results.append({
+            "id": row.id,
+            "title": row.title,
+            "parent_id": row.parent_id,
+            "snippet": snippet,
+            "highlights": highlights,
+            "score": score / SCORE_SCALE
+        })
+
+    next_cursor = None
+    following = position + len(window)
+    if window and (following < len(ranking) or not complete):
+        last_id, last_score = window[-1]
+        next_cursor = encode_cursor(key, following, last_score, last_id)
+    return {"results": results, "next_cursor": next_cursor}
@@ -0,0 +1,202 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+from sqlalchemy import bindparam, column, delete, event, inspect, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+wiki_pages_table = table("wiki_pages", column("id"), column("title"), column("parent_id"))
+wiki_page_paths_table = table(
+    "wiki_page_paths",
+    column("ancestor_id"),
+    column("descendant_id"),
+    column("depth")
+)
+wiki_tree_state_table = table("wiki_tree_state", column("id"), column("version"))
+
+logger = logging.getLogger(__name__)
+
+# Closure table maintenance. Rows of deleted pages go with them through
+# the foreign keys' ON DELETE CASCADE.
+_INSERT_PATHS = text("""
+    INSERT INTO wiki_page_paths (ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, :page_id, depth + 1 FROM wiki_page_paths WHERE descendant_id = :parent_id
+    UNION ALL
+    SELECT :page_id, :page_id, 0
+""")
+_IS_DESCENDANT = text("""
+    SELECT 1 FROM wiki_page_paths WHERE ancestor_id = :page_id AND descendant_id = :parent_id
+""")
+_SUBTREE_IDS = select(wiki_page_paths_table.c.descendant_id).where(
+    wiki_page_paths_table.c.ancestor_id == bindparam("page_id")
+)
+# Paths from the page's old ancestors into its subtree. The subtree is read
+# first, as MySQL cannot delete from a table its own subquery reads.
+_DETACH_SUBTREE = delete(wiki_page_paths_table).where(
+    wiki_page_paths_table.c.descendant_id.in_(bindparam("subtree_ids", expanding=True)),
+    wiki_page_paths_table.c.ancestor_id.not_in(bindparam("subtree_ids", expanding=True))
+)
+_ATTACH_SUBTREE = text("""
+    INSERT INTO wiki_page_paths (ancestor_id, descendant_id, depth)
+    SELECT above.ancestor_id, subtree.descendant_id, above.depth + subtree.depth + 1
+    FROM wiki_page_paths AS above
+    CROSS JOIN wiki_page_paths AS subtree
+    WHERE above.descendant_id = :parent_id AND subtree.ancestor_id = :page_id
+""")
+_BUMP_VERSION = text("UPDATE wiki_tree_state SET version = version + 1 WHERE id = 1")
+
+def _is_wiki_page(instance) -> bool:
+    return getattr(type(instance), "__tablename__", None) == "wiki_pages"
+
+@event.listens_for(Session, "after_flush")
+def _maintain_wiki_tree(session, flush_context):
+    """
+    Keep wiki_page_paths in step with wiki_pages.parent_id as pages are
+    created, moved and deleted, and note when anything shown in the tree
+    changed. Only ORM writes are tracked.
+    """
+    changed = False
+    connection = None
+
+    for instance in _parents_first([i for i in session.new if _is_wiki_page(i)]):
+        connection = connection or session.connection()
+        connection.execute(_INSERT_PATHS, {"page_id": instance.id, "parent_id": instance.parent_id})
+        changed = True
+
+    for instance in session.dirty:
+        if not _is_wiki_page(instance):
+            continue
+        state = inspect(instance)
+        if state.attrs.parent_id.history.has_changes():
+            connection = connection or session.connection()
+            _move(connection, instance.id, instance.parent_id)
+            changed = True
+        elif state.attrs.title.history.has_changes():
+            changed = True
+
+    if any(_is_wiki_page(instance) for instance in session.deleted):
+        changed = True
+
+    if changed:
+        session.info["wiki_tree_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _bump_tree_version(session):
+    """
+    Bump the tree version once a change is committed, in a transaction of
+    its own. Concurrent wiki writers then hold the version row's lock for
+    one statement rather than their whole transaction. A reader that sees
+    the old version in between caches the new tree under it, and rebuilds
+    once more after the bump.
+    """
+    if not session.info.pop("wiki_tree_changed", False):
+        return
+    try:
+        with session.get_bind(clause=_BUMP_VERSION).begin() as connection:
+            connection.execute(_BUMP_VERSION)
+    except Exception as e:
+        logger.warning("Could not bump the wiki tree version: %s", e)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_tree_change(session):
+    session.info.pop("wiki_tree_changed", None)
+
+def _parents_first(pages: list) -> list:
+    """Order new pages so that a page created with its parent comes after it"""
+    by_id = {page.id: page for page in pages}
+
+    def depth(page) -> int:
+        levels = 0
+        while page.parent_id in by_id and levels < len(by_id):
+            page, levels = by_id[page.parent_id], levels + 1
+        return levels
+
+    return sorted(pages, key=depth)
+
+def _move(connection, page_id: int, parent_id: Optional[int]):
+    """Re-parent a page and its subtree"""
+    if parent_id is not None and connection.execute(
+        _IS_DESCENDANT, {"page_id": page_id, "parent_id": parent_id}
+    ).first():
+        raise ValueError(f"Cannot move wiki page {page_id} under its own descendant {parent_id}")
+    subtree_ids = connection.execute(_SUBTREE_IDS, {"page_id": page_id}).scalars().all()
+    connection.execute(_DETACH_SUBTREE, {"subtree_ids": subtree_ids})
+    if parent_id is not None:
+        connection.execute(_ATTACH_SUBTREE, {"page_id": page_id, "parent_id": parent_id})
+
+def _nest(rows, root_ids: List[int]) -> List[Dict[str, Any]]:
+    """Turn (id, title, parent_id) rows into nested nodes under the given roots"""
+    nodes = {row.id: {"id": row.id, "title": row.title, "parent_id": row.parent_id, "children": []} for row in rows}
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"])
+        if parent is not None and node["id"] not in root_ids:
+            parent["children"].append(node)
+    return [nodes[page_id] for page_id in root_ids if page_id in nodes]
+
+async def get_tree(db: AsyncSession) -> List[Dict[str, Any]]:
+    """The whole wiki tree, siblings ordered by title"""
+    pages = wiki_pages_table
+    rows = (await db.execute(
+        select(pages.c.id, pages.c.title, pages.c.parent_id).order_by(pages.c.title, pages.c.id)
+    )).all()
+    known = {row.id for row in rows}
+    roots = [row.id for row in rows if row.parent_id is None or row.parent_id not in known]
+    return _nest(rows, roots)
+
+async def get_subtree(db: AsyncSession, page_id: int) -> Optional[Dict[str, Any]]:
+    """A page with all of its descendants, or None if it does not exist"""
+    pages, paths = wiki_pages_table, wiki_page_paths_table
+    rows = (await db.execute(
+        select(pages.c.id, pages.c.title, pages.c.parent_id)
+        .join(paths, paths.c.descendant_id == pages.c.id)
+        .where(paths.c.ancestor_id == page_id)
+        .order_by(pages.c.title, pages.c.id)
+    )).all()
+    nested = _nest(rows, [page_id])
+    return nested[0] if nested else None
+
+async def get_ancestors(db: AsyncSession, page_id: int) -> List[Dict[str, Any]]:
+    """Breadcrumb of a page: its ancestors from the root down, then the page"""
+    pages, paths = wiki_pages_table, wiki_page_paths_table
+    rows = (await db.execute(
+        select(pages.c.id, pages.c.title)
+        .join(paths, paths.c.ancestor_id == pages.c.id)
+        .where(paths.c.descendant_id == page_id)
+        .order_by(paths.c.depth.desc())
+    )).all()
+    return [{"id": row.id, "title": row.title} for row in rows]
+
+class WikiTreeCache:
+    """
+    Serialized whole-tree response, rebuilt only when the tree version in
+    the database moves on. Every worker checks the version, so a change
+    made through any worker invalidates all of them.
+    """
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.body: bytes = b""
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def etag(version: int) -> str:
+        return f'"wiki-tree-{version}"'
+
+    async def current_version(self, db: AsyncSession) -> int:
+        return (await db.execute(
+            select(wiki_tree_state_table.c.version).where(wiki_tree_state_table.c.id == 1)
+        )).scalar() or 0
+
+    async def get(self, db: AsyncSession, version: int) -> bytes:
+        """The serialized tree at the given version"""
+        if self.version == version:
+            return self.body
+        async with self._lock:
+            if self.version != version:
+                tree = await get_tree(db)
+                self.body = json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                self.version = version
+        return self.body
+
+wiki_tree_cache = WikiTreeCache()
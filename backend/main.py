@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.config import Config
-from app.database import init_db
-from app.routes import auth, projects, wiki, events, notifications
+from app.database import init_db, replica_monitor, close_db_connections
+from app.utils.mailer import close_mailer
+from app.utils.outbox import outbox_dispatcher
+from app.utils.reminders import reminder_scheduler
+from app.utils.i18n import LanguageMiddleware, watch_translations, stop_watching_translations
+from app.routes import auth, projects, wiki, events, notifications, metrics, i18n, wiki_search, wiki_history, wiki_tree, calendar
 import uvicorn
 
 app = FastAPI(
@@ -21,12 +25,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Resolves request.state.language for every request
+app.add_middleware(LanguageMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
+# Before the wiki router, whose /{page_id} routes would capture these paths
+app.include_router(wiki_search.router, prefix="/api/wiki", tags=["wiki"])
+app.include_router(wiki_history.router, prefix="/api/wiki", tags=["wiki"])
+app.include_router(wiki_tree.router, prefix="/api/wiki", tags=["wiki"])
 app.include_router(wiki.router, prefix="/api/wiki", tags=["wiki"])
+# Before the events router, whose /{event_id} route would capture /range
+app.include_router(calendar.router, prefix="/api/events", tags=["events"])
 app.include_router(events.router, prefix="/api/events", tags=["events"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(i18n.router, prefix="/api/i18n", tags=["i18n"])
 
 @app.get("/")
 async def root():
@@ -35,6 +50,18 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    replica_monitor.start()
+    outbox_dispatcher.start()
+    reminder_scheduler.start()
+    watch_translations()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_watching_translations()
+    await reminder_scheduler.stop()
+    await outbox_dispatcher.stop()
+    await close_mailer()
+    await close_db_connections()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
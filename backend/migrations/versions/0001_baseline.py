@@ -0,0 +1,158 @@
+"""Baseline schema
+
+The tables that used to be created by Base.metadata.create_all on every
+startup, written out as they were at this revision so that later changes
+to the models never leak into it. On a database bootstrapped by
+create_all, existing tables are skipped, so
+`python -m app.migrate upgrade head` is safe to run there as well.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _tables():
+    """(name, columns and constraints) of each baseline table, parents first"""
+    return [
+        ('users', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('email', sa.String(255), nullable=False, unique=True, index=True),
+            sa.Column('hashed_password', sa.String(255), nullable=False),
+            sa.Column('first_name', sa.String(100), nullable=False),
+            sa.Column('last_name', sa.String(100), nullable=False),
+            sa.Column('phone', sa.String(50), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('photo_url', sa.String(500), nullable=True),
+            sa.Column('role', sa.String(50), nullable=False, server_default='customer'),
+            sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        ]),
+        ('projects', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(50), nullable=False),
+            sa.Column('construction_stage', sa.String(50), nullable=False),
+            sa.Column('start_date', sa.DateTime(), nullable=True),
+            sa.Column('end_date', sa.DateTime(), nullable=True),
+            sa.Column('customer_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, index=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        ]),
+        ('project_team_members', [
+            sa.Column(
+                'project_id', sa.Integer(),
+                sa.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True
+            ),
+            sa.Column(
+                'user_id', sa.Integer(),
+                sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+            ),
+        ]),
+        ('project_files', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('filename', sa.String(255), nullable=False),
+            sa.Column('file_type', sa.String(100), nullable=False),
+            sa.Column('version', sa.String(50), nullable=False),
+            sa.Column('is_approved', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('drive_file_id', sa.String(255), nullable=False),
+            sa.Column('uploaded_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('uploaded_at', sa.DateTime(), nullable=False),
+        ]),
+        ('timeline_items', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('start_date', sa.DateTime(), nullable=False),
+            sa.Column('end_date', sa.DateTime(), nullable=False),
+            sa.Column('progress', sa.Integer(), nullable=True, server_default='0'),
+            sa.Column('dependencies', sa.String(255), nullable=True),
+        ]),
+        ('events', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('start_time', sa.DateTime(), nullable=False),
+            sa.Column('end_time', sa.DateTime(), nullable=False),
+            sa.Column('location', sa.String(255), nullable=True),
+            sa.Column('is_all_day', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id', ondelete='SET NULL'), nullable=True),
+            sa.Column('creator_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        ]),
+        ('event_attendees', [
+            sa.Column(
+                'event_id', sa.Integer(),
+                sa.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True
+            ),
+            sa.Column(
+                'user_id', sa.Integer(),
+                sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+            ),
+        ]),
+        ('event_reminders', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('remind_at', sa.DateTime(), nullable=False),
+            sa.Column('notification_type', sa.String(20), nullable=False, server_default='both'),
+            sa.Column('notification_sent', sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        ]),
+        ('wiki_pages', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('parent_id', sa.Integer(), sa.ForeignKey('wiki_pages.id'), nullable=True, index=True),
+            sa.Column('author_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        ]),
+        ('wiki_revisions', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('wiki_page_id', sa.Integer(), sa.ForeignKey('wiki_pages.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('comment', sa.String(255), nullable=True),
+            sa.Column('author_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('revision_number', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        ]),
+        ('wiki_files', [
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('wiki_page_id', sa.Integer(), sa.ForeignKey('wiki_pages.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('filename', sa.String(255), nullable=False),
+            sa.Column('file_type', sa.String(100), nullable=False),
+            sa.Column('file_size', sa.Integer(), nullable=False),
+            sa.Column('drive_file_id', sa.String(255), nullable=False),
+            sa.Column('uploaded_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('uploaded_at', sa.DateTime(), nullable=False),
+        ]),
+    ]
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def upgrade() -> None:
+    existing = _existing_tables()
+    for name, columns in _tables():
+        if name not in existing:
+            op.create_table(name, *columns)
+
+def downgrade() -> None:
+    existing = _existing_tables()
+    for name, _ in reversed(_tables()):
+        if name in existing:
+            op.drop_table(name)
@@ -0,0 +1,43 @@
+"""Composite indexes for calendar, reminder, wiki and file access paths
+
+- events by time range, optionally narrowed to a project or creator
+- event_attendees by user, to find the events a user attends
+- event_reminders that are due and not yet sent
+- the latest revision of a wiki page
+- files of a project by version
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Month/week views: events overlapping [T1, T2)
+    ("ix_events_start_time_end_time", "events", ["start_time", "end_time"]),
+    ("ix_events_project_id_start_time", "events", ["project_id", "start_time"]),
+    ("ix_events_creator_id_start_time", "events", ["creator_id", "start_time"]),
+    # Attendee -> events; the primary key only serves event -> attendees
+    ("ix_event_attendees_user_id_event_id", "event_attendees", ["user_id", "event_id"]),
+    # Due reminders: notification_sent = false AND remind_at <= now
+    ("ix_event_reminders_notification_sent_remind_at", "event_reminders", ["notification_sent", "remind_at"]),
+    # Latest revision: ORDER BY revision_number DESC LIMIT 1 per page
+    ("ix_wiki_revisions_wiki_page_id_revision_number", "wiki_revisions", ["wiki_page_id", "revision_number"]),
+    # Files of a project, grouped by version
+    ("ix_project_files_project_id_version", "project_files", ["project_id", "version"]),
+]
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
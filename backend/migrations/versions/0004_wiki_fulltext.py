@@ -0,0 +1,34 @@
+"""Full-text indexes for wiki search
+
+- wiki page titles on their own, so title matches can be ranked higher
+- wiki page titles and content together
+- wiki revision content, to find pages by text they used to contain
+
+InnoDB keeps these up to date as pages and revisions are written.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ft_wiki_pages_title", "wiki_pages", ["title"]),
+    ("ft_wiki_pages_title_content", "wiki_pages", ["title", "content"]),
+    ("ft_wiki_revisions_content", "wiki_revisions", ["content"]),
+]
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, mysql_prefix="FULLTEXT")
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,65 @@
+"""Delta-encoded wiki revisions
+
+Adds wiki_revisions.storage: "full" rows hold the page content, "delta"
+rows hold the changes from the previous revision. Existing revisions are
+all full snapshots and stay readable as they are.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column(
+        'wiki_revisions',
+        sa.Column('storage', sa.String(10), nullable=False, server_default='full')
+    )
+    op.add_column('wiki_revisions', sa.Column('content_size', sa.Integer(), nullable=True))
+    # Finding the nearest snapshot at or before a revision
+    op.create_index(
+        'ix_wiki_revisions_wiki_page_id_storage_revision_number',
+        'wiki_revisions',
+        ['wiki_page_id', 'storage', 'revision_number']
+    )
+
+def _materialize_deltas() -> None:
+    """Rewrite every delta revision as a full snapshot"""
+    # Imported here so that reading the revision graph does not import the app
+    from app.utils.text_delta import apply_delta
+
+    bind = op.get_bind()
+    page_ids = bind.execute(sa.text(
+        "SELECT DISTINCT wiki_page_id FROM wiki_revisions WHERE storage = 'delta'"
+    )).scalars().all()
+    for page_id in page_ids:
+        rows = bind.execute(sa.text(
+            "SELECT id, storage, content FROM wiki_revisions "
+            "WHERE wiki_page_id = :page_id ORDER BY revision_number"
+        ), {"page_id": page_id}).all()
+        content = ""
+        for revision_id, storage, stored in rows:
+            if storage == "full":
+                content = stored
+                continue
+            content = apply_delta(content, stored)
+            bind.execute(sa.text(
+                "UPDATE wiki_revisions SET storage = 'full', content = :content WHERE id = :id"
+            ), {"content": content, "id": revision_id})
+
+def downgrade() -> None:
+    _materialize_deltas()
+    op.drop_index(
+        'ix_wiki_revisions_wiki_page_id_storage_revision_number',
+        table_name='wiki_revisions'
+    )
+    op.drop_column('wiki_revisions', 'content_size')
+    op.drop_column('wiki_revisions', 'storage')
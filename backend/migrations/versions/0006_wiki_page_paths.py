@@ -0,0 +1,63 @@
+"""Closure table for the wiki page tree
+
+wiki_page_paths holds one row per (ancestor, descendant) pair, including
+each page paired with itself at depth 0, so subtrees and breadcrumbs are a
+single indexed query. wiki_tree_state.version is bumped whenever the tree
+changes and versions the cached /api/wiki/tree response.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'wiki_page_paths',
+        sa.Column(
+            'ancestor_id', sa.Integer(),
+            sa.ForeignKey('wiki_pages.id', ondelete='CASCADE'), primary_key=True
+        ),
+        sa.Column(
+            'descendant_id', sa.Integer(),
+            sa.ForeignKey('wiki_pages.id', ondelete='CASCADE'), primary_key=True
+        ),
+        sa.Column('depth', sa.Integer(), nullable=False),
+    )
+    # Ancestors of a page, nearest last
+    op.create_index(
+        'ix_wiki_page_paths_descendant_id_depth',
+        'wiki_page_paths',
+        ['descendant_id', 'depth']
+    )
+
+    op.create_table(
+        'wiki_tree_state',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.execute("INSERT INTO wiki_tree_state (id, version) VALUES (1, 1)")
+
+    # Paths of the existing pages, from their parent_id links
+    op.execute("""
+        INSERT INTO wiki_page_paths (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM wiki_pages
+            UNION ALL
+            SELECT paths.ancestor_id, wiki_pages.id, paths.depth + 1
+            FROM paths JOIN wiki_pages ON wiki_pages.parent_id = paths.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM paths
+    """)
+
+def downgrade() -> None:
+    op.drop_table('wiki_tree_state')
+    op.drop_table('wiki_page_paths')
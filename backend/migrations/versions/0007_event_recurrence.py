@@ -0,0 +1,48 @@
+"""Recurring events and calendar range indexes
+
+- events.rrule: RFC 5545 recurrence rule, NULL for single events
+- events.occurs_until: end of the last occurrence (end_time for single
+  events), so "overlaps [T1, T2)" is start_time < T2 AND occurs_until > T1
+- calendar_state.version: bumped whenever events, attendees, reminders or
+  project membership change; versions cached calendar reads
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_events_occurs_until_start_time", "events", ["occurs_until", "start_time"]),
+    ("ix_events_creator_id_occurs_until", "events", ["creator_id", "occurs_until"]),
+    ("ix_events_project_id_occurs_until", "events", ["project_id", "occurs_until"]),
+]
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('rrule', sa.String(500), nullable=True))
+    op.add_column('events', sa.Column('occurs_until', sa.DateTime(), nullable=True))
+    op.execute("UPDATE events SET occurs_until = end_time")
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+    op.create_table(
+        'calendar_state',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.execute("INSERT INTO calendar_state (id, version) VALUES (1, 1)")
+
+def downgrade() -> None:
+    op.drop_table('calendar_state')
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_column('events', 'occurs_until')
+    op.drop_column('events', 'rrule')
@@ -0,0 +1,25 @@
+"""Per-channel pending recipients on the notification outbox
+
+notification_outbox.pending lists, per channel, the users a notification
+has not reached yet, so a retry only goes to them. NULL means every
+recipient on every channel of the entry.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('notification_outbox', sa.Column('pending', sa.JSON(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('notification_outbox', 'pending')
@@ -0,0 +1,50 @@
+"""Per-user calendar versions and required occurs_until
+
+- calendar_user_versions.version: bumped for every user who sees a changed
+  event, attendee, reminder or project membership. Replaces the single
+  calendar_state row, which serialized every calendar write and retired
+  every user's cached calendar at once.
+- events.occurs_until becomes NOT NULL: range queries only find events
+  through it. Rows written without it are backfilled with end_time, or as
+  open-ended for recurring events.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'calendar_user_versions',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.drop_table('calendar_state')
+
+    op.execute(
+        "UPDATE events SET occurs_until = CASE WHEN rrule IS NULL THEN end_time "
+        "ELSE '9999-12-31 00:00:00' END WHERE occurs_until IS NULL"
+    )
+    with op.batch_alter_table('events') as batch:
+        batch.alter_column('occurs_until', existing_type=sa.DateTime(), nullable=False)
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch:
+        batch.alter_column('occurs_until', existing_type=sa.DateTime(), nullable=True)
+
+    op.create_table(
+        'calendar_state',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.execute("INSERT INTO calendar_state (id, version) VALUES (1, 1)")
+    op.drop_table('calendar_user_versions')
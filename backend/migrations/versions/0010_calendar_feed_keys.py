@@ -0,0 +1,26 @@
+"""Per-user calendar feed keys
+
+- users.calendar_feed_key: random key mixed into the signature of a user's
+  feed URL. It is set when the first URL is issued, and replacing it
+  revokes that user's URLs without touching anyone else's. NULL means no
+  URL has been issued, so none is accepted.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('calendar_feed_key', sa.String(32), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('users', 'calendar_feed_key')
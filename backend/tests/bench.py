@@ -0,0 +1,15 @@
+"""Measurement helpers shared by the load tests and benchmarks"""
+from typing import List
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of measurements"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def report(name: str, **measurements):
+    """Print one benchmark result line; shown with pytest -s"""
+    values = ", ".join(
+        f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in measurements.items()
+    )
+    print(f"\n[benchmark] {name}: {values}")
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from schema import migration_scripts, run_migrations
+
+# Scratch MySQL database for the tests that need MySQL itself (query
+# plans, FULLTEXT search, protocol round-trips). Its tables are created
+# by the migrations and dropped again afterwards.
+TEST_MYSQL_URL = os.getenv("TEST_MYSQL_URL")
+
+@pytest.fixture(scope="module")
+def mysql_engine():
+    """Synchronous engine on the scratch database, migrated to head"""
+    if not TEST_MYSQL_URL:
+        pytest.skip("TEST_MYSQL_URL is not set")
+    engine = sa.create_engine(sa.make_url(TEST_MYSQL_URL).set(drivername="mysql+pymysql"))
+    scripts = migration_scripts()
+    with engine.begin() as connection:
+        run_migrations(connection, scripts, "upgrade")
+    yield engine
+    with engine.begin() as connection:
+        run_migrations(connection, reversed(scripts), "downgrade")
+    engine.dispose()
+
+@pytest.fixture
+async def migrated_sessions(tmp_path):
+    """
+    Async session factory on a SQLite file migrated to head. Foreign keys
+    are enforced, so ON DELETE CASCADE behaves as on MySQL.
+    """
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    sync_engine = sa.create_engine(url)
+    with sync_engine.begin() as connection:
+        run_migrations(connection, migration_scripts(), "upgrade")
+    sync_engine.dispose()
+
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+
+    @sa.event.listens_for(engine.sync_engine, "connect")
+    def enforce_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
@@ -0,0 +1,19 @@
+"""Run the Alembic revisions directly against a test connection"""
+from typing import Iterable, List
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import Script, ScriptDirectory
+
+from app.migrate import get_alembic_config
+
+def migration_scripts() -> List[Script]:
+    """Revision scripts, oldest first"""
+    script = ScriptDirectory.from_config(get_alembic_config())
+    return list(reversed(list(script.walk_revisions())))
+
+def run_migrations(connection, scripts: Iterable[Script], step: str = "upgrade"):
+    """Call upgrade() or downgrade() of each script, in the given order"""
+    with Operations.context(MigrationContext.configure(connection)):
+        for script in scripts:
+            getattr(script.module, step)()
@@ -0,0 +1,254 @@
+"""
+Calendar reads and invalidation on a migrated SQLite database: recurrence
+rules, per-user calendar versions, and a month-view benchmark for a user
+in many projects.
+"""
+from datetime import datetime, timedelta
+import random
+import subprocess
+import sys
+import time
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Table, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase, relationship
+
+from app.utils import calendar
+from app.utils.calendar import CalendarCache, calendar_user_versions_table, query_calendar
+from app.utils.rrule import OPEN_ENDED, compute_occurs_until, parse_rrule
+from bench import percentile, report
+
+BASE = datetime(2026, 1, 1)
+USERS = 2_000
+PROJECTS = 500
+USER_PROJECTS = 50
+EVENTS_PER_PROJECT = 100
+RECURRING_SHARE = 0.1
+MONTH_READS = 30
+
+class Base(DeclarativeBase):
+    pass
+
+event_attendees = Table(
+    "event_attendees", Base.metadata,
+    Column("event_id", ForeignKey("events.id"), primary_key=True),
+    Column("user_id", ForeignKey("users.id"), primary_key=True)
+)
+project_team_members = Table(
+    "project_team_members", Base.metadata,
+    Column("project_id", ForeignKey("projects.id"), primary_key=True),
+    Column("user_id", ForeignKey("users.id"), primary_key=True)
+)
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    email = Column(String(255), nullable=False)
+    hashed_password = Column(String(255), nullable=False, default="x")
+    first_name = Column(String(100), nullable=False, default="First")
+    last_name = Column(String(100), nullable=False, default="Last")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class Project(Base):
+    __tablename__ = "projects"
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False, default="Project")
+    status = Column(String(50), nullable=False, default="active")
+    construction_stage = Column(String(50), nullable=False, default="design")
+    customer_id = Column(ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    team_members = relationship(User, secondary=project_team_members)
+
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    project_id = Column(ForeignKey("projects.id"))
+    creator_id = Column(ForeignKey("users.id"), nullable=False)
+    rrule = Column(String(500))
+    occurs_until = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attendees = relationship(User, secondary=event_attendees)
+
+@pytest.fixture
+def sessions(migrated_sessions):
+    return migrated_sessions
+
+async def versions(db: AsyncSession):
+    rows = (await db.execute(
+        select(calendar_user_versions_table.c.user_id, calendar_user_versions_table.c.version)
+    )).all()
+    return dict(rows)
+
+def test_parse_rrule_accepts_a_single_rule():
+    series = parse_rrule("FREQ=WEEKLY;UNTIL=20260115T000000Z", BASE)
+    assert list(series) == [BASE, BASE + timedelta(weeks=1), BASE + timedelta(weeks=2)]
+
+@pytest.mark.parametrize("rule", [
+    "RRULE:FREQ=DAILY\nEXDATE:20260102T000000",
+    "RRULE:FREQ=DAILY\nRRULE:FREQ=WEEKLY",
+    "FREQ=SOMETIMES"
+])
+def test_parse_rrule_rejects_anything_else(rule):
+    with pytest.raises(ValueError):
+        parse_rrule(rule, BASE)
+
+def test_occurs_until():
+    hour = timedelta(hours=1)
+    assert compute_occurs_until(BASE, BASE + hour, None) == BASE + hour
+    assert compute_occurs_until(BASE, BASE + hour, "FREQ=DAILY;COUNT=3") == BASE + timedelta(days=2) + hour
+    assert compute_occurs_until(BASE, BASE + hour, "FREQ=DAILY") == OPEN_ENDED
+
+def test_event_schema_does_not_register_session_listeners():
+    code = "import sys, app.schemas.event; print('app.utils.calendar' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_event_schema_rejects_rule_sets():
+    schemas = pytest.importorskip("app.schemas.event")
+    with pytest.raises(ValueError, match="single RRULE"):
+        schemas.EventBase(
+            title="Site visit", start_time=BASE, end_time=BASE + timedelta(hours=1),
+            rrule="RRULE:FREQ=DAILY\nEXDATE:20260102T000000"
+        )
+
+async def test_writes_bump_only_the_users_who_see_them(sessions):
+    async with sessions() as db:
+        users = [User(id=n, email=f"user{n}@example.com") for n in range(1, 7)]
+        db.add_all(users)
+        await db.commit()
+        project = Project(id=1, customer_id=1, team_members=[users[1]])
+        db.add(project)
+        await db.commit()
+
+        # Creator 3, attendee 4, and the project's customer 1 and member 2
+        event = Event(
+            title="Pour slab", start_time=BASE, end_time=BASE + timedelta(hours=2),
+            project_id=1, creator_id=3, attendees=[users[3]]
+        )
+        db.add(event)
+        await db.commit()
+        after_create = await versions(db)
+        assert set(after_create) == {1, 2, 3, 4}
+        assert event.occurs_until == BASE + timedelta(hours=2)
+
+        # The attendee who is dropped and the one who is added both see it
+        event.attendees = [users[4]]
+        await db.commit()
+        after_swap = await versions(db)
+        assert {user_id for user_id in after_swap if after_swap[user_id] != after_create.get(user_id)} == {1, 2, 3, 4, 5}
+
+        await db.delete(event)
+        await db.commit()
+        after_delete = await versions(db)
+        assert {user_id for user_id in after_delete if after_delete[user_id] != after_swap.get(user_id)} == {1, 2, 3, 5}
+        # User 6 never saw anything
+        assert 6 not in after_delete
+
+async def test_membership_change_bumps_old_and_new_members(sessions):
+    async with sessions() as db:
+        users = [User(id=n, email=f"user{n}@example.com") for n in range(1, 4)]
+        db.add_all(users)
+        await db.commit()
+        project = Project(id=1, customer_id=1, team_members=[users[1]])
+        db.add(project)
+        await db.commit()
+        before = await versions(db)
+
+        project.team_members = [users[2]]
+        await db.commit()
+        after = await versions(db)
+        assert {user_id for user_id in after if after[user_id] != before.get(user_id)} == {1, 2, 3}
+
+async def test_events_model_must_map_occurs_until(sessions):
+    class LegacyBase(DeclarativeBase):
+        pass
+
+    class LegacyEvent(LegacyBase):
+        __tablename__ = "events"
+        id = Column(Integer, primary_key=True)
+        title = Column(String(255), nullable=False)
+        start_time = Column(DateTime, nullable=False)
+        end_time = Column(DateTime, nullable=False)
+        creator_id = Column(Integer, nullable=False)
+        created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    async with sessions() as db:
+        db.add(LegacyEvent(title="Site visit", start_time=BASE, end_time=BASE, creator_id=1))
+        with pytest.raises(RuntimeError, match="occurs_until"):
+            await db.flush()
+
+def seed_calendar(connection, rng: random.Random) -> int:
+    """Events spread over a year in PROJECTS projects; returns a user in USER_PROJECTS of them"""
+    now = datetime.utcnow()
+    connection.execute(sa.insert(User.__table__), [
+        {"id": n, "email": f"user{n}@example.com", "hashed_password": "x",
+         "first_name": "First", "last_name": "Last", "created_at": now}
+        for n in range(1, USERS + 1)
+    ])
+    connection.execute(sa.insert(Project.__table__), [
+        {"id": n, "title": "Project", "status": "active", "construction_stage": "design",
+         "customer_id": rng.randint(2, USERS), "created_at": now}
+        for n in range(1, PROJECTS + 1)
+    ])
+    user_id = 1
+    members = {(project_id, user_id) for project_id in rng.sample(range(1, PROJECTS + 1), USER_PROJECTS)}
+    members.update((rng.randint(1, PROJECTS), rng.randint(2, USERS)) for _ in range(PROJECTS * 5))
+    connection.execute(sa.insert(project_team_members), [
+        {"project_id": project_id, "user_id": member_id} for project_id, member_id in members
+    ])
+
+    events = []
+    for project_id in range(1, PROJECTS + 1):
+        for _ in range(EVENTS_PER_PROJECT):
+            start = BASE + timedelta(hours=rng.randint(0, 24 * 365))
+            end = start + timedelta(hours=rng.randint(1, 4))
+            rule = "FREQ=WEEKLY;COUNT=12" if rng.random() < RECURRING_SHARE else None
+            events.append({
+                "title": "Site visit", "start_time": start, "end_time": end, "project_id": project_id,
+                "creator_id": rng.randint(2, USERS), "rrule": rule,
+                "occurs_until": compute_occurs_until(start, end, rule), "created_at": now
+            })
+    connection.execute(sa.insert(Event.__table__), events)
+    return user_id
+
+@pytest.mark.benchmark
+async def test_month_view_for_a_user_in_50_projects(sessions):
+    async with sessions() as db:
+        user_id = await db.run_sync(lambda session: seed_calendar(session.connection(), random.Random(24)))
+        await db.commit()
+
+    months = [(BASE.replace(month=month), BASE.replace(month=month + 1)) for month in range(1, 12)]
+    cold, warm = [], []
+    cache = CalendarCache()
+    async with sessions() as db:
+        for n in range(MONTH_READS):
+            start, end = months[n % len(months)]
+            started = time.perf_counter()
+            occurrences = await query_calendar(db, user_id, start, end)
+            cold.append(time.perf_counter() - started)
+
+            await cache.get(db, user_id, start, end)
+            started = time.perf_counter()
+            cached = await cache.get(db, user_id, start, end)
+            warm.append(time.perf_counter() - started)
+            assert cached == occurrences
+
+    report(
+        f"month view over {PROJECTS * EVENTS_PER_PROJECT} events, user in {USER_PROJECTS} projects",
+        occurrences=len(occurrences),
+        query_p50_ms=percentile(cold, 0.5) * 1000,
+        query_p99_ms=percentile(cold, 0.99) * 1000,
+        cached_p50_ms=percentile(warm, 0.5) * 1000,
+        cached_p99_ms=percentile(warm, 0.99) * 1000
+    )
+    assert occurrences
+    assert percentile(warm, 0.5) < percentile(cold, 0.5)
+
+@pytest.fixture(autouse=True)
+def no_cached_calendars(monkeypatch):
+    monkeypatch.setattr(calendar, "calendar_cache", CalendarCache())
@@ -0,0 +1,150 @@
+"""
+Soak test for ConnectionManager: 10k simulated sockets receiving
+notifications and sending heartbeats for several seconds, with a few
+stalled clients among them. Stalled sockets must be evicted without
+slowing down the broadcaster or the other sockets.
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.utils import connection_manager as manager_module
+from app.utils.connection_manager import HEARTBEAT_ACK, HEARTBEAT_MESSAGE, ConnectionManager
+from app.utils.notification_backplane import InProcessBackplane
+from bench import percentile, report
+
+SOCKETS = 10_000
+TABS_PER_USER = 4
+STALLED_SOCKETS = 20
+SOAK_SECONDS = 5.0
+TICK = 0.01
+NOTIFICATIONS_PER_SECOND = 2_000
+# Every socket sends a heartbeat each 30 s; ten times that here
+HEARTBEATS_PER_SECOND = SOCKETS / 3
+# Share of notifications addressed to users with a stalled tab, taken in
+# turn; enough for every stalled queue to fill well within the soak
+STALLED_USER_SHARE = 0.3
+
+class SimulatedSocket:
+    """In-memory WebSocket; a stalled one never finishes a send"""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.close_code = None
+        self.latencies = []
+        self.heartbeats_sent = 0
+        self.acks = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        if text == HEARTBEAT_ACK:
+            self.acks += 1
+        else:
+            self.latencies.append(time.perf_counter() - json.loads(text)["data"]["sent_at"])
+
+    async def receive_text(self) -> str:
+        message = await self.inbox.get()
+        if message is None:
+            raise WebSocketDisconnect(1000)
+        return message
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        self.close_code = code
+        self.inbox.put_nowait(None)
+
+    def heartbeat(self):
+        if not self.closed:
+            self.heartbeats_sent += 1
+            self.inbox.put_nowait(HEARTBEAT_MESSAGE)
+
+@pytest.mark.benchmark
+async def test_soak_10k_sockets():
+    rng = random.Random(15)
+    baseline_tasks = len(asyncio.all_tasks())
+    manager = ConnectionManager(InProcessBackplane())
+    await manager.start()
+
+    sockets = {}
+    listeners = []
+    try:
+        stalled_ids = set(rng.sample(range(SOCKETS), STALLED_SOCKETS))
+        for n in range(SOCKETS):
+            socket = SimulatedSocket(stalled=n in stalled_ids)
+            connection_id = f"conn-{n}"
+            sockets[connection_id] = socket
+            await manager.connect(socket, connection_id, user_id=n // TABS_PER_USER)
+            listeners.append(asyncio.create_task(manager.listen(connection_id)))
+
+        users = list(range(SOCKETS // TABS_PER_USER))
+        stalled_users = itertools.cycle(sorted({n // TABS_PER_USER for n in stalled_ids}))
+        socket_list = list(sockets.values())
+        publish_times = []
+        peak_queue = 0
+        notifications_per_tick = int(NOTIFICATIONS_PER_SECOND * TICK)
+        heartbeats_per_tick = int(HEARTBEATS_PER_SECOND * TICK)
+
+        started = time.perf_counter()
+        while time.perf_counter() - started < SOAK_SECONDS:
+            for _ in range(notifications_per_tick):
+                user_id = next(stalled_users) if rng.random() < STALLED_USER_SHARE else rng.choice(users)
+                publish_started = time.perf_counter()
+                await manager.send_personal_notification(
+                    user_id, {"type": "system", "title": "Site update", "data": {"sent_at": publish_started}}
+                )
+                publish_times.append(time.perf_counter() - publish_started)
+            for socket in rng.sample(socket_list, heartbeats_per_tick):
+                socket.heartbeat()
+            peak_queue = max(
+                peak_queue, *(connection.queue.qsize() for connection in manager.connections.values())
+            )
+            await asyncio.sleep(TICK)
+        # Let the writers drain
+        await asyncio.sleep(0.5)
+
+        live = [socket for socket in socket_list if not socket.stalled]
+        latencies = [latency for socket in live for latency in socket.latencies]
+        evicted = [socket for socket in socket_list if socket.close_code == manager_module.SLOW_CONSUMER_CLOSE_CODE]
+
+        report(
+            f"{SOCKETS} sockets for {SOAK_SECONDS:.0f} s",
+            notifications=len(publish_times),
+            delivered=len(latencies),
+            publish_p99_ms=percentile(publish_times, 0.99) * 1000,
+            delivery_p50_ms=percentile(latencies, 0.5) * 1000,
+            delivery_p99_ms=percentile(latencies, 0.99) * 1000,
+            heartbeats=sum(socket.heartbeats_sent for socket in live),
+            evicted=len(evicted),
+            peak_queue=peak_queue
+        )
+
+        # Stalled sockets are cut off once their queue fills, and only they are
+        assert {id(socket) for socket in evicted} == {id(socket) for socket in socket_list if socket.stalled}
+        assert manager.evicted == STALLED_SOCKETS
+        assert len(manager.connections) == SOCKETS - STALLED_SOCKETS
+        # Live sockets keep up, and every heartbeat was answered
+        assert all(socket.acks == socket.heartbeats_sent for socket in live)
+        assert peak_queue <= manager_module.SEND_QUEUE_SIZE
+        assert percentile(publish_times, 0.99) < 0.005
+        assert percentile(latencies, 0.99) < 0.25
+    finally:
+        await manager.stop()
+        # The clients hang up
+        for socket in sockets.values():
+            socket.inbox.put_nowait(None)
+        await asyncio.gather(*listeners)
+
+    # No writer or listener task outlives its socket
+    await asyncio.sleep(0)
+    assert len(asyncio.all_tasks()) == baseline_tasks
@@ -0,0 +1,69 @@
+"""
+FolderIdCache: shared lookups survive a cancelled caller, and workers
+writing the same cache file never leave it half-written.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+
+import pytest
+
+from app.utils.drive_folder_cache import FolderIdCache
+
+async def test_waiters_retry_when_the_resolving_caller_is_cancelled(tmp_path):
+    cache = FolderIdCache(path=str(tmp_path / "folders.json"))
+    started = asyncio.Event()
+    calls = []
+
+    async def resolve():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            started.set()
+            await asyncio.sleep(10)
+        await asyncio.sleep(0.01)
+        return "folder-1"
+
+    leader = asyncio.ensure_future(cache.single_flight("projects/1", resolve))
+    await started.wait()
+    waiters = [asyncio.ensure_future(cache.single_flight("projects/1", resolve)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # One waiter takes over the lookup and the others share it
+    assert await asyncio.gather(*waiters) == ["folder-1"] * 3
+    assert len(calls) == 2
+    assert cache._inflight == {}
+
+async def test_waiters_share_the_resolving_callers_error(tmp_path):
+    cache = FolderIdCache(path=str(tmp_path / "folders.json"))
+    release = asyncio.Event()
+
+    async def resolve():
+        await release.wait()
+        raise ConnectionError("Drive unavailable")
+
+    callers = [asyncio.ensure_future(cache.single_flight("projects/1", resolve)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+def test_concurrent_writers_never_publish_a_partial_file(tmp_path):
+    path = tmp_path / "folders.json"
+    caches = [FolderIdCache(path=str(path)) for _ in range(4)]
+    snapshots = [
+        {f"projects/{n}/{key}": [f"folder-{n}-{key}", 4e9] for key in range(500)}
+        for n in range(len(caches))
+    ]
+
+    def write(n):
+        for _ in range(20):
+            caches[n]._write(snapshots[n])
+            assert json.loads(path.read_text(encoding="utf-8")) in snapshots
+
+    with ThreadPoolExecutor(len(caches)) as pool:
+        list(pool.map(write, range(len(caches))))
+
+    assert [entry.name for entry in tmp_path.iterdir()] == ["folders.json"]
@@ -0,0 +1,272 @@
+"""
+Load test for GoogleDriveService: uploads to a slow local stand-in for the
+Drive API must not stall other requests served by the same worker.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("app.config")
+
+import httplib2
+import httpx
+from fastapi import FastAPI, UploadFile
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from starlette.datastructures import Headers
+
+from app.utils import google_drive
+from app.utils.drive_folder_cache import FolderIdCache
+from app.utils.google_drive import GoogleDriveService
+from bench import percentile, report
+
+# Time the stand-in takes to accept each upload chunk, i.e. how long a
+# blocking client would hold the event loop per upload
+CHUNK_DELAY = 0.25
+PARALLEL_UPLOADS = 16
+UPLOAD_SIZE = 2 * 1024 * 1024
+PROBE_REQUESTS = 200
+PROBE_INTERVAL = 0.005
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    """Just enough of the Drive v3 API for folder lookups and resumable uploads"""
+    ids = itertools.count(1)
+    # Folders the test has moved to the trash, and the parent of each upload
+    trashed_folders: set = set()
+    upload_parents: dict = {}
+    moves: list = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, body: dict, status: int = 200, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        # files().list for folder lookups: nothing exists yet
+        self._json({"files": []})
+
+    def do_POST(self):
+        body = self._read_body()
+        if "uploadType=resumable" in self.path:
+            session = f"session-{next(self.ids)}"
+            self.upload_parents[session] = json.loads(body)["parents"][0]
+            host, port = self.server.server_address
+            self._json({}, headers={"Location": f"http://{host}:{port}/upload/{session}"})
+        else:
+            self._json({"id": f"folder-{next(self.ids)}"})
+
+    def do_PUT(self):
+        self._read_body()
+        time.sleep(CHUNK_DELAY)
+        parent = self.upload_parents.pop(self.path.rsplit("/", 1)[-1])
+        self._json({"id": f"file-{next(self.ids)}", "trashed": parent in self.trashed_folders})
+
+    def do_PATCH(self):
+        # files().update moving a file to another folder
+        self._read_body()
+        query = parse_qs(urlparse(self.path).query)
+        self.moves.append((query["removeParents"][0], query["addParents"][0]))
+        self._json({"id": urlparse(self.path).path.rsplit("/", 1)[-1], "trashed": False})
+
+@pytest.fixture
+async def fake_drive(monkeypatch, tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDriveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+
+    # The bundled discovery document, pointed at the stand-in; api_endpoint
+    # alone would leave media uploads on https
+    discovery = json.loads(get_static_doc("drive", "v3"))
+    discovery["rootUrl"] = f"http://{host}:{port}/"
+    discovery["baseUrl"] = f"http://{host}:{port}/drive/v3/"
+    credentials = Credentials(token="test-token")
+    service = build_from_document(discovery, credentials=credentials)
+    monkeypatch.setattr(GoogleDriveService, "_credentials", credentials)
+    monkeypatch.setattr(GoogleDriveService, "_service", service)
+    monkeypatch.setattr(GoogleDriveService, "_transfer_slots", asyncio.Semaphore(google_drive.MAX_CONCURRENT_TRANSFERS))
+    folder_cache = FolderIdCache(path=str(tmp_path / "folders.json"))
+    monkeypatch.setattr(google_drive, "folder_cache", folder_cache)
+    yield google_drive.drive_service
+
+    if folder_cache._flush_task is not None:
+        await folder_cache._flush_task
+    server.shutdown()
+    server.server_close()
+
+def make_upload(name: str) -> UploadFile:
+    spooled = SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(b"x" * UPLOAD_SIZE)
+    spooled.seek(0)
+    return UploadFile(
+        file=spooled,
+        filename=name,
+        headers=Headers({"content-type": "application/octet-stream"})
+    )
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/projects")
+    async def list_projects():
+        # Cheap read endpoint sharing the event loop with the uploads
+        return [{"id": 1, "name": "Tower A"}]
+
+    return app
+
+async def probe_latencies(client: httpx.AsyncClient) -> list:
+    latencies = []
+    for _ in range(PROBE_REQUESTS):
+        started = time.perf_counter()
+        response = await client.get("/api/projects")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+@pytest.mark.benchmark
+async def test_parallel_uploads_do_not_stall_other_requests(fake_drive):
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://portal") as client:
+        idle = await probe_latencies(client)
+
+        uploads = asyncio.gather(*(
+            fake_drive.upload_file(make_upload(f"drawing-{n}.dwg"), "projects/123/drawings")
+            for n in range(PARALLEL_UPLOADS)
+        ))
+        busy = await probe_latencies(client)
+        file_ids = await uploads
+
+    assert len(set(file_ids)) == PARALLEL_UPLOADS
+    idle_p99, busy_p99 = percentile(idle, 0.99), percentile(busy, 0.99)
+    report(
+        "/api/projects latency during parallel uploads",
+        uploads=PARALLEL_UPLOADS,
+        idle_p99_ms=idle_p99 * 1000,
+        busy_p99_ms=busy_p99 * 1000
+    )
+    # A blocking Drive client would hold the loop for CHUNK_DELAY per upload
+    assert busy_p99 < CHUNK_DELAY / 2
+
+async def test_cancelled_upload_stops_between_chunks(fake_drive):
+    task = asyncio.ensure_future(fake_drive.upload_file(make_upload("large.dwg"), "projects/123"))
+    await asyncio.sleep(CHUNK_DELAY / 2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+async def test_upload_into_trashed_folder_is_moved_to_a_new_folder(fake_drive):
+    folder_id = await fake_drive._get_or_create_folder_path("projects/7/photos")
+    FakeDriveHandler.trashed_folders.add(folder_id)
+    try:
+        file_id = await fake_drive.upload_file(make_upload("site.jpg"), "projects/7/photos")
+    finally:
+        FakeDriveHandler.trashed_folders.discard(folder_id)
+
+    new_folder_id = google_drive.folder_cache.get(fake_drive._folder_key(["projects", "7", "photos"]))
+    assert new_folder_id not in (None, folder_id)
+    assert (folder_id, new_folder_id) in FakeDriveHandler.moves
+    assert file_id.startswith("file-")
+
+class FakeBatch:
+    """
+    Stand-in for BatchHttpRequest: reports each added request through the
+    callback, failing those for file IDs in `missing`
+    """
+    executed: list = []
+
+    def __init__(self, callback, missing: set, broken: bool = False):
+        self.callback = callback
+        self.missing = missing
+        self.broken = broken
+        self.requests = []
+
+    def add(self, request, request_id: str):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        file_ids = [request.uri.rsplit("/", 1)[-1].split("?")[0] for _, request in self.requests]
+        FakeBatch.executed.append(file_ids)
+        if self.broken:
+            raise httplib2.ServerNotFoundError("Unable to find the server at www.googleapis.com")
+        for (request_id, _), file_id in zip(self.requests, file_ids):
+            if file_id in self.missing:
+                error = HttpError(httplib2.Response({"status": 404}), b'{"error": {"message": "File not found"}}')
+                self.callback(request_id, None, error)
+            else:
+                self.callback(request_id, "", None)
+
+@pytest.fixture
+def fake_batches(fake_drive, monkeypatch):
+    """Batches the service creates; set `missing` or `broken_batches` to make them fail"""
+    FakeBatch.executed = []
+    options = {"missing": set(), "broken_batches": set()}
+
+    def new_batch_http_request(callback):
+        broken = len(FakeBatch.executed) in options["broken_batches"]
+        return FakeBatch(callback, options["missing"], broken)
+
+    monkeypatch.setattr(fake_drive._service, "new_batch_http_request", new_batch_http_request)
+    monkeypatch.setattr(google_drive, "MAX_BATCH_SIZE", 2)
+    return options
+
+async def test_delete_files_reports_each_file_of_a_partly_failed_batch(fake_drive, fake_batches):
+    fake_batches["missing"].add("b")
+    response = await fake_drive.delete_files(["a", "b", "c", "d", "e"])
+
+    assert sorted(FakeBatch.executed) == [["a", "b"], ["c", "d"], ["e"]]
+    assert (response.succeeded, response.failed) == (4, 1)
+    failed, = [result for result in response.results if not result.success]
+    assert failed.file_id == "b"
+    assert "File not found" in failed.error
+    assert [result.file_id for result in response.results] == ["a", "b", "c", "d", "e"]
+
+async def test_delete_files_fails_only_the_files_of_a_broken_batch(fake_drive, fake_batches, monkeypatch):
+    # Run the batches one at a time so the first one created is the broken one
+    monkeypatch.setattr(GoogleDriveService, "_transfer_slots", asyncio.Semaphore(1))
+    fake_batches["broken_batches"].add(0)
+    response = await fake_drive.delete_files(["a", "b", "c"])
+
+    broken = set(FakeBatch.executed[0])
+    assert (response.succeeded, response.failed) == (1, 2)
+    assert {result.file_id for result in response.results if not result.success} == broken
+
+async def test_upload_files_reports_each_file_when_some_fail(fake_drive, monkeypatch):
+    upload_to_folder = GoogleDriveService._upload_to_folder
+
+    async def failing_upload(self, file, folder_id, mime_type, on_progress):
+        if file.filename == "broken.dwg":
+            raise HttpError(httplib2.Response({"status": 403}), b'{"error": {"message": "Quota exceeded"}}')
+        return await upload_to_folder(self, file, folder_id, mime_type, on_progress)
+
+    monkeypatch.setattr(GoogleDriveService, "_upload_to_folder", failing_upload)
+    response = await fake_drive.upload_files(
+        [make_upload("plan.dwg"), make_upload("broken.dwg"), make_upload("section.dwg")],
+        "projects/9/drawings"
+    )
+
+    assert (response.succeeded, response.failed) == (2, 1)
+    assert [result.name for result in response.results] == ["plan.dwg", "broken.dwg", "section.dwg"]
+    failed, = [result for result in response.results if not result.success]
+    assert "Quota exceeded" in failed.error
+    assert all(result.file_id.startswith("file-") for result in response.results if result.success)
@@ -0,0 +1,243 @@
+"""
+Compiled translation lookups: the same results as formatting the source
+string, and a micro-benchmark against walking the nested translation dict.
+Also the translation bundle route (gzip, ETags, reloading) and language
+negotiation.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+import pytest
+
+pytest.importorskip("app.config")
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.routes import i18n as i18n_routes
+from app.utils import i18n as i18n_utils
+from app.utils.i18n import I18nManager, LanguageMiddleware, _Template, negotiate_language
+from bench import report
+
+SECTIONS = 20
+KEYS_PER_SECTION = 100
+LOOKUPS = 200_000
+
+def nested_get_text(translations, default_language, key, language=None, default=None, **kwargs):
+    """get_text as it was before translations were compiled"""
+    language = language or default_language
+    if language not in translations:
+        language = default_language
+    translation = translations.get(language, {})
+    for part in key.split('.'):
+        translation = translation.get(part, {})
+    if not translation or isinstance(translation, dict):
+        return default or key
+    try:
+        return translation.format(**kwargs)
+    except KeyError:
+        return translation
+
+@pytest.mark.parametrize("source, kwargs", [
+    ("Plain text", {}),
+    ("Plain text", {"name": "Nino"}),
+    ("Hello {name}", {"name": "Nino"}),
+    ("Hello {name}", {}),
+    ("{count} of {total} done", {"count": 3, "total": 7}),
+    ("{{count}} notifications", {"count": 3}),
+    ("{{literal}} and {name}", {"name": "Nino"}),
+    ("{name!r} is {age:>4d}", {"name": "Nino", "age": 7}),
+    ("{amount:{width}.2f}", {"amount": 3.14159, "width": 8}),
+    ("{user.title} {items[1]}", {"user": "nino", "items": ["a", "b"]}),
+    ("Hello {name}", {"other": 1}),
+    ("Positional {0}", {"name": "Nino"}),
+    ("Broken {name", {"name": "Nino"}),
+])
+def test_render_matches_str_format(source, kwargs):
+    try:
+        expected = source.format(**kwargs)
+    except (KeyError, IndexError, ValueError):
+        expected = source
+    assert _Template(source).render(kwargs) == expected
+
+@pytest.fixture
+def translations(tmp_path):
+    """A synthetic English catalogue; one key in ten takes arguments"""
+    catalogue = {
+        f"section{section}": {
+            f"key{key}": f"Item {{count}} of section {section}" if key % 10 == 0 else f"Text {section}.{key}"
+            for key in range(KEYS_PER_SECTION)
+        }
+        for section in range(SECTIONS)
+    }
+    (tmp_path / "en.json").write_text(json.dumps(catalogue), encoding="utf-8")
+    return catalogue
+
+@pytest.mark.benchmark
+def test_lookups_per_second(translations, tmp_path, monkeypatch):
+    manager = I18nManager()
+    manager.i18n_dir = tmp_path
+    manager.reload()
+    keys = [f"section{section}.key{key}" for section in range(SECTIONS) for key in range(KEYS_PER_SECTION)]
+    calls = [(keys[n % len(keys)], {"count": n} if n % 10 == 0 else {}) for n in range(LOOKUPS)]
+
+    started = time.perf_counter()
+    compiled = [manager.get_text(key, "en", **kwargs) for key, kwargs in calls]
+    compiled_seconds = time.perf_counter() - started
+
+    nested_translations = {"en": translations}
+    started = time.perf_counter()
+    nested = [nested_get_text(nested_translations, "en", key, "en", **kwargs) for key, kwargs in calls]
+    nested_seconds = time.perf_counter() - started
+
+    report(
+        f"{LOOKUPS} lookups over {len(keys)} keys",
+        compiled_per_second=LOOKUPS / compiled_seconds,
+        nested_per_second=LOOKUPS / nested_seconds,
+        speedup=nested_seconds / compiled_seconds
+    )
+    assert compiled == nested
+    assert compiled_seconds < nested_seconds
+
+BUNDLES = {
+    "en": {"common": {"save": "Save", "greeting": "Hello {name}"}},
+    "ka": {"common": {"save": "შენახვა"}}
+}
+
+@pytest.fixture
+def bundles(tmp_path, monkeypatch):
+    """The i18n singleton, reading BUNDLES from tmp_path"""
+    for language, catalogue in BUNDLES.items():
+        (tmp_path / f"{language}.json").write_text(json.dumps(catalogue, ensure_ascii=False), encoding="utf-8")
+    manager = I18nManager()
+    manager.i18n_dir = tmp_path
+    manager.reload()
+    monkeypatch.setattr(i18n_utils, "i18n", manager)
+    return manager
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LanguageMiddleware)
+    app.include_router(i18n_routes.router, prefix="/api/i18n")
+
+    @app.get("/api/language")
+    async def language(request: Request):
+        return {"language": request.state.language}
+
+    return app
+
+@pytest.fixture
+def client(bundles):
+    with TestClient(make_app()) as client:
+        yield client
+
+def test_bundle_is_served_gzipped_with_its_own_etag(client, bundles):
+    response = client.get("/api/i18n/ka", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == bundles.bundles["ka"].gzip_etag
+    assert response.headers["Cache-Control"] == "public, no-cache"
+    assert response.json() == BUNDLES["ka"]
+
+    plain = client.get("/api/i18n/ka", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] == bundles.bundles["ka"].etag
+    assert plain.content == bundles.bundles["ka"].body
+
+    assert client.get("/api/i18n/fr").status_code == 404
+
+@pytest.mark.parametrize("if_none_match, status_code", [
+    ("{etag}", 304),
+    ("W/{etag}", 304),
+    ('"other", {etag}', 304),
+    ("*", 304),
+    ('"other"', 200)
+])
+def test_matching_etag_gets_not_modified(client, bundles, if_none_match, status_code):
+    etag = bundles.bundles["en"].gzip_etag
+    response = client.get("/api/i18n/en", headers={
+        "Accept-Encoding": "gzip",
+        "If-None-Match": if_none_match.format(etag=etag)
+    })
+    assert response.status_code == status_code
+    if status_code == 304:
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+def test_gzip_etag_does_not_validate_the_plain_bundle(client, bundles):
+    response = client.get("/api/i18n/en", headers={
+        "Accept-Encoding": "identity",
+        "If-None-Match": bundles.bundles["en"].gzip_etag
+    })
+    assert response.status_code == 200
+
+def test_responses_vary_on_language_and_encoding(client):
+    vary = client.get("/api/i18n/en", headers={"Accept-Encoding": "gzip"}).headers["Vary"]
+    assert {part.strip() for part in vary.split(",")} >= {"Accept-Encoding", "Accept-Language", "Cookie"}
+    vary = client.get("/api/language").headers["Vary"]
+    assert {part.strip() for part in vary.split(",")} >= {"Accept-Language", "Cookie"}
+
+@pytest.mark.parametrize("accept_language, expected", [
+    ("ka", "ka"),
+    ("en-US,ka", "en"),
+    ("en;q=0.5,ka", "ka"),
+    ("en;q=0.8,ka;q=0.9", "ka"),
+    ("ka;q=0.7,en;q=0.7", "ka"),
+    ("en;q=0,ka;q=0.1", "ka"),
+    ("ka;q=oops,en;q=0.2", "en"),
+    ("fr,de;q=0.9", None),
+    ("", None)
+])
+def test_negotiate_language_honours_q_values(accept_language, expected):
+    assert negotiate_language(accept_language) == expected
+
+@pytest.mark.parametrize("headers, cookies, query, expected", [
+    ({"Accept-Language": "en;q=0.3,ka;q=0.6"}, {}, "", "ka"),
+    ({"Accept-Language": "fr"}, {"language": "ka"}, "", "ka"),
+    ({"Accept-Language": "ka"}, {}, "?lang=en", "en"),
+    ({}, {}, "", "en")
+])
+def test_request_language(bundles, headers, cookies, query, expected):
+    with TestClient(make_app(), cookies=cookies) as client:
+        assert client.get(f"/api/language{query}", headers=headers).json() == {"language": expected}
+
+async def test_watcher_reloads_changed_files(bundles, monkeypatch, tmp_path):
+    monkeypatch.setattr(i18n_utils, "TRANSLATION_RELOAD_INTERVAL", 0.01)
+    old_etag = bundles.bundles["en"].etag
+    bundles.start_watching()
+    try:
+        path = tmp_path / "en.json"
+        path.write_text(json.dumps({"common": {"save": "Save changes"}}), encoding="utf-8")
+        # Coarse filesystem clocks may leave the mtime unchanged
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if bundles.bundles["en"].etag != old_etag:
+                break
+
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://portal") as client:
+            response = await client.get("/api/i18n/en", headers={"If-None-Match": old_etag})
+    finally:
+        await bundles.stop_watching()
+
+    assert response.status_code == 200
+    assert response.json() == {"common": {"save": "Save changes"}}
+    assert bundles.get_text("common.save", "en") == "Save changes"
+    # The other language was not touched
+    assert bundles.get_text("common.save", "ka") == "შენახვა"
+
+def test_failed_reload_keeps_translations_and_logs(bundles, monkeypatch, caplog):
+    def broken_compile():
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(bundles, "_compile", broken_compile)
+    with caplog.at_level(logging.WARNING, logger="app.utils.i18n"):
+        bundles.reload()
+    assert bundles.get_text("common.save", "ka") == "შენახვა"
+    assert "Reloading translations failed: disk on fire" in caplog.text
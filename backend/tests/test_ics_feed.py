@@ -0,0 +1,189 @@
+"""
+ICS feeds on a migrated SQLite database: per-user feed tokens and their
+revocation, all-day recurrence rules, and feeds re-rendered only for the
+users a change concerns.
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import Column, DateTime, Integer, String, insert, update
+from sqlalchemy.orm import DeclarativeBase
+
+from app.utils import ics_feed
+from app.utils.ics_feed import (
+    IcsFeedCache,
+    _rrule,
+    current_feed_token,
+    issue_feed_token,
+    read_feed_token,
+    render_event
+)
+
+START = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+
+class Base(DeclarativeBase):
+    pass
+
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    creator_id = Column(Integer, nullable=False)
+    rrule = Column(String(500))
+    occurs_until = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+users_table = sa.table(
+    "users",
+    sa.column("id"),
+    sa.column("email"),
+    sa.column("hashed_password"),
+    sa.column("first_name"),
+    sa.column("last_name"),
+    sa.column("is_active"),
+    sa.column("created_at")
+)
+
+@pytest.fixture
+async def sessions(migrated_sessions, monkeypatch):
+    monkeypatch.setattr(ics_feed, "CALENDAR_FEED_SECRET", "feed-secret")
+    async with migrated_sessions() as db:
+        await db.execute(insert(users_table), [
+            {"id": n, "email": f"user{n}@example.com", "hashed_password": "x", "first_name": "First",
+             "last_name": f"User{n}", "is_active": True, "created_at": datetime.utcnow()}
+            for n in (1, 2)
+        ])
+        await db.commit()
+    return migrated_sessions
+
+async def test_feed_tokens_are_revoked_per_user(sessions):
+    async with sessions() as db:
+        first = await issue_feed_token(db, 1)
+        other = await issue_feed_token(db, 2)
+        assert await issue_feed_token(db, 1) == first
+        assert await read_feed_token(db, first) == 1
+
+        renewed = await issue_feed_token(db, 1, reset=True)
+        assert renewed != first
+        assert await read_feed_token(db, first) is None
+        assert await read_feed_token(db, renewed) == 1
+        # Other users keep their URLs
+        assert await read_feed_token(db, other) == 2
+
+async def test_feed_tokens_need_an_active_user(sessions):
+    async with sessions() as db:
+        token = await issue_feed_token(db, 2)
+        user_id, _, signature = token.partition(".")
+        assert await read_feed_token(db, f"1.{signature}") is None
+        assert await read_feed_token(db, f"3.{signature}") is None
+        assert await read_feed_token(db, f"{user_id}.{signature[:-1]}0") is None
+
+        await db.execute(update(users_table).where(users_table.c.id == 2).values(is_active=False))
+        assert await read_feed_token(db, token) is None
+        await db.execute(sa.delete(users_table).where(users_table.c.id == 2))
+        assert await read_feed_token(db, token) is None
+
+async def feed_key(db, user_id: int):
+    return (await db.execute(
+        sa.select(ics_feed.feed_keys_table.c.calendar_feed_key).where(ics_feed.feed_keys_table.c.id == user_id)
+    )).scalar()
+
+async def test_current_feed_token_never_creates_a_key(sessions):
+    async with sessions() as db:
+        assert await current_feed_token(db, 1) is None
+        assert await feed_key(db, 1) is None
+
+        token = await issue_feed_token(db, 1)
+        assert await current_feed_token(db, 1) == token
+        assert await current_feed_token(db, 2) is None
+
+@pytest.fixture
+def feed_client(sessions, monkeypatch):
+    """Calendar routes on the migrated database, signed in as user 1"""
+    pytest.importorskip("app.config")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routes import calendar as calendar_routes
+    from app.routes.auth import get_current_user
+
+    @asynccontextmanager
+    async def session():
+        async with sessions() as db:
+            yield db
+            await db.commit()
+
+    monkeypatch.setattr(calendar_routes, "get_db", session)
+    monkeypatch.setattr(calendar_routes, "get_readonly_db", session)
+    app = FastAPI()
+    app.include_router(calendar_routes.router, prefix="/api/calendar")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    with TestClient(app) as client:
+        yield client
+
+async def test_get_feed_url_needs_a_created_url(feed_client, sessions):
+    assert feed_client.get("/api/calendar/feed-url").status_code == 404
+    async with sessions() as db:
+        assert await feed_key(db, 1) is None
+
+    created = feed_client.post("/api/calendar/feed-url")
+    assert created.status_code == 200
+    assert feed_client.post("/api/calendar/feed-url").json() == created.json()
+    assert feed_client.get("/api/calendar/feed-url").json() == created.json()
+
+    renewed = feed_client.post("/api/calendar/feed-url/reset").json()
+    assert renewed != created.json()
+    assert feed_client.get("/api/calendar/feed-url").json() == renewed
+
+async def test_feeds_are_off_without_a_secret(sessions, monkeypatch):
+    async with sessions() as db:
+        token = await issue_feed_token(db, 1)
+        monkeypatch.setattr(ics_feed, "CALENDAR_FEED_SECRET", None)
+        assert await issue_feed_token(db, 1) is None
+        assert await read_feed_token(db, token) is None
+
+@pytest.mark.parametrize("rule, all_day, expected", [
+    ("FREQ=WEEKLY;UNTIL=20260301T090000", False, "FREQ=WEEKLY;UNTIL=20260301T090000Z"),
+    ("FREQ=WEEKLY;UNTIL=20260301T090000Z", False, "FREQ=WEEKLY;UNTIL=20260301T090000Z"),
+    ("FREQ=WEEKLY;UNTIL=20260301T000000", True, "FREQ=WEEKLY;UNTIL=20260301"),
+    ("FREQ=WEEKLY;UNTIL=20260301T000000Z;BYDAY=MO", True, "FREQ=WEEKLY;UNTIL=20260301;BYDAY=MO"),
+    ("FREQ=WEEKLY;UNTIL=20260301", True, "FREQ=WEEKLY;UNTIL=20260301"),
+    ("FREQ=DAILY;COUNT=5", True, "FREQ=DAILY;COUNT=5")
+])
+def test_until_matches_dtstart(rule, all_day, expected):
+    assert _rrule(rule, all_day) == expected
+
+def test_all_day_series_uses_dates():
+    day = datetime(2026, 2, 2)
+    body = render_event(
+        {"id": 1, "title": "Inspection", "start_time": day, "end_time": day, "is_all_day": True,
+         "rrule": "FREQ=WEEKLY;UNTIL=20260301T000000Z", "creator_id": 1},
+        {}, [], []
+    ).decode()
+    assert "DTSTART;VALUE=DATE:20260202\r\n" in body
+    assert "RRULE:FREQ=WEEKLY;UNTIL=20260301\r\n" in body
+
+async def test_feed_cache_re_renders_only_affected_users(sessions):
+    async with sessions() as db:
+        db.add_all([
+            Event(id=1, title="Mine", start_time=START, end_time=START + timedelta(hours=1), creator_id=1),
+            Event(id=2, title="Theirs", start_time=START, end_time=START + timedelta(hours=1), creator_id=2)
+        ])
+        await db.commit()
+
+        cache = IcsFeedCache()
+        mine, theirs = await cache.get(db, 1), await cache.get(db, 2)
+
+        event = await db.get(Event, 2)
+        event.title = "Theirs, moved"
+        await db.commit()
+
+        assert await cache.get(db, 1) is mine
+        renewed = await cache.get(db, 2)
+        assert renewed is not theirs
+        assert b"SUMMARY:Theirs\\, moved" in b"".join(renewed)
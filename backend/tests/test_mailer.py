@@ -0,0 +1,172 @@
+"""
+Throughput harness for the mailer against a local aiosmtpd server, reached
+through a proxy that adds network latency: messages per second with a
+session per message, with pooled sessions, and with pooled sessions that
+pipeline each transaction.
+"""
+import asyncio
+import socket
+import time
+
+import pytest
+
+pytest.importorskip("app.config")
+
+from aiosmtpd.controller import Controller
+
+from app.utils import mailer
+from app.utils.mailer import SMTPConnectionPool, build_email, send_email, send_emails
+from bench import report
+
+MESSAGES = 100
+# One-way delay added by the proxy, for a 10 ms round-trip
+LATENCY = 0.005
+
+class RecordingHandler:
+    """aiosmtpd handler that keeps what it receives"""
+
+    def __init__(self, pipelining: bool = True, refused: tuple = ()):
+        self.pipelining = pipelining
+        self.refused = set(refused)
+        self.delivered = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.pipelining:
+            responses.insert(-1, "250-PIPELINING")
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.append((envelope.rcpt_tos[:], envelope.content))
+        return "250 Message accepted"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def delayed_pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Forward bytes after LATENCY, keeping their order"""
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def deliver():
+        while (item := await chunks.get()) is not None:
+            due, data = item
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    delivery = asyncio.ensure_future(deliver())
+    try:
+        while data := await reader.read(65536):
+            chunks.put_nowait((time.monotonic() + LATENCY, data))
+    except ConnectionError:
+        pass
+    finally:
+        chunks.put_nowait(None)
+        await delivery
+
+@pytest.fixture
+async def smtp_server(monkeypatch):
+    """Start aiosmtpd behind a latency proxy; yields a function taking the handler"""
+    started = []
+
+    async def start(handler: RecordingHandler) -> RecordingHandler:
+        controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+
+        async def proxy(client_reader, client_writer):
+            server_reader, server_writer = await asyncio.open_connection("127.0.0.1", controller.port)
+            await asyncio.gather(
+                delayed_pipe(client_reader, server_writer),
+                delayed_pipe(server_reader, client_writer)
+            )
+
+        proxy_server = await asyncio.start_server(proxy, "127.0.0.1", 0)
+        started.append((controller, proxy_server))
+        monkeypatch.setattr(mailer, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(mailer, "SMTP_PORT", proxy_server.sockets[0].getsockname()[1])
+        monkeypatch.setattr(mailer, "SMTP_START_TLS", False)
+        monkeypatch.setattr(mailer, "SMTP_USERNAME", None)
+        monkeypatch.setattr(mailer, "smtp_pool", SMTPConnectionPool())
+        return handler
+
+    yield start
+
+    await mailer.close_mailer()
+    for controller, proxy_server in started:
+        proxy_server.close()
+        await proxy_server.wait_closed()
+        controller.stop()
+
+def make_messages(count: int) -> list:
+    return [build_email(f"user{n}@example.com", "Site closed", "No access today.\n.\nThanks") for n in range(count)]
+
+async def messages_per_second(handler: RecordingHandler) -> float:
+    started = time.perf_counter()
+    stats = await send_emails(make_messages(MESSAGES))
+    elapsed = time.perf_counter() - started
+    assert stats == {"sent": MESSAGES, "failed": 0, "failed_to": []}
+    assert len(handler.delivered) == MESSAGES
+    await mailer.close_mailer()
+    return MESSAGES / elapsed
+
+@pytest.mark.benchmark
+async def test_messages_per_second(smtp_server, monkeypatch):
+    results = {}
+
+    messages_per_connection = mailer.SMTP_MAX_MESSAGES_PER_CONNECTION
+    handler = await smtp_server(RecordingHandler(pipelining=False))
+    monkeypatch.setattr(mailer, "SMTP_MAX_MESSAGES_PER_CONNECTION", 1)
+    results["session_per_message"] = await messages_per_second(handler)
+    monkeypatch.setattr(mailer, "SMTP_MAX_MESSAGES_PER_CONNECTION", messages_per_connection)
+
+    handler = await smtp_server(RecordingHandler(pipelining=False))
+    results["pooled"] = await messages_per_second(handler)
+
+    handler = await smtp_server(RecordingHandler(pipelining=True))
+    results["pooled_pipelined"] = await messages_per_second(handler)
+
+    report(
+        f"mailer throughput, messages/s over a {LATENCY * 2000:.0f} ms round-trip",
+        pool_size=mailer.SMTP_POOL_SIZE,
+        **results
+    )
+    assert results["session_per_message"] < results["pooled"] < results["pooled_pipelined"]
+
+async def test_pipelined_message_arrives_intact(smtp_server):
+    handler = await smtp_server(RecordingHandler())
+    assert await send_email(build_email("a@example.com", "Site closed", "Line one\n.\n..two"))
+    (recipients, content), = handler.delivered
+    assert recipients == ["a@example.com"]
+    assert content.endswith(b"Line one\r\n.\r\n..two\r\n")
+
+async def test_refused_recipient_is_not_delivered(smtp_server):
+    handler = await smtp_server(RecordingHandler(refused={"nobody@example.com"}))
+    assert not await send_email(build_email("nobody@example.com", "Site closed", "Hello"))
+    assert await send_email(build_email("a@example.com", "Site closed", "Hello"))
+    assert [recipients for recipients, _ in handler.delivered] == [["a@example.com"]]
+
+@pytest.mark.parametrize("error", [ConnectionResetError, OSError])
+async def test_close_ignores_a_connection_the_server_dropped(smtp_server, monkeypatch, error):
+    await smtp_server(RecordingHandler())
+    pool = SMTPConnectionPool()
+    async with pool.connection():
+        pass
+    (client, _, _), = pool._idle
+
+    async def quit(*args, **kwargs):
+        raise error("Connection reset by peer")
+
+    monkeypatch.setattr(client, "quit", quit)
+    await pool.close()
+    assert not client.is_connected
+    # Let the proxy see the connection go before the loop closes
+    await asyncio.sleep(2 * LATENCY)
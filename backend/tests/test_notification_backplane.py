@@ -0,0 +1,108 @@
+"""
+Backplane contract, delivery without start(), and delivery between
+workers through RedisBackplane on a shared fakeredis server
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.utils import connection_manager
+from app.utils.connection_manager import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+from app.utils.notification_backplane import Backplane, InProcessBackplane, RedisBackplane
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+def test_backplane_requires_publish():
+    class Incomplete(Backplane):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+async def test_in_process_delivery_without_start():
+    manager = ConnectionManager(InProcessBackplane())
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, "conn-1", user_id=7)
+
+    await manager.send_personal_notification(7, {"type": "system", "title": "Site closed"})
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == [{"type": "notification", "notification_type": "system", "title": "Site closed"}]
+    await manager.stop()
+
+async def test_unbound_in_process_backplane_fails_clearly():
+    with pytest.raises(RuntimeError, match="no delivery callback"):
+        await InProcessBackplane().publish(7, "{}")
+
+async def test_redis_backplane_must_be_started_before_subscribing():
+    aioredis = pytest.importorskip("fakeredis.aioredis")
+    backplane = RedisBackplane(client=aioredis.FakeRedis())
+    with pytest.raises(RuntimeError, match="start"):
+        await backplane.subscribe(7)
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+async def test_redis_backplane_delivers_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    from fakeredis import aioredis
+
+    server = fakeredis.FakeServer()
+    workers = [ConnectionManager(RedisBackplane(client=aioredis.FakeRedis(server=server))) for _ in range(2)]
+    for worker in workers:
+        await worker.start()
+    try:
+        # User 7 is connected to the second worker only
+        websocket = FakeWebSocket()
+        await workers[1].connect(websocket, "conn-1", user_id=7)
+
+        await workers[0].send_personal_notification(7, {"type": "task", "title": "Inspection due"})
+        await wait_for(lambda: websocket.sent)
+        assert websocket.sent == [{"type": "notification", "notification_type": "task", "title": "Inspection due"}]
+
+        # Once the user's last socket closes, the worker stops listening
+        await workers[1].disconnect("conn-1")
+        await workers[0].send_personal_notification(7, {"type": "task", "title": "Missed"})
+        await asyncio.sleep(0.1)
+        assert len(websocket.sent) == 1
+    finally:
+        for worker in workers:
+            await worker.stop()
+
+async def test_slow_consumer_eviction_is_tracked_until_done(monkeypatch):
+    monkeypatch.setattr(connection_manager, "SEND_QUEUE_SIZE", 1)
+    manager = ConnectionManager(InProcessBackplane())
+    websocket = FakeWebSocket()
+    stalled = asyncio.Event()
+
+    async def stall(text: str):
+        await stalled.wait()
+
+    websocket.send_text = stall
+    await manager.connect(websocket, "conn-1", user_id=7)
+    for n in range(3):
+        await manager.send_personal_notification(7, {"type": "system", "title": f"Update {n}"})
+
+    assert manager.evicted == 1
+    assert len(manager._evictions) == 1
+    await asyncio.gather(*manager._evictions)
+    assert manager._evictions == set()
+    assert websocket.close_code == SLOW_CONSUMER_CLOSE_CODE
+    assert "conn-1" not in manager.connections
+    # Let the cancelled writer finish
+    await asyncio.sleep(0)
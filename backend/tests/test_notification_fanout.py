@@ -0,0 +1,158 @@
+"""
+Benchmark of send_bulk_notification for a large recipient list, against
+the old fan-out of one send_notification per user. Sockets and SMTP are
+replaced by recorders, so this measures the fan-out itself: tasks in
+flight, SMTP sessions and address lookups.
+"""
+import asyncio
+import math
+import time
+
+import pytest
+
+pytest.importorskip("app.config")
+pytest.importorskip("app.routes.notifications")
+
+from app.utils import notifications
+from app.utils.notifications import NotificationType, send_bulk_notification, send_notification
+from bench import report
+
+RECIPIENTS = 10_000
+# Time to open an SMTP session (connect, EHLO, STARTTLS, AUTH)
+SMTP_SESSION_DELAY = 0.005
+TASK_SAMPLE_INTERVAL = 100
+
+class Recorder:
+    """Stands in for the connection manager, address lookups and SMTP"""
+
+    def __init__(self, failing_users=()):
+        self.failing_users = set(failing_users)
+        self.in_app = 0
+        self.emails = 0
+        self.smtp_sessions = 0
+        self.address_lookups = 0
+        self.message_ids = []
+        self.calls = 0
+        self.in_flight = {"in_app": 0, "smtp": 0}
+        self.peak = {"in_app": 0, "smtp": 0, "tasks": 0}
+
+    def _enter(self, kind: str):
+        self.in_flight[kind] += 1
+        self.peak[kind] = max(self.peak[kind], self.in_flight[kind])
+        self.calls += 1
+        # Counting tasks walks all of them, so only sample
+        if self.calls % TASK_SAMPLE_INTERVAL == 0:
+            self.peak["tasks"] = max(self.peak["tasks"], len(asyncio.all_tasks()))
+
+    async def send_personal_notification(self, user_id, notification):
+        self._enter("in_app")
+        try:
+            await asyncio.sleep(0)
+            if user_id in self.failing_users:
+                raise ConnectionError("socket closed")
+            self.in_app += 1
+        finally:
+            self.in_flight["in_app"] -= 1
+
+    async def get_user_emails(self, user_ids):
+        self.address_lookups += 1
+        return {user_id: f"user{user_id}@example.com" for user_id in user_ids}
+
+    async def send_emails(self, messages):
+        self._enter("smtp")
+        try:
+            self.smtp_sessions += 1
+            await asyncio.sleep(SMTP_SESSION_DELAY)
+            messages = list(messages)
+            self.message_ids += [message["Message-ID"] for message in messages]
+            sent = len(messages)
+            self.emails += sent
+            return {"sent": sent, "failed": 0, "failed_to": []}
+        finally:
+            self.in_flight["smtp"] -= 1
+
+    async def send_email(self, message):
+        return (await self.send_emails([message]))["sent"] == 1
+
+def install(monkeypatch, recorder: Recorder) -> Recorder:
+    monkeypatch.setattr(notifications, "notification_manager", recorder)
+    for name in ("get_user_emails", "send_emails", "send_email"):
+        monkeypatch.setattr(notifications, name, getattr(recorder, name))
+    return recorder
+
+@pytest.fixture
+def recorder(monkeypatch):
+    return install(monkeypatch, Recorder())
+
+async def old_fan_out(user_ids):
+    """send_bulk_notification as it was: one send_notification per user"""
+    await asyncio.gather(*(
+        send_notification(user_id, NotificationType.SYSTEM, "Site closed", "No access today")
+        for user_id in user_ids
+    ))
+
+@pytest.mark.benchmark
+async def test_fan_out_to_10k_recipients(monkeypatch):
+    user_ids = list(range(1, RECIPIENTS + 1))
+    results = {}
+    for name, fan_out in (
+        ("old", old_fan_out),
+        ("bulk", lambda ids: send_bulk_notification(ids, NotificationType.SYSTEM, "Site closed", "No access today")),
+    ):
+        recorder = install(monkeypatch, Recorder())
+        started = time.perf_counter()
+        stats = await fan_out(user_ids)
+        elapsed = time.perf_counter() - started
+        assert recorder.in_app == recorder.emails == RECIPIENTS
+        results[name] = (recorder, elapsed, stats)
+        report(
+            f"{name} fan-out to {RECIPIENTS} recipients",
+            seconds=elapsed,
+            peak_tasks=recorder.peak["tasks"],
+            peak_in_app_sends=recorder.peak["in_app"],
+            smtp_sessions=recorder.smtp_sessions,
+            peak_smtp_sessions=recorder.peak["smtp"],
+            address_lookups=recorder.address_lookups
+        )
+
+    old, _, _ = results["old"]
+    bulk, _, stats = results["bulk"]
+    assert old.smtp_sessions == RECIPIENTS
+    assert bulk.smtp_sessions == math.ceil(RECIPIENTS / notifications.EMAIL_BATCH_SIZE)
+    assert bulk.address_lookups == bulk.smtp_sessions
+    assert bulk.peak["in_app"] <= notifications.IN_APP_BATCH_SIZE
+    assert bulk.peak["smtp"] <= notifications.MAX_CONCURRENT_EMAIL_BATCHES
+    # One task per email batch plus one in-app batch, against several per user
+    assert old.peak["tasks"] > RECIPIENTS
+    assert bulk.peak["tasks"] < notifications.IN_APP_BATCH_SIZE + bulk.smtp_sessions + 10
+    assert stats == {
+        "recipients": RECIPIENTS,
+        "in_app_sent": RECIPIENTS,
+        "in_app_failed": 0,
+        "email_sent": RECIPIENTS,
+        "email_failed": 0,
+        "in_app_failed_user_ids": [],
+        "email_failed_user_ids": []
+    }
+
+async def test_failed_in_app_sends_are_counted(recorder):
+    recorder.failing_users.update({3, 5})
+    stats = await send_bulk_notification(
+        [1, 2, 3, 4, 5, 5], NotificationType.SYSTEM, "Site closed", "No access today",
+        channel=notifications.NotificationChannel.IN_APP
+    )
+    assert stats["recipients"] == 5
+    assert (stats["in_app_sent"], stats["in_app_failed"]) == (3, 2)
+    assert stats["in_app_failed_user_ids"] == [3, 5]
+    assert recorder.smtp_sessions == 0
+
+async def test_emails_get_a_message_id_per_notification_and_user(recorder):
+    for _ in range(2):
+        await send_bulk_notification(
+            [1, 2], NotificationType.SYSTEM, "Site closed", "No access today",
+            channel=notifications.NotificationChannel.EMAIL, notification_id="key-1"
+        )
+    first, second = recorder.message_ids[:2], recorder.message_ids[2:]
+    # The same on redelivery, different per recipient
+    assert first == second
+    assert first[0].startswith("<key-1.1@") and first[1].startswith("<key-1.2@")
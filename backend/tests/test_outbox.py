@@ -0,0 +1,150 @@
+"""
+OutboxDispatcher against a SQLite outbox: claims are committed before
+anything is sent, and failed recipients are retried on their own.
+"""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("app.config")
+pytest.importorskip("app.routes.notifications")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.notification_outbox import NotificationOutbox
+from app.utils import outbox
+from app.utils.outbox import OutboxDispatcher
+
+class FakeDelivery:
+    """Stands in for send_bulk_notification, failing the given users once"""
+
+    def __init__(self, fail_once=(), raise_once=False):
+        self.fail_once = {channel: set(users) for channel, users in dict(fail_once).items()}
+        self.raise_once = raise_once
+        self.calls = []
+        self.during_send = None
+
+    async def __call__(self, user_ids, notification_type, title, message, data,
+                      priority, channel, notification_id=None):
+        self.calls.append((channel.value, list(user_ids), notification_id))
+        if self.during_send is not None:
+            await self.during_send()
+        if self.raise_once:
+            self.raise_once = False
+            raise ConnectionError("SMTP server unavailable")
+        failed = [user_id for user_id in user_ids if user_id in self.fail_once.get(channel.value, ())]
+        self.fail_once.pop(channel.value, None)
+        return {f"{channel.value}_failed_user_ids": failed}
+
+@pytest.fixture
+async def sessions(monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'outbox.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(NotificationOutbox.__table__.create)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(outbox, "AsyncSessionLocal", session_factory)
+    yield session_factory
+    await engine.dispose()
+
+async def add_entry(sessions, channel="both", user_ids=(1, 2, 3)) -> int:
+    async with sessions() as db:
+        entry = NotificationOutbox(
+            idempotency_key="key-1",
+            user_ids=list(user_ids),
+            notification_type="system",
+            title="Site closed",
+            message="No access today",
+            data={},
+            priority="medium",
+            channel=channel,
+            attempts=0,
+            available_at=datetime.utcnow()
+        )
+        db.add(entry)
+        await db.commit()
+        return entry.id
+
+async def load(sessions, entry_id) -> NotificationOutbox:
+    async with sessions() as db:
+        return await db.get(NotificationOutbox, entry_id)
+
+async def make_due(sessions, entry_id):
+    async with sessions() as db:
+        (await db.get(NotificationOutbox, entry_id)).available_at = datetime.utcnow()
+        await db.commit()
+
+async def test_claim_is_committed_before_sending(sessions, monkeypatch):
+    entry_id = await add_entry(sessions)
+    seen = []
+
+    async def check_claim():
+        # A separate session sees the claim, and no lock blocks writing the row
+        async with sessions() as db:
+            entry = await db.get(NotificationOutbox, entry_id)
+            seen.append((entry.attempts, entry.available_at > datetime.utcnow()))
+            entry.last_error = None
+            await db.commit()
+
+    delivery = FakeDelivery()
+    delivery.during_send = check_claim
+    monkeypatch.setattr(outbox, "send_bulk_notification", delivery)
+
+    assert await OutboxDispatcher().dispatch_batch() == 1
+    assert seen[0] == (1, True)
+    assert (await load(sessions, entry_id)).dispatched_at is not None
+    # A claimed row is not handed out again
+    assert await OutboxDispatcher().dispatch_batch() == 0
+
+async def test_failed_recipients_are_retried_alone(sessions, monkeypatch):
+    entry_id = await add_entry(sessions)
+    delivery = FakeDelivery(fail_once={"email": {2}})
+    monkeypatch.setattr(outbox, "send_bulk_notification", delivery)
+    dispatcher = OutboxDispatcher()
+
+    await dispatcher.dispatch_batch()
+    entry = await load(sessions, entry_id)
+    assert entry.dispatched_at is None
+    assert entry.pending == {"email": [2]}
+    assert entry.available_at > datetime.utcnow()
+    assert entry.last_error == "1 email deliveries failed"
+
+    await make_due(sessions, entry_id)
+    await dispatcher.dispatch_batch()
+    entry = await load(sessions, entry_id)
+    assert entry.dispatched_at is not None
+    assert entry.attempts == 2
+    assert delivery.calls == [
+        ("in_app", [1, 2, 3], "key-1"),
+        ("email", [1, 2, 3], "key-1"),
+        ("email", [2], "key-1"),
+    ]
+
+async def test_raising_channel_is_retried_in_full(sessions, monkeypatch):
+    entry_id = await add_entry(sessions, channel="email")
+    delivery = FakeDelivery(raise_once=True)
+    monkeypatch.setattr(outbox, "send_bulk_notification", delivery)
+    dispatcher = OutboxDispatcher()
+
+    await dispatcher.dispatch_batch()
+    entry = await load(sessions, entry_id)
+    assert entry.pending == {"email": [1, 2, 3]}
+    assert entry.last_error == "SMTP server unavailable"
+
+    await make_due(sessions, entry_id)
+    await dispatcher.dispatch_batch()
+    assert (await load(sessions, entry_id)).dispatched_at is not None
+    assert [call[0] for call in delivery.calls] == ["email", "email"]
+
+async def test_entry_is_abandoned_after_max_attempts(sessions, monkeypatch):
+    entry_id = await add_entry(sessions, channel="in_app")
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(outbox, "send_bulk_notification", FakeDelivery(fail_once={"in_app": {1}}))
+    dispatcher = OutboxDispatcher()
+    await dispatcher.dispatch_batch()
+    await make_due(sessions, entry_id)
+    monkeypatch.setattr(outbox, "send_bulk_notification", FakeDelivery(raise_once=True))
+    await dispatcher.dispatch_batch()
+    await make_due(sessions, entry_id)
+    assert await dispatcher.dispatch_batch() == 0
+    assert (await load(sessions, entry_id)).attempts == 2
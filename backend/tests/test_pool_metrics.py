@@ -0,0 +1,79 @@
+"""
+Pool metrics of an InstrumentedQueuePool over SQLite: checkout waits,
+connection opening kept out of them, and metrics surviving a dispose
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import event, select, literal
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.utils.pool_metrics import InstrumentedQueuePool, PoolMetrics
+
+HOLD_SECONDS = 0.2
+CONNECT_SECONDS = 0.2
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0
+    )
+    yield engine
+    await engine.dispose()
+
+@pytest.fixture
+def metrics(engine):
+    metrics = PoolMetrics("test")
+    metrics.attach(engine)
+    return metrics
+
+async def hold_connection(engine, seconds: float):
+    async with engine.connect() as connection:
+        await connection.execute(select(literal(1)))
+        await asyncio.sleep(seconds)
+
+async def test_exhausted_pool_records_the_wait(engine, metrics):
+    holder = asyncio.create_task(hold_connection(engine, HOLD_SECONDS))
+    await asyncio.sleep(0.05)
+    await hold_connection(engine, 0)
+    await holder
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["peak_checked_out"] == 1
+    assert snapshot["wait_seconds"]["samples"] == 2
+    assert snapshot["wait_seconds"]["max"] >= HOLD_SECONDS - 0.1
+
+async def test_opening_a_connection_is_not_a_wait(engine, metrics):
+    @event.listens_for(engine.sync_engine, "connect")
+    def slow_connect(dbapi_connection, connection_record):
+        time.sleep(CONNECT_SECONDS)
+
+    started = time.perf_counter()
+    await hold_connection(engine, 0)
+    assert time.perf_counter() - started >= CONNECT_SECONDS
+
+    snapshot = metrics.snapshot()
+    assert snapshot["wait_seconds"]["samples"] == 1
+    assert snapshot["wait_seconds"]["max"] < CONNECT_SECONDS / 2
+
+async def test_metrics_survive_a_recreated_pool(engine, metrics):
+    await hold_connection(engine, 0)
+    await engine.dispose()
+    pool = engine.sync_engine.pool
+    assert pool._metrics is metrics
+
+    holder = asyncio.create_task(hold_connection(engine, HOLD_SECONDS))
+    await asyncio.sleep(0.05)
+    await hold_connection(engine, 0)
+    await holder
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 3
+    assert snapshot["wait_seconds"]["samples"] == 3
+    assert snapshot["wait_seconds"]["max"] >= HOLD_SECONDS - 0.1
+    assert snapshot["connection_age_seconds"]["connections"] == 1
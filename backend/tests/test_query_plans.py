@@ -0,0 +1,165 @@
+"""
+EXPLAIN checks for the hot queries: each must be answered from an index,
+never by scanning a whole table. Needs TEST_MYSQL_URL (see conftest.py).
+"""
+from datetime import datetime, timedelta
+import random
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import select
+
+from app.utils.calendar import events_table, visible_event_ids
+
+BASE = datetime(2026, 1, 1)
+USERS = 200
+PROJECTS = 100
+EVENTS = 5000
+REVISIONS_PER_PAGE = 25
+PAGES = 200
+FILES = 3000
+
+# Access types that read every row of a table or of an entire index
+FULL_SCANS = {"ALL", "index"}
+
+def seed(connection):
+    rng = random.Random(10)
+    now = datetime.utcnow()
+    connection.execute(sa.text(
+        "INSERT INTO users (id, email, hashed_password, first_name, last_name, role, is_active, created_at) "
+        "VALUES (:id, :email, 'x', 'First', 'Last', 'customer', 1, :now)"
+    ), [{"id": n, "email": f"user{n}@example.com", "now": now} for n in range(1, USERS + 1)])
+    connection.execute(sa.text(
+        "INSERT INTO projects (id, title, status, construction_stage, customer_id, created_at) "
+        "VALUES (:id, 'Project', 'active', 'design', :customer_id, :now)"
+    ), [{"id": n, "customer_id": rng.randint(1, USERS), "now": now} for n in range(1, PROJECTS + 1)])
+    connection.execute(sa.text(
+        "INSERT IGNORE INTO project_team_members (project_id, user_id) VALUES (:project_id, :user_id)"
+    ), [{"project_id": rng.randint(1, PROJECTS), "user_id": rng.randint(1, USERS)} for _ in range(PROJECTS * 5)])
+
+    events = []
+    for n in range(1, EVENTS + 1):
+        start = BASE + timedelta(hours=rng.randint(0, 24 * 365))
+        end = start + timedelta(hours=rng.randint(1, 4))
+        events.append({
+            "id": n, "start": start, "end": end, "now": now,
+            "project_id": rng.randint(1, PROJECTS), "creator_id": rng.randint(1, USERS)
+        })
+    connection.execute(sa.text(
+        "INSERT INTO events (id, title, start_time, end_time, occurs_until, is_all_day, "
+        "project_id, creator_id, created_at) "
+        "VALUES (:id, 'Site visit', :start, :end, :end, 0, :project_id, :creator_id, :now)"
+    ), events)
+    connection.execute(sa.text(
+        "INSERT IGNORE INTO event_attendees (event_id, user_id) VALUES (:event_id, :user_id)"
+    ), [{"event_id": rng.randint(1, EVENTS), "user_id": rng.randint(1, USERS)} for _ in range(EVENTS * 2)])
+    # Most reminders have already been sent
+    connection.execute(sa.text(
+        "INSERT INTO event_reminders (event_id, user_id, remind_at, notification_type, notification_sent, created_at) "
+        "VALUES (:event_id, :user_id, :remind_at, 'both', :sent, :now)"
+    ), [
+        {
+            "event_id": event["id"], "user_id": event["creator_id"],
+            "remind_at": event["start"] - timedelta(minutes=30), "sent": rng.random() < 0.95, "now": now
+        }
+        for event in events
+    ])
+
+    connection.execute(sa.text(
+        "INSERT INTO wiki_pages (id, title, content, author_id, created_at) "
+        "VALUES (:id, 'Page', 'Content', 1, :now)"
+    ), [{"id": n, "now": now} for n in range(1, PAGES + 1)])
+    connection.execute(sa.text(
+        "INSERT INTO wiki_revisions (wiki_page_id, content, author_id, revision_number, storage, created_at) "
+        "VALUES (:page_id, 'Content', 1, :number, :storage, :now)"
+    ), [
+        {"page_id": page_id, "number": number, "storage": "full" if number % 20 == 1 else "delta", "now": now}
+        for page_id in range(1, PAGES + 1)
+        for number in range(1, REVISIONS_PER_PAGE + 1)
+    ])
+    connection.execute(sa.text(
+        "INSERT INTO project_files (project_id, filename, file_type, version, is_approved, "
+        "drive_file_id, uploaded_by, uploaded_at) "
+        "VALUES (:project_id, 'plan.pdf', 'pdf', :version, 0, 'drive-id', 1, :now)"
+    ), [{"project_id": rng.randint(1, PROJECTS), "version": f"v{rng.randint(1, 9)}", "now": now} for _ in range(FILES)])
+
+    for table in ("users", "projects", "project_team_members", "events", "event_attendees",
+                  "event_reminders", "wiki_pages", "wiki_revisions", "project_files"):
+        connection.execute(sa.text(f"ANALYZE TABLE {table}"))
+
+@pytest.fixture(scope="module")
+def db(mysql_engine):
+    with mysql_engine.begin() as connection:
+        seed(connection)
+    with mysql_engine.connect() as connection:
+        yield connection
+
+def explain(connection, statement, params=None) -> list:
+    """EXPLAIN rows of a Core statement or SQL string"""
+    if isinstance(statement, str):
+        return connection.execute(sa.text(f"EXPLAIN {statement}"), params or {}).mappings().all()
+    compiled = statement.compile(connection)
+    return connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).mappings().all()
+
+def assert_uses_indexes(plan: list, expected_key: str = None):
+    """No table in the plan is read in full; optionally one uses expected_key"""
+    tables = [row for row in plan if row["table"] and not row["table"].startswith("<")]
+    assert tables, plan
+    for row in tables:
+        assert row["type"] not in FULL_SCANS, f"{row['table']} is scanned in full: {dict(row)}"
+        assert row["key"] is not None, f"{row['table']} uses no index: {dict(row)}"
+    if expected_key is not None:
+        assert expected_key in {row["key"] for row in tables}, plan
+
+def test_calendar_range_by_visibility(db):
+    start = BASE + timedelta(days=90)
+    ids = visible_event_ids(7, start, start + timedelta(days=31))
+    plan = explain(db, select(events_table.c.id).where(events_table.c.id.in_(select(ids.c.id))))
+    assert_uses_indexes(plan)
+    keys = {row["key"] for row in plan}
+    assert "ix_events_creator_id_occurs_until" in keys
+    assert "ix_event_attendees_user_id_event_id" in keys
+
+def test_calendar_range_scan(db):
+    plan = explain(
+        db,
+        "SELECT id FROM events WHERE occurs_until > :start AND start_time < :end",
+        {"start": BASE + timedelta(days=90), "end": BASE + timedelta(days=91)}
+    )
+    assert_uses_indexes(plan)
+
+def test_due_reminders(db):
+    plan = explain(
+        db,
+        "SELECT id, remind_at FROM event_reminders WHERE notification_sent = 0 AND remind_at < :horizon",
+        {"horizon": BASE + timedelta(days=30)}
+    )
+    assert_uses_indexes(plan, "ix_event_reminders_notification_sent_remind_at")
+
+def test_latest_revision(db):
+    plan = explain(
+        db,
+        "SELECT id, revision_number FROM wiki_revisions WHERE wiki_page_id = :page_id "
+        "ORDER BY revision_number DESC LIMIT 1",
+        {"page_id": 17}
+    )
+    assert_uses_indexes(plan, "ix_wiki_revisions_wiki_page_id_revision_number")
+    assert "filesort" not in (plan[0]["Extra"] or "")
+
+def test_nearest_snapshot(db):
+    plan = explain(
+        db,
+        "SELECT revision_number FROM wiki_revisions WHERE wiki_page_id = :page_id "
+        "AND storage = 'full' AND revision_number <= :number ORDER BY revision_number DESC LIMIT 1",
+        {"page_id": 17, "number": 15}
+    )
+    assert_uses_indexes(plan, "ix_wiki_revisions_wiki_page_id_storage_revision_number")
+
+def test_project_files_by_version(db):
+    plan = explain(
+        db,
+        "SELECT id, filename, version FROM project_files WHERE project_id = :project_id ORDER BY version",
+        {"project_id": 42}
+    )
+    assert_uses_indexes(plan, "ix_project_files_project_id_version")
+    assert "filesort" not in (plan[0]["Extra"] or "")
@@ -0,0 +1,208 @@
+"""
+ReminderScheduler against a SQLite database: 100k reminders fire close to
+their remind_at, each exactly once, until the last occurrence of their
+event is over, and a failing database is retried with backoff instead of
+in a tight loop.
+"""
+from datetime import datetime, timedelta
+
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("app.config")
+pytest.importorskip("app.routes.notifications")
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.notification_outbox import NotificationOutbox
+from app.utils import reminders
+from app.utils.reminders import ReminderScheduler
+from bench import percentile, report
+
+REMINDERS = 100_000
+EVENTS = 1_000
+# remind_at values are spread evenly over this span, starting shortly
+# after the scheduler starts
+SPREAD = timedelta(seconds=20)
+LEAD = timedelta(seconds=2)
+
+metadata = MetaData()
+events = Table(
+    "events", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", String(200)),
+    Column("start_time", DateTime),
+    Column("end_time", DateTime),
+    Column("occurs_until", DateTime)
+)
+event_reminders = Table(
+    "event_reminders", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("event_id", Integer),
+    Column("user_id", Integer),
+    Column("remind_at", DateTime),
+    Column("notification_type", String(20)),
+    Column("notification_sent", Boolean)
+)
+
+class TimedScheduler(ReminderScheduler):
+    """Records how late each reminder was claimed and sent"""
+
+    def __init__(self, remind_at):
+        super().__init__()
+        self.remind_at = remind_at
+        self.latencies = []
+
+    async def _fire_batch(self, reminder_ids, now):
+        sent = await super()._fire_batch(reminder_ids, now)
+        fired_at = datetime.utcnow()
+        self.latencies.extend((fired_at - self.remind_at[id]).total_seconds() for id in reminder_ids)
+        return sent
+
+@pytest.fixture
+async def sessions(monkeypatch, tmp_path, caplog):
+    # The development profile logs every statement
+    caplog.set_level(logging.WARNING, logger="sqlalchemy.engine.Engine")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reminders.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.create_all)
+        await connection.run_sync(NotificationOutbox.__table__.create)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(reminders, "AsyncSessionLocal", session_factory)
+    yield session_factory
+    await engine.dispose()
+
+async def seed(sessions, count: int, first_due: datetime, spread: timedelta = SPREAD):
+    """Add reminders due evenly over spread; returns their remind_at by id"""
+    start = first_due + spread + timedelta(hours=1)
+    remind_at = {id: first_due + spread * (id - 1) / count for id in range(1, count + 1)}
+    async with sessions() as db:
+        await db.execute(insert(events), [
+            {
+                "id": id,
+                "title": f"Event {id}",
+                "start_time": start,
+                "end_time": start + timedelta(hours=1),
+                "occurs_until": start + timedelta(hours=1)
+            }
+            for id in range(1, EVENTS + 1)
+        ])
+        await db.execute(insert(event_reminders), [
+            {
+                "id": id,
+                # Reminders of one event's attendees are due together
+                "event_id": (id - 1) * EVENTS // count + 1,
+                "user_id": id,
+                "remind_at": due,
+                "notification_type": "both",
+                "notification_sent": False
+            }
+            for id, due in remind_at.items()
+        ])
+        await db.commit()
+    return remind_at
+
+@pytest.mark.benchmark
+async def test_firing_latency_for_100k_reminders(sessions, monkeypatch):
+    monkeypatch.setattr(reminders, "REMINDER_WINDOW", SPREAD + timedelta(minutes=1))
+    remind_at = await seed(sessions, REMINDERS, datetime.utcnow() + LEAD)
+    scheduler = TimedScheduler(remind_at)
+
+    scheduler.start()
+    try:
+        deadline = asyncio.get_running_loop().time() + (LEAD + SPREAD).total_seconds() + 30
+        while len(scheduler.latencies) < REMINDERS and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.1)
+    finally:
+        await scheduler.stop()
+
+    latencies = scheduler.latencies
+    report(
+        f"{REMINDERS} reminders over {SPREAD.total_seconds():.0f} s",
+        fired=len(latencies),
+        p50_ms=percentile(latencies, 0.5) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        max_ms=max(latencies) * 1000
+    )
+
+    async with sessions() as db:
+        unsent = await db.scalar(
+            select(func.count()).select_from(event_reminders).where(event_reminders.c.notification_sent.is_(False))
+        )
+        recipients = [user_id for entry in (await db.scalars(select(NotificationOutbox))).all()
+                      for user_id in entry.user_ids]
+    # Every reminder is sent exactly once, and none before it is due
+    assert len(latencies) == REMINDERS
+    assert unsent == 0
+    assert sorted(recipients) == list(range(1, REMINDERS + 1))
+    assert min(latencies) >= 0
+    assert percentile(latencies, 0.99) < 1.0
+
+async def test_failed_load_backs_off(sessions, monkeypatch):
+    monkeypatch.setattr(reminders, "REMINDER_RETRY_BACKOFF", 0.1)
+    loop = asyncio.get_running_loop()
+    attempts = []
+
+    async def failing_load():
+        attempts.append(loop.time())
+        raise ConnectionError("database unavailable")
+
+    scheduler = ReminderScheduler()
+    monkeypatch.setattr(scheduler, "load_window", failing_load)
+    scheduler.start()
+    await asyncio.sleep(0.8)
+    await scheduler.stop()
+
+    # Retried after 0.1, 0.2 and 0.4 s, not in a tight loop
+    assert len(attempts) == 4
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert gaps == pytest.approx([0.1, 0.2, 0.4], abs=0.05)
+
+async def test_load_recovers_after_failure(sessions, monkeypatch):
+    monkeypatch.setattr(reminders, "REMINDER_RETRY_BACKOFF", 0.1)
+    remind_at = await seed(sessions, 10, datetime.utcnow(), spread=timedelta(0))
+    scheduler = TimedScheduler(remind_at)
+    load_window = scheduler.load_window
+    failures = [ConnectionError("database unavailable")]
+
+    async def flaky_load():
+        if failures:
+            raise failures.pop()
+        return await load_window()
+
+    monkeypatch.setattr(scheduler, "load_window", flaky_load)
+    scheduler.start()
+    await asyncio.sleep(0.3)
+    await scheduler.stop()
+
+    assert len(scheduler.latencies) == 10
+
+async def test_reminders_follow_the_last_occurrence(sessions):
+    now = datetime.utcnow()
+    first_ended = now - timedelta(days=7)
+    async with sessions() as db:
+        await db.execute(insert(events), [
+            # A weekly series whose first meeting is over but which goes on
+            {"id": 1, "title": "Weekly", "start_time": first_ended - timedelta(hours=1),
+             "end_time": first_ended, "occurs_until": now + timedelta(days=70)},
+            # A series whose last meeting is over
+            {"id": 2, "title": "Finished", "start_time": first_ended - timedelta(hours=1),
+             "end_time": first_ended, "occurs_until": now - timedelta(hours=1)}
+        ])
+        await db.execute(insert(event_reminders), [
+            {"id": id, "event_id": id, "user_id": id, "remind_at": now - timedelta(minutes=1),
+             "notification_type": "both", "notification_sent": False}
+            for id in (1, 2)
+        ])
+        await db.commit()
+
+    scheduler = ReminderScheduler()
+    assert await scheduler._fire_batch([1, 2], now) == 1
+    async with sessions() as db:
+        recipients = [user_id for entry in (await db.scalars(select(NotificationOutbox))).all()
+                      for user_id in entry.user_ids]
+    assert recipients == [1]
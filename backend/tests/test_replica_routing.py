@@ -0,0 +1,131 @@
+"""
+Read routing between the primary and the replica, decided on two SQLite
+databases that each say which one they are.
+"""
+import pytest
+
+pytest.importorskip("app.config")
+
+from sqlalchemy import Column, Integer, String, column, insert, select, table, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from app import database
+
+Base = declarative_base()
+
+class Note(Base):
+    __tablename__ = "notes"
+    id = Column(Integer, primary_key=True)
+    body = Column(String(100))
+
+servers_table = table("servers", column("name"))
+
+@pytest.fixture
+async def routing(monkeypatch, tmp_path):
+    engines = {}
+    for name in ("primary", "replica"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE servers (name VARCHAR(20))"))
+            await connection.execute(text(f"INSERT INTO servers VALUES ('{name}')"))
+            await connection.run_sync(Base.metadata.create_all)
+        engines[name] = engine
+
+    monitor = database.ReplicaMonitor(engines["replica"])
+    monitor.healthy = True
+    monkeypatch.setattr(database, "engine", engines["primary"])
+    monkeypatch.setattr(database, "read_engine", engines["replica"])
+    monkeypatch.setattr(database, "replica_monitor", monitor)
+    database._pinned_to_primary.set(False)
+    yield monitor
+    for engine in engines.values():
+        await engine.dispose()
+
+async def server(db) -> str:
+    return (await db.execute(select(servers_table.c.name))).scalar()
+
+async def test_reads_use_a_healthy_replica(routing):
+    async with database.get_read_db() as db:
+        assert await server(db) == "replica"
+        assert (await db.execute(text("SELECT name FROM servers"))).scalar() == "replica"
+    async with database.get_readonly_db() as db:
+        assert await server(db) == "replica"
+
+async def test_reads_fall_back_to_the_primary(routing, monkeypatch):
+    routing.healthy = False
+    async with database.get_read_db() as db:
+        assert await server(db) == "primary"
+    async with database.get_readonly_db() as db:
+        assert await server(db) == "primary"
+
+    routing.healthy = True
+    monkeypatch.setattr(database, "read_engine", None)
+    async with database.get_read_db() as db:
+        assert await server(db) == "primary"
+
+@pytest.mark.parametrize("statement", [
+    text("INSERT INTO servers VALUES ('written')"),
+    text("UPDATE servers SET name = name"),
+    text("DELETE FROM servers WHERE name = 'written'"),
+    insert(servers_table).values(name="written")
+])
+async def test_writes_go_to_the_primary_and_pin_later_reads(routing, statement):
+    async with database.get_read_db() as db:
+        await db.execute(statement)
+        assert await server(db) == "primary"
+
+    # A later request in the same context still reads its own writes
+    async with database.get_read_db() as db:
+        assert await server(db) == "primary"
+
+async def test_flush_pins_later_reads(routing):
+    async with database.get_read_db() as db:
+        db.add(Note(body="site visit"))
+        await db.flush()
+        assert await server(db) == "primary"
+        assert (await db.execute(select(Note.body))).scalar() == "site visit"
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self.row
+
+class OldReplica:
+    """A MySQL 5.7 replica: only SHOW SLAVE STATUS is understood"""
+    def __init__(self, lag):
+        self.lag = lag
+        self.queries = []
+
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        self.queries.append(statement.text)
+        if statement.text == "SHOW REPLICA STATUS":
+            raise ProgrammingError(statement.text, {}, Exception(1064, "You have an error in your SQL syntax"))
+        return FakeResult({"Seconds_Behind_Master": self.lag})
+
+async def test_monitor_falls_back_to_show_slave_status():
+    replica = OldReplica(lag=2)
+    monitor = database.ReplicaMonitor(replica)
+    await monitor.check()
+    assert monitor.healthy and monitor.lag_seconds == 2.0
+
+    replica.lag = database.REPLICA_MAX_LAG_SECONDS + 1
+    await monitor.check()
+    assert not monitor.healthy
+    # The older statement is remembered after the first check
+    assert replica.queries == ["SHOW REPLICA STATUS", "SHOW SLAVE STATUS", "SHOW SLAVE STATUS"]
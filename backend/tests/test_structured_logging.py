@@ -0,0 +1,136 @@
+"""
+Rate limiting of repeated warnings, and request throughput during a flood
+of 404s with a slow log destination.
+"""
+import logging
+import queue
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from logging.handlers import QueueListener
+
+from app.utils import error_handler
+from app.utils.structured_logging import JsonFormatter, RateLimitFilter, _NonBlockingQueueHandler
+from bench import report
+
+FLOOD_REQUESTS = 2_000
+# A log collector applying backpressure: every write to it takes this long
+WRITE_DELAY = 0.001
+
+def make_record(msg, args=(), lineno=10, **extra):
+    record = logging.LogRecord("app.test", logging.WARNING, "/app/test.py", lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_f_string_messages_from_one_call_site_are_limited():
+    limiter = RateLimitFilter(burst=3, window=60, sample_rate=10)
+    passed = [limiter.filter(make_record(f"Page {n} not found")) for n in range(23)]
+    # Three in the burst, then the tenth and twentieth after it
+    assert passed.count(True) == 5
+
+def test_call_sites_are_limited_separately():
+    limiter = RateLimitFilter(burst=1, window=60, sample_rate=100)
+    assert limiter.filter(make_record("Page %s not found", (1,), lineno=10))
+    assert limiter.filter(make_record("Page %s not found", (2,), lineno=20))
+    assert not limiter.filter(make_record("Page %s not found", (3,), lineno=10))
+
+def test_error_code_is_limited_across_call_sites():
+    limiter = RateLimitFilter(burst=1, window=60, sample_rate=100)
+    assert limiter.filter(make_record("Not found", lineno=10, error_code="ERR_2001"))
+    assert not limiter.filter(make_record("Gone", lineno=20, error_code="ERR_2001"))
+
+def test_first_record_after_drops_reports_them(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    limiter = RateLimitFilter(burst=1, window=10, sample_rate=100)
+    for n in range(5):
+        limiter.filter(make_record(f"Disk {n} full"))
+    clock[0] = 11.0
+    record = make_record("Disk full again")
+    assert limiter.filter(record)
+    assert record.suppressed == 4
+
+class SlowStream:
+    """A log destination that holds up every write"""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        time.sleep(WRITE_DELAY)
+        self.lines.append(text)
+
+    def flush(self):
+        pass
+
+def flood_app() -> FastAPI:
+    app = FastAPI()
+    app.add_exception_handler(HTTPException, error_handler.http_exception_handler)
+
+    @app.get("/pages/{page_id}")
+    async def get_page(page_id: int):
+        error_handler.raise_not_found("Page", page_id)
+
+    return app
+
+async def flood(app: FastAPI) -> float:
+    """Requests per second for FLOOD_REQUESTS missing pages"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started = time.perf_counter()
+        for page_id in range(FLOOD_REQUESTS):
+            response = await client.get(f"/pages/{page_id}")
+            assert response.status_code == 404
+        return FLOOD_REQUESTS / (time.perf_counter() - started)
+
+@pytest.fixture
+def error_logger(monkeypatch):
+    """The error handler's logger, detached from the root handlers"""
+    logger = logging.getLogger(error_handler.__name__)
+    monkeypatch.setattr(logger, "propagate", False)
+    monkeypatch.setattr(logger, "handlers", [])
+    monkeypatch.setattr(logger, "level", logging.INFO)
+    # The test client logs every request
+    monkeypatch.setattr(logging.getLogger("httpx"), "level", logging.WARNING)
+    return logger
+
+@pytest.mark.benchmark
+async def test_404_flood_throughput(error_logger):
+    app = flood_app()
+
+    # Before: every record written synchronously by the request handler
+    blocking_stream = SlowStream()
+    blocking = logging.StreamHandler(blocking_stream)
+    blocking.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    error_logger.handlers = [blocking]
+    blocking_rps = await flood(app)
+
+    # After: queued, rate limited and written on the listener thread
+    queued_stream = SlowStream()
+    output = logging.StreamHandler(queued_stream)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=10_000)
+    handler = _NonBlockingQueueHandler(log_queue)
+    limiter = RateLimitFilter()
+    handler.addFilter(limiter)
+    listener = QueueListener(log_queue, output)
+    error_logger.handlers = [handler]
+    listener.start()
+    try:
+        queued_rps = await flood(app)
+    finally:
+        listener.stop()
+
+    report(
+        f"{FLOOD_REQUESTS} requests for missing pages",
+        blocking_rps=blocking_rps,
+        queued_rps=queued_rps,
+        blocking_lines=len(blocking_stream.lines),
+        queued_lines=len(queued_stream.lines)
+    )
+    assert len(blocking_stream.lines) == FLOOD_REQUESTS
+    # The burst, then one in every sample_rate
+    assert len(queued_stream.lines) == limiter.burst + (FLOOD_REQUESTS - limiter.burst) // limiter.sample_rate
+    assert queued_rps > blocking_rps
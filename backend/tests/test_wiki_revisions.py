@@ -0,0 +1,192 @@
+"""
+Delta-compressed revision storage against storing every revision in full,
+on SQLite: a large spec page edited many times, comparing the stored
+size and the latency of the history page.
+"""
+from datetime import datetime
+import random
+import time
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import Column, DateTime, Integer, String, Text, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase
+
+from app.utils import wiki_revisions
+from app.utils.wiki_revisions import (
+    RevisionCache,
+    add_revision,
+    get_revision_content,
+    list_revisions,
+    wiki_revisions_table
+)
+from bench import percentile, report
+
+PAGE_ID = 1
+# The same edits, stored the way they were before: every revision in full
+FULL_PAGE_ID = 2
+PAGE_LINES = 4_000
+EDITS = 300
+HISTORY_READS = 50
+
+class Base(DeclarativeBase):
+    pass
+
+class WikiRevision(Base):
+    """How page writers add revisions through the ORM"""
+    __tablename__ = "wiki_revisions"
+    id = Column(Integer, primary_key=True)
+    wiki_page_id = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    comment = Column(String(255))
+    author_id = Column(Integer, nullable=False)
+    revision_number = Column(Integer, nullable=False, default=0)
+    storage = Column(String(10))
+    content_size = Column(Integer)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+def spec_page(rng: random.Random) -> list:
+    """About 200 KB of specification text, one clause per line"""
+    return [
+        f"{n}. " + " ".join(f"clause{rng.randint(0, 9999)}" for _ in range(4)) + "\n"
+        for n in range(PAGE_LINES)
+    ]
+
+def edit(rng: random.Random, lines: list) -> list:
+    """Reword a few clauses and add one"""
+    lines = list(lines)
+    for _ in range(3):
+        lines[rng.randrange(len(lines))] = f"Revised clause {rng.randint(0, 9999)}\n"
+    lines.insert(rng.randrange(len(lines)), f"New clause {rng.randint(0, 9999)}\n")
+    return lines
+
+@pytest.fixture
+async def sessions(migrated_sessions, monkeypatch):
+    async with migrated_sessions() as db:
+        await db.execute(sa.text(
+            "INSERT INTO users (id, email, hashed_password, first_name, last_name, created_at) "
+            "VALUES (1, 'author@example.com', 'x', 'Site', 'Engineer', :now)"
+        ), {"now": datetime.utcnow()})
+        await db.execute(sa.text(
+            "INSERT INTO wiki_pages (id, title, content, author_id, created_at) "
+            "VALUES (:id, 'Concrete works', '', 1, :now)"
+        ), [{"id": page_id, "now": datetime.utcnow()} for page_id in (PAGE_ID, FULL_PAGE_ID)])
+        await db.commit()
+
+    monkeypatch.setattr(wiki_revisions, "revision_cache", RevisionCache())
+    return migrated_sessions
+
+async def add_full_revision(db: AsyncSession, content: str, revision_number: int):
+    """How revisions were stored before"""
+    await db.execute(sa.insert(wiki_revisions_table).values(
+        wiki_page_id=FULL_PAGE_ID,
+        author_id=1,
+        comment="Edited clauses",
+        content=content,
+        storage="full",
+        content_size=len(content),
+        revision_number=revision_number,
+        created_at=datetime.utcnow()
+    ))
+
+async def stored_bytes(db: AsyncSession, page_id: int) -> int:
+    return await db.scalar(
+        select(func.sum(func.length(sa.cast(wiki_revisions_table.c.content, sa.LargeBinary))))
+        .where(wiki_revisions_table.c.wiki_page_id == page_id)
+    )
+
+async def full_history(db: AsyncSession):
+    """The history page before: every revision loaded with its content"""
+    return (await db.execute(
+        select(wiki_revisions_table)
+        .where(wiki_revisions_table.c.wiki_page_id == FULL_PAGE_ID)
+        .order_by(wiki_revisions_table.c.revision_number.desc())
+    )).all()
+
+async def test_revisions_round_trip(sessions):
+    rng = random.Random(22)
+    versions = [spec_page(rng)[:200]]
+    for _ in range(45):
+        versions.append(edit(rng, versions[-1]))
+    async with sessions() as db:
+        for lines in versions:
+            await add_revision(db, PAGE_ID, "".join(lines), author_id=1)
+        await db.commit()
+
+    wiki_revisions.revision_cache = RevisionCache()
+    async with sessions() as db:
+        for number, lines in enumerate(versions, 1):
+            assert await get_revision_content(db, PAGE_ID, number) == "".join(lines)
+        storage = (await db.execute(
+            select(wiki_revisions_table.c.storage)
+            .where(wiki_revisions_table.c.wiki_page_id == PAGE_ID)
+            .order_by(wiki_revisions_table.c.revision_number)
+        )).scalars().all()
+    # A snapshot every SNAPSHOT_INTERVAL revisions, deltas in between
+    assert [n for n, kind in enumerate(storage, 1) if kind == "full"] == [1, 21, 41]
+
+async def test_orm_writers_store_deltas(sessions):
+    rng = random.Random(7)
+    versions = [spec_page(rng)[:200]]
+    for _ in range(24):
+        versions.append(edit(rng, versions[-1]))
+    async with sessions() as db:
+        for lines in versions[:-2]:
+            db.add(WikiRevision(wiki_page_id=PAGE_ID, content="".join(lines), author_id=1))
+            await db.commit()
+        # Two revisions of the page in one flush
+        db.add_all([
+            WikiRevision(wiki_page_id=PAGE_ID, content="".join(lines), author_id=1)
+            for lines in versions[-2:]
+        ])
+        await db.commit()
+
+    wiki_revisions.revision_cache = RevisionCache()
+    async with sessions() as db:
+        stored = (await db.execute(
+            select(wiki_revisions_table.c.revision_number, wiki_revisions_table.c.storage)
+            .where(wiki_revisions_table.c.wiki_page_id == PAGE_ID)
+            .order_by(wiki_revisions_table.c.revision_number)
+        )).all()
+        assert [number for number, _ in stored] == list(range(1, len(versions) + 1))
+        assert [number for number, kind in stored if kind == "full"][:2] == [1, 21]
+        for number, lines in enumerate(versions, 1):
+            assert await get_revision_content(db, PAGE_ID, number) == "".join(lines)
+
+@pytest.mark.benchmark
+async def test_storage_and_history_latency(sessions):
+    rng = random.Random(22)
+    lines = spec_page(rng)
+    async with sessions() as db:
+        for number in range(1, EDITS + 1):
+            content = "".join(lines)
+            await add_revision(db, PAGE_ID, content, author_id=1, comment="Edited clauses")
+            await add_full_revision(db, content, number)
+            lines = edit(rng, lines)
+        await db.commit()
+
+    async with sessions() as db:
+        delta_bytes = await stored_bytes(db, PAGE_ID)
+        full_bytes = await stored_bytes(db, FULL_PAGE_ID)
+
+        metadata_only, with_content = [], []
+        for _ in range(HISTORY_READS):
+            started = time.perf_counter()
+            history = await list_revisions(db, PAGE_ID)
+            metadata_only.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await full_history(db)
+            with_content.append(time.perf_counter() - started)
+
+    report(
+        f"{EDITS} revisions of a {full_bytes // EDITS // 1024} KB page",
+        full_mb=full_bytes / 2**20,
+        delta_mb=delta_bytes / 2**20,
+        history_p50_ms=percentile(metadata_only, 0.5) * 1000,
+        full_history_p50_ms=percentile(with_content, 0.5) * 1000
+    )
+    assert len(history) == EDITS
+    assert delta_bytes < full_bytes / 10
+    assert percentile(metadata_only, 0.5) < percentile(with_content, 0.5)
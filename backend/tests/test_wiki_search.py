@@ -0,0 +1,261 @@
+"""
+Wiki search: tokenization, cursors, paging through a cached ranking (on
+SQLite, with the MATCH ranking swapped for a plain one), and a benchmark
+of FULLTEXT search against a LIKE scan over a 50k-page synthetic corpus.
+The benchmark needs TEST_MYSQL_URL (see conftest.py).
+"""
+from datetime import datetime
+import random
+import time
+
+import pytest
+
+pytest.importorskip("app.config")
+
+import sqlalchemy as sa
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.utils import wiki_search
+from app.utils.wiki_search import (
+    SCORE_SCALE,
+    SearchRankings,
+    build_snippet,
+    decode_cursor,
+    encode_cursor,
+    ranking_query,
+    search_wiki,
+    tokenize,
+    wiki_pages_table
+)
+from bench import percentile, report
+
+PAGES = 50_000
+VOCABULARY = 5_000
+WORDS_PER_PAGE = 150
+REVISIONS_PER_PAGE = 2
+QUERIES = 50
+PAGE_SIZE = 20
+
+def test_tokenize_folds_case_and_drops_stopwords():
+    assert tokenize("The Concrete and the FOUNDATION") == ["concrete", "foundation"]
+    # Mtavruli capitals fold to Mkhedruli
+    assert tokenize("ᲡᲐᲫᲘᲠᲙᲕᲔᲚᲘ და საძირკველი") == ["საძირკველი"]
+    assert tokenize("a an to of") == []
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor("key", 20, 1_500_000, 42)) == ("key", 20, 1_500_000, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+    # Scores are integers; a float would not compare exactly
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("key", 20, 1.5, 42))
+
+def compile_mysql(statement) -> str:
+    return str(statement.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+def test_revision_search_only_matches_full_snapshots():
+    sql = compile_mysql(ranking_query(["concrete"], include_revisions=True))
+    assert "wiki_revisions.storage = 'full'" in sql
+    assert "wiki_revisions" not in compile_mysql(ranking_query(["concrete"]))
+
+def test_ranking_compares_integer_scores():
+    sql = compile_mysql(ranking_query(["concrete"], after=(1_500_000, 42)))
+    assert "CAST(round(" in sql and "AS SIGNED" in sql
+    assert "score < 1500000" in sql and "score = 1500000" in sql
+
+def test_rankings_expire_and_evict(monkeypatch):
+    rankings = SearchRankings(size=2, ttl=60)
+    first = rankings.add([(1, 10)], True)
+    second = rankings.add([(2, 10)], True)
+    assert rankings.get(first) == ([(1, 10)], True)
+    rankings.add([(3, 10)], True)
+    # The least recently used ranking goes
+    assert rankings.get(second) is None
+    assert rankings.get(first) is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(wiki_search.time, "monotonic", lambda: now + 61)
+    assert rankings.get(first) is None
+
+PAGED_PAGES = 9
+
+@pytest.fixture
+async def paged_wiki(migrated_sessions, monkeypatch):
+    """
+    PAGED_PAGES pages on SQLite, ranked by a stand-in for the MATCH query
+    that scores pages in tied pairs. Returns the session factory and the
+    rankings run.
+    """
+    async with migrated_sessions() as db:
+        await db.execute(sa.text(
+            "INSERT INTO users (id, email, hashed_password, first_name, last_name, created_at) "
+            "VALUES (1, 'author@example.com', 'x', 'Site', 'Engineer', :now)"
+        ), {"now": datetime.utcnow()})
+        await db.execute(sa.text(
+            "INSERT INTO wiki_pages (id, title, content, author_id, created_at) "
+            "VALUES (:id, :title, 'Pour the concrete slab', 1, :now)"
+        ), [{"id": page_id, "title": f"Slab {page_id}", "now": datetime.utcnow()} for page_id in range(1, PAGED_PAGES + 1)])
+        await db.commit()
+
+    runs = []
+
+    def plain_ranking_query(terms, include_revisions=False, after=None):
+        runs.append(after)
+        pages = wiki_pages_table
+        page_id = sa.cast(pages.c.id, sa.Integer)
+        ranked = select(
+            pages.c.id, sa.cast(literal(SCORE_SCALE * 10) - page_id // 2 * SCORE_SCALE, sa.Integer).label("score")
+        ).subquery()
+        statement = select(ranked.c.id, ranked.c.score)
+        if after is not None:
+            statement = statement.where(or_(
+                ranked.c.score < after[0], and_(ranked.c.score == after[0], ranked.c.id > after[1])
+            ))
+        return statement.order_by(ranked.c.score.desc(), ranked.c.id)
+
+    monkeypatch.setattr(wiki_search, "ranking_query", plain_ranking_query)
+    monkeypatch.setattr(wiki_search, "search_rankings", SearchRankings())
+    return migrated_sessions, runs
+
+async def read_all_pages(db, limit: int):
+    ids, cursor = [], None
+    while True:
+        page = await search_wiki(db, "concrete", limit, cursor)
+        ids += [result["id"] for result in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+async def test_following_pages_read_the_cached_ranking(paged_wiki):
+    sessions, runs = paged_wiki
+    async with sessions() as db:
+        ids = await read_all_pages(db, 2)
+    assert ids == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    # Ranked once, for the first page
+    assert runs == [None]
+
+async def test_truncated_or_lost_rankings_continue_after_the_cursor(paged_wiki, monkeypatch):
+    sessions, runs = paged_wiki
+    monkeypatch.setattr(wiki_search, "MAX_RANKED_RESULTS", 4)
+    async with sessions() as db:
+        first = await search_wiki(db, "concrete", 3)
+        # Another worker, without this one's rankings
+        monkeypatch.setattr(wiki_search, "search_rankings", SearchRankings())
+        second = await search_wiki(db, "concrete", 3, first["next_cursor"])
+        rest = await search_wiki(db, "concrete", 3, second["next_cursor"])
+
+    assert [result["id"] for result in first["results"]] == [1, 2, 3]
+    assert [result["id"] for result in second["results"]] == [4, 5, 6]
+    assert [result["id"] for result in rest["results"]] == [7, 8, 9]
+    assert rest["next_cursor"] is None
+    # Pages 2 and 3 tie, so the fallback continues after page 3 of that score
+    assert runs == [None, (9 * SCORE_SCALE, 3), (7 * SCORE_SCALE, 6)]
+
+def test_snippet_highlights_terms():
+    content = "Intro. " + "filler " * 40 + "Pour the concrete slab after curing the footing."
+    snippet, highlights = build_snippet(content, ["concrete", "footing"])
+    assert snippet.startswith("…")
+    assert [snippet[start:end] for start, end in highlights] == ["concrete", "footing"]
+
+def word(rank: int) -> str:
+    return f"term{rank:04d}"
+
+@pytest.fixture(scope="module")
+def corpus(mysql_engine):
+    """
+    PAGES pages of Zipf-distributed words, with a couple of revisions each.
+    Returns mid-frequency words to search for.
+    """
+    rng = random.Random(21)
+    weights = [1 / rank for rank in range(1, VOCABULARY + 1)]
+    words = [word(rank) for rank in range(VOCABULARY)]
+    now = datetime.utcnow()
+    with mysql_engine.begin() as connection:
+        connection.execute(sa.text(
+            "INSERT INTO users (id, email, hashed_password, first_name, last_name, role, is_active, created_at) "
+            "VALUES (1, 'author@example.com', 'x', 'First', 'Last', 'admin', 1, :now)"
+        ), {"now": now})
+        for start in range(1, PAGES + 1, 1_000):
+            pages = [
+                {
+                    "id": page_id,
+                    "title": " ".join(rng.choices(words, weights, k=4)),
+                    "content": " ".join(rng.choices(words, weights, k=WORDS_PER_PAGE)),
+                    "now": now
+                }
+                for page_id in range(start, min(start + 1_000, PAGES + 1))
+            ]
+            connection.execute(sa.text(
+                "INSERT INTO wiki_pages (id, title, content, author_id, created_at) "
+                "VALUES (:id, :title, :content, 1, :now)"
+            ), pages)
+            connection.execute(sa.text(
+                "INSERT INTO wiki_revisions (wiki_page_id, content, author_id, revision_number, storage, created_at) "
+                "VALUES (:page_id, :content, 1, :number, 'full', :now)"
+            ), [
+                {"page_id": page["id"], "content": page["content"], "number": number, "now": now}
+                for page in pages
+                for number in range(1, REVISIONS_PER_PAGE + 1)
+            ])
+    yield [word(rank) for rank in rng.sample(range(50, 2_000), QUERIES)]
+    with mysql_engine.begin() as connection:
+        for name in ("wiki_revisions", "wiki_page_paths", "wiki_pages", "users"):
+            connection.execute(sa.text(f"DELETE FROM {name}"))
+
+@pytest.fixture
+async def read_db(mysql_engine):
+    engine = create_async_engine(mysql_engine.url.set(drivername="mysql+aiomysql"))
+    async with engine.connect() as connection:
+        async with AsyncSession(bind=connection) as db:
+            yield db
+    await engine.dispose()
+
+async def like_search(db, term: str, limit: int):
+    """What search would be without an index: a scan of every page"""
+    pattern = f"%{term}%"
+    pages = wiki_pages_table
+    return (await db.execute(
+        select(pages.c.id, pages.c.title)
+        .where(or_(pages.c.title.like(pattern), pages.c.content.like(pattern)))
+        .order_by(pages.c.id)
+        .limit(limit)
+    )).all()
+
+@pytest.mark.benchmark
+async def test_search_50k_pages(corpus, read_db):
+    assert await read_db.scalar(select(func.count()).select_from(wiki_pages_table)) == PAGES
+
+    timings = {"fulltext": [], "fulltext_next_page": [], "fulltext_revisions": [], "like": []}
+    for term in corpus:
+        started = time.perf_counter()
+        first = await search_wiki(read_db, term, PAGE_SIZE)
+        timings["fulltext"].append(time.perf_counter() - started)
+        assert first["results"]
+
+        if first["next_cursor"] is not None:
+            started = time.perf_counter()
+            second = await search_wiki(read_db, term, PAGE_SIZE, first["next_cursor"])
+            timings["fulltext_next_page"].append(time.perf_counter() - started)
+            # Pages continue after the cursor, without repeats
+            assert not {r["id"] for r in first["results"]} & {r["id"] for r in second["results"]}
+            assert second["results"][0]["score"] <= first["results"][-1]["score"]
+
+        started = time.perf_counter()
+        await search_wiki(read_db, term, PAGE_SIZE, include_revisions=True)
+        timings["fulltext_revisions"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await like_search(read_db, term, PAGE_SIZE)
+        timings["like"].append(time.perf_counter() - started)
+
+    report(
+        f"{QUERIES} searches over {PAGES} pages",
+        **{
+            f"{name}_{label}_ms": percentile(samples, fraction) * 1000
+            for name, samples in timings.items() if samples
+            for label, fraction in (("p50", 0.5), ("p99", 0.99))
+        }
+    )
+    assert percentile(timings["fulltext"], 0.5) < percentile(timings["like"], 0.5)
@@ -0,0 +1,137 @@
+"""
+Closure-table maintenance for the wiki tree on a migrated SQLite database:
+the wiki_page_paths rows after pages are created, moved and deleted, and
+the tree version after commits and rollbacks.
+"""
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, select
+from sqlalchemy.orm import DeclarativeBase, relationship
+
+from app.utils.wiki_tree import WikiTreeCache, wiki_page_paths_table, wiki_pages_table
+
+class Base(DeclarativeBase):
+    pass
+
+class WikiPage(Base):
+    __tablename__ = "wiki_pages"
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    content = Column(Text, nullable=False, default="")
+    parent_id = Column(ForeignKey("wiki_pages.id"))
+    author_id = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    parent = relationship("WikiPage", remote_side=[id])
+
+@pytest.fixture
+async def sessions(migrated_sessions):
+    async with migrated_sessions() as db:
+        await db.execute(sa.text(
+            "INSERT INTO users (id, email, hashed_password, first_name, last_name, created_at) "
+            "VALUES (1, 'author@example.com', 'x', 'Site', 'Engineer', :now)"
+        ), {"now": datetime.utcnow()})
+        await db.commit()
+    return migrated_sessions
+
+async def stored_paths(db) -> set:
+    paths = wiki_page_paths_table
+    return set((await db.execute(select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth))).all())
+
+async def expected_paths(db) -> set:
+    """Every (ancestor, descendant, depth) implied by the parent_id links"""
+    parents = dict((await db.execute(select(wiki_pages_table.c.id, wiki_pages_table.c.parent_id))).all())
+    expected = set()
+    for page_id in parents:
+        ancestor, depth = page_id, 0
+        while ancestor is not None:
+            expected.add((ancestor, page_id, depth))
+            ancestor, depth = parents[ancestor], depth + 1
+    return expected
+
+async def tree_version(db) -> int:
+    return await WikiTreeCache().current_version(db)
+
+async def build(db):
+    """
+    1 Handbook
+    ├── 2 Safety
+    │   └── 3 Scaffolding
+    │       └── 4 Inspections
+    └── 5 Quality
+    """
+    pages = {
+        1: WikiPage(id=1, title="Handbook"),
+        5: WikiPage(id=5, title="Quality", parent_id=1)
+    }
+    db.add_all(pages.values())
+    await db.commit()
+    # A subtree created in one flush, children listed before their parents
+    pages[2] = WikiPage(id=2, title="Safety", parent=pages[1])
+    pages[3] = WikiPage(id=3, title="Scaffolding", parent=pages[2])
+    pages[4] = WikiPage(id=4, title="Inspections", parent=pages[3])
+    db.add_all([pages[4], pages[3], pages[2]])
+    await db.commit()
+    return pages
+
+async def test_created_pages_get_their_paths(sessions):
+    async with sessions() as db:
+        await build(db)
+        paths = await stored_paths(db)
+        assert paths == await expected_paths(db)
+        assert (1, 4, 3) in paths and (2, 4, 2) in paths and (4, 4, 0) in paths
+        assert len(paths) == 5 + 4 + 2 + 1  # self rows, under Handbook, Safety, Scaffolding
+
+async def test_moving_a_subtree_rewrites_its_paths(sessions):
+    async with sessions() as db:
+        pages = await build(db)
+
+        pages[3].parent_id = 5
+        await db.commit()
+        paths = await stored_paths(db)
+        assert paths == await expected_paths(db)
+        assert (2, 3, 1) not in paths and (2, 4, 2) not in paths
+        assert (5, 3, 1) in paths and (5, 4, 2) in paths and (1, 4, 3) in paths
+        # Paths inside the moved subtree are kept
+        assert (3, 4, 1) in paths
+
+        pages[3].parent_id = None
+        await db.commit()
+        paths = await stored_paths(db)
+        assert paths == await expected_paths(db)
+        assert {row for row in paths if row[1] in (3, 4)} == {(3, 3, 0), (4, 4, 0), (3, 4, 1)}
+
+async def test_a_page_cannot_move_under_its_own_descendant(sessions):
+    async with sessions() as db:
+        pages = await build(db)
+        pages[2].parent_id = 4
+        with pytest.raises(ValueError, match="own descendant"):
+            await db.commit()
+
+async def test_deleted_pages_take_their_paths_with_them(sessions):
+    async with sessions() as db:
+        pages = await build(db)
+        await db.delete(pages[4])
+        await db.commit()
+        paths = await stored_paths(db)
+        assert paths == await expected_paths(db)
+        assert not any(4 in row[:2] for row in paths)
+
+async def test_version_moves_only_with_committed_tree_changes(sessions):
+    async with sessions() as db:
+        pages = await build(db)
+        built = await tree_version(db)
+
+        pages[5].content = "Checklists"
+        await db.commit()
+        assert await tree_version(db) == built
+
+        pages[5].title = "Quality control"
+        await db.flush()
+        await db.rollback()
+        assert await tree_version(db) == built
+
+        pages[5].title = "Quality assurance"
+        await db.commit()
+        assert await tree_version(db) == built + 1
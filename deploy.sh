@@ -59,6 +59,7 @@ User=www-data
 Group=www-data
 WorkingDirectory=/var/www/buildline/backend
 Environment="PATH=/var/www/buildline/backend/venv/bin"
+ExecStartPre=/var/www/buildline/backend/venv/bin/python -m app.migrate upgrade head
 ExecStart=/var/www/buildline/backend/venv/bin/uvicorn main:app --host 127.0.0.1 --port 8000
 
 [Install]
@@ -11,11 +11,18 @@ const useNotificationsStore = create(
       isConnected: false,
       connectionError: null,
 
-      // Add a new notification
+      // Add a new notification. Delivery is at-least-once, so a
+      // notification whose id is already listed is a redelivery and dropped.
       addNotification: (notification) => {
-        set((state) => ({
-          notifications: [notification, ...state.notifications]
-        }));
+        set((state) => {
+          if (
+            notification.id != null &&
+            state.notifications.some((existing) => existing.id === notification.id)
+          ) {
+            return state;
+          }
+          return { notifications: [notification, ...state.notifications] };
+        });
       },
 
       // Mark a notification as read